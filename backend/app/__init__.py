@@ -7,7 +7,7 @@ import os
 # 初始化数据库
 db = SQLAlchemy()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     
     # 禁用URL末尾斜杠的严格匹配，避免重定向问题
@@ -21,14 +21,22 @@ def create_app():
     app.config['JWT_SECRET_KEY'] = 'your-secret-key'  # 请在生产环境中使用安全的密钥
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = False  # 设置token永不过期
     
+    # 使用基于 orjson 的编码器（未安装时自动退回标准库）
+    from app.utils.json_codec import FastJSONEncoder
+    app.json_encoder = FastJSONEncoder
+    
+    # 覆盖默认配置（基准测试、脚本等使用独立数据库）
+    if test_config:
+        app.config.update(test_config)
+    
     # 配置CORS，采用更简洁和稳健的配置
     CORS(app, 
         resources={
             r"/api/*": {
                 "origins": ["http://localhost:3000"],
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-                "allow_headers": ["content-type", "authorization", "accept", "origin", "x-requested-with"],
-                "expose_headers": ["content-type", "authorization"],
+                "allow_headers": ["content-type", "authorization", "accept", "origin", "x-requested-with", "if-none-match"],
+                "expose_headers": ["content-type", "authorization", "etag"],
                 "supports_credentials": True
             }
         }
@@ -37,6 +45,8 @@ def create_app():
     # 初始化扩展
     db.init_app(app)
     JWTManager(app)
+    from app.cache import cache
+    cache.init_app(app)
     
     # 注册蓝图
     from app.routes import auth, problems, tests, profile, teacher
@@ -46,14 +56,33 @@ def create_app():
     app.register_blueprint(profile.bp)
     app.register_blueprint(teacher.bp)
     
+    # 注册命令行工具
+    from app.cli import problems_cli, tests_cli
+    app.cli.add_command(problems_cli)
+    app.cli.add_command(tests_cli)
+    
     # 确保实例文件夹存在
     try:
         os.makedirs(app.instance_path)
     except OSError:
         pass
         
-    # 创建数据库表
+    # 创建数据库表并执行数据迁移
     with app.app_context():
         db.create_all()
+        from app.migrations import run_migrations
+        run_migrations()
+    
+    # 写后提交队列（需要数据表就绪，启动时重放未入库的提交）
+    from app.services.submission_queue import submission_queue
+    submission_queue.init_app(app)
+    
+    # 作答草稿（内存中合并后定期批量写入）
+    from app.services.draft_service import draft_store
+    draft_store.init_app(app)
+
+    # 测试统计批量重算
+    from app.services.stats_refresh import stats_refresher
+    stats_refresher.init_app(app)
         
     return app 
\ No newline at end of file
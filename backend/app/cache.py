@@ -0,0 +1,264 @@
+"""
+读接口响应缓存
+- 缓存值是已经序列化好的 JSON 字节串，命中时直接返回，不再查库和序列化
+- 每个条目可以带若干标签（如 problem:1、test:3、test-stats:3），写操作按标签失效
+- 按字节数限制总大小，超出时淘汰最久未使用的条目（LRU）
+- 后端可替换：memory 为进程内缓存；sqlite 使用本地文件，多个 worker 进程共享同一份缓存
+"""
+from flask import current_app, json
+from collections import OrderedDict
+from datetime import datetime
+import os
+import sqlite3
+import threading
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class MemoryBackend:
+    """进程内 LRU 缓存"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, tags)
+        self._tags = {}  # tag -> set(key)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, tags=()):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, tuple(tags))
+            self._size += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._size = 0
+
+    def size(self):
+        return self._size, len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        value, tags = entry
+        self._size -= len(key) + len(value)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteBackend:
+    """
+    基于本地 SQLite 文件的共享缓存，同一台机器上的多个 worker 进程可以共用
+    每个线程使用独立连接，WAL 模式下读写互不阻塞
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.evictions = 0
+        conn = self._conn()
+        conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_entries_last_access ON cache_entries (last_access);
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (tag, key)
+            );
+            CREATE INDEX IF NOT EXISTS ix_cache_tags_key ON cache_tags (key);
+        ''')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _now():
+        return datetime.utcnow().timestamp()
+
+    def get(self, key):
+        conn = self._conn()
+        row = conn.execute('SELECT value FROM cache_entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE cache_entries SET last_access = ? WHERE key = ?', (self._now(), key))
+        return bytes(row[0])
+
+    def set(self, key, value, tags=()):
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache_tags WHERE key = ?', (key,))
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (key, value, size, last_access) VALUES (?, ?, ?, ?)',
+                (key, value, size, self._now())
+            )
+            conn.executemany('INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags])
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache_entries').fetchone()[0]
+            while total > self.max_bytes:
+                oldest = conn.execute(
+                    'SELECT key, size FROM cache_entries ORDER BY last_access LIMIT 1'
+                ).fetchone()
+                self._delete(conn, [oldest[0]])
+                total -= oldest[1]
+                self.evictions += 1
+
+    def invalidate_tags(self, tags):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            keys = set()
+            for tag in tags:
+                keys.update(row[0] for row in conn.execute('SELECT key FROM cache_tags WHERE tag = ?', (tag,)))
+            self._delete(conn, keys)
+            return len(keys)
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('DELETE FROM cache_entries')
+            conn.execute('DELETE FROM cache_tags')
+
+    def size(self):
+        return tuple(self._conn().execute('SELECT COALESCE(SUM(size), 0), COUNT(*) FROM cache_entries').fetchone())
+
+    @staticmethod
+    def _delete(conn, keys):
+        keys = [(key,) for key in keys]
+        conn.executemany('DELETE FROM cache_entries WHERE key = ?', keys)
+        conn.executemany('DELETE FROM cache_tags WHERE key = ?', keys)
+
+
+class ResponseCache:
+    """缓存入口，在 create_app 中通过 init_app 绑定后端"""
+
+    def __init__(self):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')
+        app.config.setdefault('CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+        app.config.setdefault('CACHE_PATH', os.path.join(app.instance_path, 'cache.db'))
+
+        max_bytes = app.config['CACHE_MAX_BYTES']
+        if app.config['CACHE_BACKEND'] == 'sqlite':
+            os.makedirs(os.path.dirname(app.config['CACHE_PATH']), exist_ok=True)
+            self.backend = SQLiteBackend(app.config['CACHE_PATH'], max_bytes)
+        elif app.config['CACHE_BACKEND'] == 'memory':
+            self.backend = MemoryBackend(max_bytes)
+        else:
+            self.backend = None  # 'none' 关闭缓存
+        app.extensions['response_cache'] = self
+
+    def get(self, key):
+        value = self.backend.get(key) if self.backend else None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, tags=()):
+        if self.backend:
+            self.backend.set(key, value, tags)
+
+    def invalidate(self, *tags):
+        """按标签失效缓存，返回删除的条目数"""
+        if not self.backend or not tags:
+            return 0
+        return self.backend.invalidate_tags(tags)
+
+    def clear(self):
+        if self.backend:
+            self.backend.clear()
+
+    def get_or_build(self, key, tags, builder):
+        """
+        命中时返回缓存的 JSON 字节串；未命中时调用 builder() 得到数据（或已序列化的字节串），序列化后写入缓存
+        tags 可以是列表，也可以是接收数据返回列表的函数（标签依赖数据内容时使用）
+        """
+        payload = self.get(key)
+        if payload is None:
+            data = builder()
+            # builder 可以直接返回拼好的 JSON 字节串
+            payload = data if isinstance(data, bytes) else json.dumps(data).encode('utf-8')
+            if data is not None:
+                self.set(key, payload, tags(data) if callable(tags) else tags)
+        return payload
+
+    def json_response(self, key, tags, builder):
+        """直接用缓存的字节串构造 JSON 响应"""
+        payload = self.get_or_build(key, tags, builder)
+        return current_app.response_class(payload, mimetype='application/json')
+
+    def memoize(self, key, tags, builder):
+        """缓存普通的可 JSON 序列化数据，命中时反序列化后返回"""
+        return json.loads(self.get_or_build(key, tags, builder))
+
+    def stats(self):
+        total_bytes, entries = self.backend.size() if self.backend else (0, 0)
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': getattr(self.backend, 'evictions', 0),
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_bytes': getattr(self.backend, 'max_bytes', 0)
+        }
+
+
+cache = ResponseCache()
@@ -0,0 +1,127 @@
+"""
+命令行工具（flask <命令>）
+  flask problems import data/problems/*.json --batch-size 1000
+  flask problems export problems.ndjson
+  flask tests import papers.json --strict
+  flask tests export papers.json
+  flask tests refresh-stats --workers 4
+"""
+from flask.cli import AppGroup
+from app import db
+from app.services import bank_io
+from app.services.similarity import rebuild_related, TOP_K
+from app.cache import cache
+import click
+import time
+
+problems_cli = AppGroup('problems', help='题库导入导出')
+tests_cli = AppGroup('tests', help='测试导入导出')
+
+FORMAT_OPTION = click.option('--format', 'fmt', type=click.Choice(['json', 'ndjson']),
+                             help='文件格式，默认按扩展名判断（.ndjson/.jsonl 为 NDJSON）')
+BATCH_OPTION = click.option('--batch-size', default=bank_io.DEFAULT_BATCH_SIZE, show_default=True,
+                            help='每批写入的条数')
+STRICT_OPTION = click.option('--strict', is_flag=True, help='遇到不合法的记录时中止并回滚整个导入')
+
+
+def _print_progress(report):
+    click.echo(f"  已处理 {report.total} 条，{report.rate:.0f} 条/秒")
+
+
+def _run_import(importer, files, fmt, key, **kwargs):
+    """所有文件在同一个事务中导入，任何错误都会回滚"""
+    reports = []
+    try:
+        for path in files:
+            click.echo(f"导入 {path}")
+            with open(path, 'r', encoding='utf-8') as f:
+                records = bank_io.iter_records(f, fmt or bank_io.detect_format(path), key)
+                report = importer(records, progress=_print_progress, **kwargs)
+            reports.append(report)
+            click.echo(f"  {report.summary()}")
+            for index, reason in report.errors:
+                click.echo(f"  第 {index} 条无效: {reason}", err=True)
+        db.session.commit()
+    except (bank_io.BankImportError, ValueError) as e:
+        db.session.rollback()
+        raise click.ClickException(f'导入失败，已回滚: {e}')
+    click.echo(f"完成：新增 {sum(r.inserted for r in reports)}，更新 {sum(r.updated for r in reports)}，"
+               f"无效 {sum(r.invalid for r in reports)}")
+    return reports
+
+
+def _run_export(records, out, fmt, key):
+    fmt = fmt or bank_io.detect_format(out)
+    with open(out, 'w', encoding='utf-8') as f:
+        count = bank_io.write_records(records, f, fmt, key)
+    click.echo(f"已导出 {count} 条到 {out}")
+
+
+@problems_cli.command('import')
+@click.argument('files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@FORMAT_OPTION
+@BATCH_OPTION
+@STRICT_OPTION
+@click.option('--no-related', is_flag=True, help='导入后不重建相似题目')
+def import_problems(files, fmt, batch_size, strict, no_related):
+    """导入题目，相同内容的题目会被更新而不是重复插入"""
+    reports = _run_import(bank_io.import_problems, files, fmt, 'problems', batch_size=batch_size, strict=strict)
+    if not no_related and any(r.inserted or r.updated for r in reports):
+        rebuild_related_problems.callback(TOP_K)
+
+
+@problems_cli.command('related')
+@click.option('--top-k', default=TOP_K, show_default=True, help='每道题保留的相似题目数')
+def rebuild_related_problems(top_k):
+    """全量重建相似题目"""
+    start = time.perf_counter()
+    changed = rebuild_related(top_k)
+    db.session.commit()
+    cache.invalidate(*[f'related:{pid}' for pid in changed])
+    click.echo(f"相似题目已重建：{len(changed)} 道题目有变化，耗时 {time.perf_counter() - start:.2f}s")
+
+
+@problems_cli.command('export')
+@click.argument('out', type=click.Path(dir_okay=False, writable=True))
+@FORMAT_OPTION
+def export_problems(out, fmt):
+    """导出全部题目"""
+    _run_export(bank_io.iter_problem_exports(), out, fmt, 'problems')
+
+
+@tests_cli.command('import')
+@click.argument('files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@FORMAT_OPTION
+@BATCH_OPTION
+@STRICT_OPTION
+@click.option('--created-by', type=int, help='记录中没有创建者时使用的教师ID')
+def import_tests(files, fmt, batch_size, strict, created_by):
+    """导入测试，题目可以用 problem_ids 或 problem_hashes 指定"""
+    _run_import(bank_io.import_tests, files, fmt, 'tests',
+                batch_size=batch_size, strict=strict, created_by=created_by)
+
+
+@tests_cli.command('export')
+@click.argument('out', type=click.Path(dir_okay=False, writable=True))
+@FORMAT_OPTION
+def export_tests(out, fmt):
+    """导出全部测试"""
+    _run_export(bank_io.iter_test_exports(), out, fmt, 'tests')
+
+
+@tests_cli.command('refresh-stats')
+@click.option('--workers', type=int, help='计算进程数，默认取 STATS_REFRESH_WORKERS，0 表示在当前进程中计算')
+@click.option('--chunk-size', type=int, help='每块的测试数，默认取 STATS_REFRESH_CHUNK_SIZE')
+def refresh_test_stats(workers, chunk_size):
+    """按提交记录重算所有测试的统计和项目分析（适合夜间定时执行）"""
+    from app.services.stats_refresh import stats_refresher
+    start = time.perf_counter()
+
+    def progress(job):
+        click.echo(f"  已处理 {job['processed']}/{job['total']} 份测试")
+
+    job = stats_refresher.run(progress=progress, workers=workers, chunk_size=chunk_size)
+    click.echo(f"完成：写入 {job['written']}，跳过 {job['skipped']}（计算期间有新提交），"
+               f"修复 {job['repaired']}，失败 {job['failed']}，耗时 {time.perf_counter() - start:.1f}s")
+    for error in job['errors']:
+        click.echo(f"  {error}", err=True)
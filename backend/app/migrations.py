@@ -0,0 +1,474 @@
+"""
+轻量级数据迁移
+- db.create_all() 只会创建缺失的表，已有表上的新索引、新列和历史数据回填由这里处理
+- 每个迁移有唯一版本号，执行后记录在 schema_migrations 表中，只会执行一次
+- 迁移函数需要保证可重复执行（幂等），init_db 重建数据库后会重新执行一遍
+"""
+from app import db
+from sqlalchemy import bindparam, inspect, select, text
+from datetime import datetime
+import json
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.String(64), primary_key=True),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow)
+)
+
+# 按注册顺序执行的迁移列表: [(版本号, 说明, 函数)]
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """注册迁移函数"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+def _has_column(table, column):
+    return column in {c['name'] for c in inspect(db.engine).get_columns(table)}
+
+
+def add_column(table, column, ddl):
+    """给已有表加列，列已存在时跳过"""
+    if not _has_column(table, column):
+        db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def create_index(name, table, columns, unique=False):
+    """创建索引，索引已存在时跳过"""
+    db.session.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+def delete_ids(table, ids, chunk_size=500):
+    """按主键分批删除"""
+    for start in range(0, len(ids), chunk_size):
+        db.session.execute(table.delete().where(table.c.id.in_(ids[start:start + chunk_size])))
+
+
+def run_migrations():
+    """执行所有尚未执行的迁移，需要在应用上下文中调用"""
+    schema_migrations.create(db.engine, checkfirst=True)
+    applied = {row[0] for row in db.session.execute(select(schema_migrations.c.version))}
+
+    for version, description, func in MIGRATIONS:
+        if version in applied:
+            continue
+        print(f"执行数据迁移 {version}: {description}")
+        try:
+            func()
+            db.session.execute(schema_migrations.insert().values(
+                version=version,
+                applied_at=datetime.utcnow()
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+@migration('0001_topic_associations', '知识点关联表回填')
+def backfill_topic_associations():
+    """把 problems.topics / tests.topics 中逗号分隔的知识点回填到关联表"""
+    from app.models.problem import Problem
+    from app.models.test import Test
+    from app.models.study_record import (
+        KnowledgePoint, problem_topics, test_topics, normalize_topics
+    )
+
+    create_index('ix_knowledge_points_name', 'knowledge_points', ['name'], unique=True)
+
+    problem_rows = db.session.query(Problem.id, Problem.topics).filter(Problem.topics.isnot(None)).all()
+    test_rows = db.session.query(Test.id, Test.topics).filter(Test.topics.isnot(None)).all()
+    parsed_problems = [(pid, normalize_topics(topics)) for pid, topics in problem_rows]
+    parsed_tests = [(tid, normalize_topics(topics)) for tid, topics in test_rows]
+
+    # 一次性补齐缺失的知识点
+    names = {name for _, topics in parsed_problems + parsed_tests for name in topics}
+    existing = {name for (name,) in db.session.query(KnowledgePoint.name)}
+    missing = sorted(names - existing)
+    if missing:
+        db.session.execute(KnowledgePoint.__table__.insert(), [{'name': name} for name in missing])
+    knowledge_ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+
+    def fill(table, owner_column, parsed):
+        existing_pairs = {tuple(row) for row in db.session.execute(select(table.c[owner_column], table.c.knowledge_id))}
+        rows = [
+            {owner_column: owner_id, 'knowledge_id': knowledge_ids[name]}
+            for owner_id, topics in parsed
+            for name in topics
+            if (owner_id, knowledge_ids[name]) not in existing_pairs
+        ]
+        if rows:
+            db.session.execute(table.insert(), rows)
+
+    fill(problem_topics, 'problem_id', parsed_problems)
+    fill(test_topics, 'test_id', parsed_tests)
+
+
+@migration('0002_problem_search_index', '题目全文索引')
+def build_problem_search_index():
+    from app.services.search_service import rebuild_search_index
+    rebuild_search_index()
+
+
+@migration('0003_problem_public_json', '题目JSON片段')
+def backfill_problem_public_json():
+    from app.models.problem import Problem, public_json_for
+
+    add_column('problems', 'public_json', 'TEXT')
+    db.session.flush()
+    # 只查询需要的列，后续迁移新增的列此时可能还不存在
+    query = db.session.query(
+        Problem.id, Problem.title, Problem.content, Problem.type,
+        Problem.difficulty, Problem.topics, Problem.options
+    ).filter(Problem.public_json.is_(None)).yield_per(1000)
+    rows = [{'pid': row[0], 'public_json': public_json_for(*row[1:])} for row in query]
+    if rows:
+        db.session.execute(
+            Problem.__table__.update().where(Problem.__table__.c.id == bindparam('pid')),
+            rows
+        )
+
+
+@migration('0004_content_hash', '题目与测试内容指纹')
+def backfill_content_hash():
+    from app.models.problem import Problem, content_hash_for
+    from app.models.test import Test, test_hash_for
+
+    add_column('problems', 'content_hash', 'VARCHAR(64)')
+    add_column('tests', 'content_hash', 'VARCHAR(64)')
+    db.session.flush()
+
+    seen = {h for (h,) in db.session.query(Problem.content_hash).filter(Problem.content_hash.isnot(None))}
+    rows = []
+    query = db.session.query(Problem.id, Problem.type, Problem.content, Problem.options) \
+        .filter(Problem.content_hash.is_(None)).order_by(Problem.id).yield_per(1000)
+    for problem_id, type_, content, options in query:
+        content_hash = content_hash_for(type_, content, options)
+        # 历史数据中内容完全相同的题目保留下来，用ID区分指纹
+        if content_hash in seen:
+            content_hash = f'{content_hash}#{problem_id}'
+        seen.add(content_hash)
+        rows.append({'pid': problem_id, 'content_hash': content_hash})
+    if rows:
+        db.session.execute(
+            Problem.__table__.update().where(Problem.__table__.c.id == bindparam('pid')),
+            rows
+        )
+
+    query = db.session.query(Test.id, Test.title, Test.type, Test.problem_ids) \
+        .filter(Test.content_hash.is_(None)).yield_per(1000)
+    rows = [{'tid': row[0], 'content_hash': test_hash_for(*row[1:])} for row in query]
+    if rows:
+        db.session.execute(
+            Test.__table__.update().where(Test.__table__.c.id == bindparam('tid')),
+            rows
+        )
+
+    create_index('ix_problems_content_hash', 'problems', ['content_hash'], unique=True)
+    create_index('ix_tests_content_hash', 'tests', ['content_hash'])
+
+
+@migration('0005_problem_answer_key', '题目答案键')
+def backfill_problem_answer_key():
+    from app.models.problem import Problem
+    from app.services.grading import answer_key
+
+    add_column('problems', 'answer_key', 'TEXT')
+    db.session.flush()
+    query = db.session.query(Problem.id, Problem.correct_answer) \
+        .filter(Problem.answer_key.is_(None)).yield_per(1000)
+    rows = [{'pid': pid, 'answer_key': answer_key(correct_answer)} for pid, correct_answer in query]
+    if rows:
+        db.session.execute(
+            Problem.__table__.update().where(Problem.__table__.c.id == bindparam('pid')),
+            rows
+        )
+
+
+@migration('0006_practice_unique_constraints', '做题状态与每日计数去重并加唯一约束')
+def dedup_practice_records():
+    from app.models.problem import UserProblemStatus, DailyUserSubmission
+
+    # 同一用户同一道题保留作答时间最新的一条
+    keep = {}
+    duplicates = []
+    rows = db.session.query(
+        UserProblemStatus.id, UserProblemStatus.user_id, UserProblemStatus.problem_id, UserProblemStatus.submitted_at
+    ).order_by(UserProblemStatus.id)
+    for row_id, user_id, problem_id, submitted_at in rows:
+        key = (user_id, problem_id)
+        current = keep.get(key)
+        if current is None:
+            keep[key] = (row_id, submitted_at)
+        elif submitted_at is not None and (current[1] is None or submitted_at >= current[1]):
+            duplicates.append(current[0])
+            keep[key] = (row_id, submitted_at)
+        else:
+            duplicates.append(row_id)
+    delete_ids(UserProblemStatus.__table__, duplicates)
+
+    # 同一用户同一天的计数合并到最早的一条
+    totals = {}
+    duplicates = []
+    rows = db.session.query(
+        DailyUserSubmission.id, DailyUserSubmission.user_id, DailyUserSubmission.submission_date, DailyUserSubmission.count
+    ).order_by(DailyUserSubmission.id)
+    for row_id, user_id, submission_date, count in rows:
+        key = (user_id, submission_date)
+        if key in totals:
+            totals[key][1] += count or 0
+            totals[key][2] = True
+            duplicates.append(row_id)
+        else:
+            totals[key] = [row_id, count or 0, False]
+    merged = [{'did': row_id, 'count': count} for row_id, count, changed in totals.values() if changed]
+    if merged:
+        table = DailyUserSubmission.__table__
+        db.session.execute(table.update().where(table.c.id == bindparam('did')), merged)
+    delete_ids(DailyUserSubmission.__table__, duplicates)
+
+    create_index('uq_user_problem_status_user_problem', 'user_problem_status', ['user_id', 'problem_id'], unique=True)
+    create_index('uq_daily_user_submissions_user_date', 'daily_user_submissions', ['user_id', 'submission_date'], unique=True)
+
+
+@migration('0007_related_problems', '相似题目')
+def build_related_problems():
+    from app.services.similarity import rebuild_related
+    rebuild_related()
+
+
+@migration('0008_test_list_indexes', '测试列表索引')
+def add_test_list_indexes():
+    create_index('ix_tests_created_at', 'tests', ['created_at', 'id'])
+    create_index('ix_test_submissions_user_test', 'test_submissions', ['user_id', 'test_id'])
+
+
+@migration('0009_test_snapshots', '试卷快照版本')
+def add_test_snapshot_columns():
+    add_column('tests', 'published_version', 'INTEGER')
+    add_column('test_submissions', 'paper_version', 'INTEGER')
+
+
+def reconcile_test_questions():
+    """
+    给还没有 test_questions 记录的测试按旧的 problem_ids 字段补齐题目（初始化数据的测试从未写入过题目关联）
+    结果与判分的回填依赖题目列表，需要在它们之前执行
+    """
+    from app.models.test import Test, TestQuestion
+    linked = select(TestQuestion.test_id).distinct()
+    rows = []
+    query = db.session.query(Test.id, Test.problem_ids).filter(Test.id.notin_(linked), Test.problem_ids.isnot(None))
+    for test_id, problem_ids in query:
+        ids = [int(pid) for pid in problem_ids.split(',') if pid.strip()]
+        rows.extend({'test_id': test_id, 'problem_id': pid, 'order': order} for order, pid in enumerate(ids, 1))
+    if rows:
+        db.session.execute(TestQuestion.__table__.insert(), rows)
+
+
+@migration('0010_submission_results', '测试提交结果回填')
+def backfill_submission_results():
+    from app.models.test import TestSubmission
+    from app.services.result_service import rebuild_result
+    add_column('test_submissions', 'result_json', 'TEXT')
+    reconcile_test_questions()
+    ids = [row[0] for row in db.session.execute(
+        select(TestSubmission.id).where(TestSubmission.result_json.is_(None))
+    )]
+    for submission_id in ids:
+        rebuild_result(submission_id)
+
+
+@migration('0011_submission_answers', '测试作答明细回填')
+def backfill_submission_answers():
+    from app.models.test import TestSubmission, SubmissionAnswer
+    from app.services.result_service import backfill_submission_answers as backfill
+    create_index('ix_test_submissions_test', 'test_submissions', ['test_id'])
+    reconcile_test_questions()
+    done = select(SubmissionAnswer.submission_id).distinct()
+    ids = [row[0] for row in db.session.execute(
+        select(TestSubmission.id).where(TestSubmission.id.notin_(done))
+    )]
+    for submission_id in ids:
+        backfill(submission_id)
+
+
+@migration('0012_test_questions_authoritative', '测试题目以 test_questions 为准')
+def make_test_questions_authoritative():
+    create_index('ix_test_questions_test_order', 'test_questions', ['test_id', '"order"'])
+    reconcile_test_questions()
+    # 题目数与关联记录保持一致，旧的 problem_ids 字段不再使用
+    db.session.execute(text(
+        'UPDATE tests SET total_questions = '
+        '(SELECT COUNT(*) FROM test_questions WHERE test_questions.test_id = tests.id) '
+        'WHERE EXISTS (SELECT 1 FROM test_questions WHERE test_questions.test_id = tests.id)'
+    ))
+    db.session.execute(text('UPDATE tests SET problem_ids = NULL'))
+
+
+@migration('0013_submission_receipts', '测试提交回执号')
+def add_submission_receipts():
+    add_column('test_submissions', 'receipt', 'VARCHAR(32)')
+    create_index('uq_test_submissions_receipt', 'test_submissions', ['receipt'], unique=True)
+
+
+@migration('0014_incremental_test_statistics', '测试统计改为随提交累加')
+def add_test_statistic_counters():
+    from app.models.test import TestSubmission, TestResult, QuestionStat, SCORE_BUCKETS
+    from app.services.test_service import check_test_statistics
+
+    for column in ['completed_count', 'duration_sum', 'passed_count'] + [c for _, c, _ in SCORE_BUCKETS]:
+        add_column('test_results', column, 'INTEGER NOT NULL DEFAULT 0')
+    add_column('test_results', 'score_sum', 'FLOAT NOT NULL DEFAULT 0')
+    for column in ('answer_count', 'correct_count', 'time_sum', 'timed_count'):
+        add_column('question_stats', column, 'INTEGER NOT NULL DEFAULT 0')
+    # 下面的校验按模型读取整行，模型上后续迁移加的列需要先存在
+    add_item_analysis_columns()
+
+    # 同一测试（同一测试同一道题）保留最新的一条统计
+    keep = {}
+    duplicates = []
+    for row_id, test_id in db.session.query(TestResult.id, TestResult.test_id).order_by(TestResult.id):
+        if test_id in keep:
+            duplicates.append(keep[test_id])
+        keep[test_id] = row_id
+    delete_ids(TestResult.__table__, duplicates)
+    keep = {}
+    duplicates = []
+    rows = db.session.query(QuestionStat.id, QuestionStat.test_id, QuestionStat.question_id).order_by(QuestionStat.id)
+    for row_id, test_id, question_id in rows:
+        key = (test_id, question_id)
+        if key in keep:
+            duplicates.append(keep[key])
+        keep[key] = row_id
+    delete_ids(QuestionStat.__table__, duplicates)
+
+    create_index('uq_test_results_test', 'test_results', ['test_id'], unique=True)
+    create_index('uq_question_stats_test_question', 'question_stats', ['test_id', 'question_id'], unique=True)
+
+    # 有提交记录的测试按提交记录重算累计值
+    submitted = [row[0] for row in db.session.execute(select(TestSubmission.test_id).distinct())]
+    for test_id in submitted:
+        check_test_statistics(test_id, repair=True)
+
+    # 没有提交记录的统计（初始化数据中的示例统计）由旧版存储的派生字段换算出累计值
+    legacy = db.session.query(
+        TestResult.id, TestResult.test_id, TestResult.completed_count, TestResult.average_score,
+        TestResult.average_time, TestResult.pass_rate, TestResult.score_distribution
+    ).filter(
+        TestResult.test_id.notin_(submitted), TestResult.completed_count > 0,
+        TestResult.score_sum == 0, TestResult.duration_sum == 0
+    )
+    counts = {}
+    for row_id, test_id, count, average_score, average_time, pass_rate, distribution in legacy.all():
+        if isinstance(distribution, str):
+            distribution = json.loads(distribution)
+        distribution = distribution or {}
+        values = {
+            'score_sum': (average_score or 0) * count,
+            'duration_sum': round((average_time or 0) * 60 * count),
+            'passed_count': round((pass_rate or 0) * count / 100)
+        }
+        for label, column, _ in SCORE_BUCKETS:
+            values[column] = int(distribution.get(label) or 0)
+        db.session.execute(TestResult.__table__.update().where(TestResult.__table__.c.id == row_id).values(**values))
+        counts[test_id] = count
+    rows = db.session.query(
+        QuestionStat.id, QuestionStat.test_id, QuestionStat.correct_rate, QuestionStat.average_time
+    ).filter(QuestionStat.test_id.in_(list(counts)), QuestionStat.answer_count == 0)
+    for row_id, test_id, correct_rate, average_time in rows.all():
+        count = counts[test_id]
+        db.session.execute(QuestionStat.__table__.update().where(QuestionStat.__table__.c.id == row_id).values(
+            answer_count=count,
+            correct_count=round((correct_rate or 0) * count),
+            time_sum=round((average_time or 0) * 60 * count),
+            timed_count=count
+        ))
+
+
+@migration('0015_item_analysis', '测试项目分析字段')
+def add_item_analysis_columns():
+    add_column('test_results', 'examinee_count', 'INTEGER')
+    add_column('test_results', 'reliability', 'FLOAT')
+    add_column('test_results', 'score_quantiles', 'JSON')
+    add_column('test_results', 'analyzed_at', 'DATETIME')
+    for column in ('difficulty', 'discrimination', 'point_biserial'):
+        add_column('question_stats', column, 'FLOAT')
+
+
+@migration('0016_answer_stats', '每道题的答案分布与常见错误')
+def backfill_answer_stats():
+    from app.models.test import TestSubmission
+    from app.services.answer_stats import rebuild_answer_stats
+
+    # answer_stats 表由 create_all 创建，这里按已有的作答明细回填
+    submitted = [row[0] for row in db.session.execute(select(TestSubmission.test_id).distinct())]
+    for start in range(0, len(submitted), 100):
+        rebuild_answer_stats(submitted[start:start + 100])
+
+
+@migration('0017_draft_time_spent', '作答草稿保存每道题的用时')
+def add_draft_time_spent():
+    add_column('test_drafts', 'time_spent', 'TEXT')
+
+
+@migration('0018_recompute_answer_keys', '答案键不再把多个字母当作变量的乘积，重新计算')
+def recompute_answer_keys():
+    from app.models.problem import Problem
+    from app.services.grading import answer_key
+
+    query = db.session.query(Problem.id, Problem.correct_answer, Problem.answer_key).yield_per(1000)
+    rows = [{'pid': pid, 'answer_key': key}
+            for pid, correct_answer, old_key in query
+            for key in [answer_key(correct_answer)] if key != old_key]
+    if rows:
+        db.session.execute(
+            Problem.__table__.update().where(Problem.__table__.c.id == bindparam('pid')),
+            rows
+        )
+    # 常见错误按答案键归并，键变了之后重新统计
+    backfill_answer_stats()
+
+
+@migration('0019_public_json_empty_options', '没有选项的题目 JSON 片段 options 改为空列表')
+def fix_public_json_empty_options():
+    from app.models.problem import Problem, public_json_for
+
+    query = db.session.query(
+        Problem.id, Problem.title, Problem.content, Problem.type,
+        Problem.difficulty, Problem.topics, Problem.options
+    ).filter(Problem.public_json.like('%"options":null%')).yield_per(1000)
+    rows = [{'pid': row[0], 'public_json': public_json_for(*row[1:])} for row in query]
+    if rows:
+        db.session.execute(
+            Problem.__table__.update().where(Problem.__table__.c.id == bindparam('pid')),
+            rows
+        )
+
+
+@migration('0020_answer_key_units', '长度单位计入答案键，重新计算')
+def recompute_answer_keys_with_units():
+    recompute_answer_keys()
+
+
+@migration('0021_search_index_topics', '全文索引加入知识点和单字')
+def rebuild_search_index_with_topics():
+    from app.services.search_service import FTS_TABLE, fts_available, ensure_search_index, rebuild_search_index
+
+    if not fts_available():
+        return
+    # FTS 虚拟表不能加列，删除后按新的列重建
+    db.session.execute(text(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+    ensure_search_index()
+    rebuild_search_index()
+
+
+@migration('0022_recommendation_state_refill', '推荐队列按缺少的数量补充')
+def add_recommendation_refill_state():
+    add_column('recommendation_states', 'max_problem_id', 'INTEGER')
+    add_column('recommendation_states', 'exhausted', 'BOOLEAN NOT NULL DEFAULT 0')
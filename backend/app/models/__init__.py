@@ -1,8 +1,16 @@
 from app import db
 from app.models.user import User
 from app.models.problem import Problem, UserProblemStatus, DailyUserSubmission
-from app.models.test import Test, TestQuestion, TestSubmission
-from app.models.study_record import StudyRecord, StudyStatistics, UserKnowledgeStatus
+from app.models.test import (
+    Test, TestQuestion, TestSubmission, TestSnapshot, SubmissionAnswer,
+    TestDraft, TestDraftEntry
+)
+from app.models.data_version import DataVersion, bump_version
+from app.models.recommendation import UserProblemQueue, RecommendationState
+from app.models.study_record import (
+    StudyRecord, StudyStatistics, KnowledgePoint, UserKnowledgeStatus,
+    problem_topics, test_topics
+)
 
 __all__ = [
     'db',
@@ -13,7 +21,18 @@ __all__ = [
     'Test',
     'TestQuestion',
     'TestSubmission',
+    'TestSnapshot',
+    'SubmissionAnswer',
+    'TestDraft',
+    'TestDraftEntry',
     'StudyRecord',
     'StudyStatistics',
-    'UserKnowledgeStatus'
+    'KnowledgePoint',
+    'UserKnowledgeStatus',
+    'problem_topics',
+    'test_topics',
+    'DataVersion',
+    'bump_version',
+    'UserProblemQueue',
+    'RecommendationState'
 ] 
\ No newline at end of file
@@ -0,0 +1,47 @@
+from app import db
+from sqlalchemy import String, cast, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+class DataVersion(db.Model):
+    """
+    数据版本号，每类数据一行（如 problems、tests、user:1）
+    写操作在同一事务内把版本号加一，读接口用版本号生成 ETag，不必查询实际数据就能判断是否变化
+    """
+    __tablename__ = 'data_versions'
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+def dialect_insert(table):
+    """按当前数据库方言返回支持 ON CONFLICT 的 insert 构造器"""
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def dialect_group_concat(column):
+    """按当前数据库方言把分组内的值拼接成逗号分隔的字符串"""
+    if db.engine.dialect.name == 'postgresql':
+        return func.string_agg(cast(column, String), ',')
+    return func.group_concat(column)
+
+
+def bump_version(*names):
+    """把若干数据版本号加一（不提交，跟随调用方的事务）"""
+    table = DataVersion.__table__
+    for name in names:
+        stmt = dialect_insert(table).values(name=name, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'version': table.c.version + 1}
+        )
+        db.session.execute(stmt)
+
+
+def get_versions(names):
+    """批量读取版本号，不存在的记为 0"""
+    rows = db.session.query(DataVersion.name, DataVersion.version).filter(DataVersion.name.in_(names))
+    versions = dict(rows)
+    return [versions.get(name, 0) for name in names]
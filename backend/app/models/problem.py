@@ -1,7 +1,32 @@
 from app import db
+from app.models.study_record import normalize_topics, resolve_knowledge_points
+from app.utils.json_codec import dumps_bytes, merge_object
+from app.services.grading import answer_key
 from datetime import datetime
+import hashlib
 import json
 
+def _parse_options(options):
+    if options is None or isinstance(options, list):
+        return options
+    return json.loads(options) if options else None
+
+def public_json_for(title, content, type, difficulty, topics, options):
+    """生成面向学生的题目JSON片段，options 解析成列表，不包含答案和解析"""
+    return dumps_bytes({
+        'title': title,
+        'content': content,
+        'type': type,
+        'difficulty': difficulty,
+        'topics': topics.split(',') if topics else [],
+        'options': _parse_options(options) or []
+    }).decode('utf-8')
+
+def content_hash_for(type, content, options):
+    """题目内容指纹：题型、题干和选项相同即视为同一道题，用于导入时去重和更新"""
+    raw = json.dumps([type, (content or '').strip(), _parse_options(options)], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
 class Problem(db.Model):
     __tablename__ = 'problems'
     
@@ -10,12 +35,37 @@ class Problem(db.Model):
     content = db.Column(db.Text, nullable=False)
     type = db.Column(db.String(50), nullable=False)  # 题目类型：multiple_choice, fill_blank, solution
     difficulty = db.Column(db.Integer, nullable=False)  # 难度：1-5
-    topics = db.Column(db.String(200))  # 知识点，用逗号分隔
+    topics = db.Column(db.String(200))  # 知识点，用逗号分隔，仅用于展示；筛选和统计走 problem_topics 关联表
     options = db.Column(db.Text)  # 选项，JSON格式存储
     correct_answer = db.Column(db.Text, nullable=False)
     explanation = db.Column(db.Text)  # 解析
     related_problems = db.Column(db.String(200))  # 相关题目ID，用逗号分隔
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    public_json = db.Column(db.Text)  # 面向学生的题目JSON片段（不含id和答案），写入时生成
+    content_hash = db.Column(db.String(64), unique=True, index=True)  # 内容指纹，写入时生成
+    answer_key = db.Column(db.Text)  # 标准答案的规范形式，判分时与学生答案的规范形式比较，写入时生成
+
+    knowledge_points = db.relationship('KnowledgePoint', secondary='problem_topics', backref='problems')
+
+    def build_public_json(self):
+        return public_json_for(self.title, self.content, self.type, self.difficulty, self.topics, self.options)
+
+    def build_content_hash(self):
+        return content_hash_for(self.type, self.content, self.options)
+
+    def public_fragment(self, extra=None):
+        """
+        返回题目的JSON字节片段，可追加额外字段
+        列表接口直接拼接这些片段，不必每次解析 options 再重新编码
+        """
+        body = (self.public_json or self.build_public_json()).encode('utf-8')
+        return merge_object(b'{"id":%d,' % self.id + body[1:], extra)
+
+    def set_topics(self, topics):
+        """同时更新展示用的 topics 字符串和知识点关联"""
+        names = normalize_topics(topics)
+        self.topics = ','.join(names)
+        self.knowledge_points = resolve_knowledge_points(names)
 
     def to_dict(self):
         return {
@@ -32,8 +82,24 @@ class Problem(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+@db.event.listens_for(Problem, 'before_insert')
+@db.event.listens_for(Problem, 'before_update')
+def _refresh_derived_fields(mapper, connection, problem):
+    problem.public_json = problem.build_public_json()
+    # 指纹只在题型、题干或选项变化时重新计算，保留迁移时给重复题目加的后缀
+    state = db.inspect(problem)
+    if problem.content_hash is None or any(
+            state.attrs[name].history.has_changes() for name in ('type', 'content', 'options')):
+        problem.content_hash = problem.build_content_hash()
+    if problem.answer_key is None or state.attrs.correct_answer.history.has_changes():
+        problem.answer_key = answer_key(problem.correct_answer)
+
 class UserProblemStatus(db.Model):
     __tablename__ = 'user_problem_status'
+    __table_args__ = (
+        # 每个用户每道题只有一条状态记录，写入时按此约束 upsert
+        db.Index('uq_user_problem_status_user_problem', 'user_id', 'problem_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -52,6 +118,10 @@ class UserProblemStatus(db.Model):
 
 class DailyUserSubmission(db.Model):
     __tablename__ = 'daily_user_submissions'
+    __table_args__ = (
+        # 每个用户每天一条计数记录，写入时按此约束累加
+        db.Index('uq_daily_user_submissions_user_date', 'user_id', 'submission_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
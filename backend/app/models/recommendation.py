@@ -0,0 +1,26 @@
+from app import db
+from datetime import datetime
+
+class UserProblemQueue(db.Model):
+    """
+    每个用户的推荐候选队列（分数越高越优先推荐），只保存分数最高的若干道未做对的题目
+    提交答案后只重新计算相关知识点下的题目分数
+    """
+    __tablename__ = 'user_problem_queue'
+    __table_args__ = (
+        db.Index('ix_user_problem_queue_user_score', 'user_id', 'score'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+
+class RecommendationState(db.Model):
+    """记录用户队列基于哪个题库版本生成，题库变化后只补充计算新增的题目"""
+    __tablename__ = 'recommendation_states'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    problems_version = db.Column(db.Integer, nullable=False)
+    max_problem_id = db.Column(db.Integer)  # 已计算过的最大题目ID，之后新增的题目在题库版本变化时补充计算
+    exhausted = db.Column(db.Boolean, nullable=False, default=False)  # 队列已包含全部未做对的题目，不需要再从题库补充
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
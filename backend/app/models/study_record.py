@@ -22,13 +22,57 @@ class StudyStatistics(db.Model):
     streak_days = db.Column(db.Integer, default=0)  # 连续学习天数
     last_study_date = db.Column(db.Date)  # 最后学习日期
 
+# 题目与知识点的多对多关联，(knowledge_id, problem_id) 索引用于按知识点查题
+problem_topics = db.Table(
+    'problem_topics',
+    db.Column('problem_id', db.Integer, db.ForeignKey('problems.id'), primary_key=True),
+    db.Column('knowledge_id', db.Integer, db.ForeignKey('knowledge_points.id'), primary_key=True),
+    db.Index('ix_problem_topics_knowledge_id', 'knowledge_id', 'problem_id')
+)
+
+# 测试与知识点的多对多关联
+test_topics = db.Table(
+    'test_topics',
+    db.Column('test_id', db.Integer, db.ForeignKey('tests.id'), primary_key=True),
+    db.Column('knowledge_id', db.Integer, db.ForeignKey('knowledge_points.id'), primary_key=True),
+    db.Index('ix_test_topics_knowledge_id', 'knowledge_id', 'test_id')
+)
+
 class KnowledgePoint(db.Model):
     __tablename__ = 'knowledge_points'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(64), nullable=False)
+    name = db.Column(db.String(64), nullable=False, unique=True, index=True)
     category = db.Column(db.String(32))  # 知识点分类
 
+def normalize_topics(topics):
+    """把逗号分隔字符串或列表形式的知识点整理成去重、去空白后的列表，保持原顺序"""
+    if not topics:
+        return []
+    if isinstance(topics, str):
+        topics = topics.split(',')
+    names = []
+    for topic in topics:
+        topic = str(topic).strip()
+        if topic and topic not in names:
+            names.append(topic)
+    return names
+
+def resolve_knowledge_points(names):
+    """按名称获取知识点记录，不存在的自动创建（只加入会话，不提交）"""
+    if not names:
+        return []
+    existing = {kp.name: kp for kp in KnowledgePoint.query.filter(KnowledgePoint.name.in_(names))}
+    result = []
+    for name in names:
+        kp = existing.get(name)
+        if kp is None:
+            kp = KnowledgePoint(name=name)
+            db.session.add(kp)
+            existing[name] = kp
+        result.append(kp)
+    return result
+
 class UserKnowledgeStatus(db.Model):
     __tablename__ = 'user_knowledge_status'
     
@@ -1,8 +1,16 @@
 from app import db
+from app.models.study_record import normalize_topics, resolve_knowledge_points
+from sqlalchemy import select
 from datetime import datetime
+import hashlib
+import json
 
 class Test(db.Model):
     __tablename__ = 'tests'  # 明确指定表名为 tests
+    __table_args__ = (
+        # 学生测试列表按创建时间倒序翻页
+        db.Index('ix_tests_created_at', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -10,14 +18,34 @@ class Test(db.Model):
     type = db.Column(db.String(50), nullable=False)  # '月测', '模拟考', '周测', '单元测'
     total_questions = db.Column(db.Integer, nullable=False)
     estimated_time = db.Column(db.Integer, nullable=False)  # 预计完成时间（分钟）
-    topics = db.Column(db.String(200))  # 知识点，存储为逗号分隔的字符串
+    topics = db.Column(db.String(200))  # 知识点，存储为逗号分隔的字符串，仅用于展示；查询走 test_topics 关联表
     difficulty = db.Column(db.Integer, nullable=False)  # 1-5星难度
-    problem_ids = db.Column(db.String(500))  # 题目ID列表，存储为逗号分隔的字符串
+    problem_ids = db.Column(db.String(500))  # 旧版本的题目ID列表，已迁移到 test_questions，不再读写
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deadline = db.Column(db.DateTime, nullable=True)  # 截止时间，练习测试可以没有截止时间
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # 初始化的测试可以没有创建者
+    content_hash = db.Column(db.String(64), index=True)  # 内容指纹（标题、类型、题目列表），导入时据此更新已有测试
+    published_version = db.Column(db.Integer)  # 当前发布的试卷快照版本，尚未发布时为空
 
-    def to_dict(self):
+    knowledge_points = db.relationship('KnowledgePoint', secondary='test_topics', backref='tests')
+
+    def set_topics(self, topics):
+        """同时更新展示用的 topics 字符串和知识点关联"""
+        names = normalize_topics(topics)
+        self.topics = ','.join(names)
+        self.knowledge_points = resolve_knowledge_points(names)
+
+    def build_content_hash(self, problem_ids):
+        return test_hash_for(self.title, self.type, problem_ids)
+
+    def question_ids(self):
+        """按顺序排列的题目ID列表"""
+        return load_question_ids([self.id]).get(self.id, [])
+
+    def to_dict(self, problem_ids=None):
+        """problem_ids: 调用方已批量查出的题目列表，不传时单独查询"""
+        if problem_ids is None:
+            problem_ids = self.question_ids()
         return {
             'id': self.id,
             'title': self.title,
@@ -27,14 +55,25 @@ class Test(db.Model):
             'estimated_time': self.estimated_time,
             'topics': self.topics.split(',') if self.topics else [],
             'difficulty': self.difficulty,
-            'problem_ids': [int(pid) for pid in self.problem_ids.split(',')] if self.problem_ids else [],
+            'problem_ids': problem_ids,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'deadline': self.deadline.isoformat() if self.deadline else None,
             'created_by': self.created_by
         }
 
+def test_hash_for(title, type, problem_ids):
+    """测试指纹：标题、类型和题目列表相同即视为同一份测试，problem_ids 为ID列表或逗号分隔的字符串"""
+    if not isinstance(problem_ids, str) and problem_ids is not None:
+        problem_ids = ','.join(map(str, problem_ids))
+    raw = json.dumps([title, type, problem_ids or ''], ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
 class TestQuestion(db.Model):
+    """测试的题目组成（唯一来源），order 从1开始"""
     __tablename__ = 'test_questions'
+    __table_args__ = (
+        db.Index('ix_test_questions_test_order', 'test_id', 'order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
@@ -49,9 +88,42 @@ class TestQuestion(db.Model):
             'order': self.order
         }
 
+def load_question_ids(test_ids):
+    """批量读取多份测试的题目列表 {测试ID: [题目ID]}，一条按 (test_id, order) 索引排序的查询"""
+    table = TestQuestion.__table__
+    result = {}
+    if not test_ids:
+        return result
+    rows = db.session.execute(
+        select(table.c.test_id, table.c.problem_id)
+        .where(table.c.test_id.in_(list(test_ids)))
+        .order_by(table.c.test_id, table.c.order)
+    )
+    for test_id, problem_id in rows:
+        result.setdefault(test_id, []).append(problem_id)
+    return result
+
+def save_questions(test_id, problem_ids):
+    """替换一份测试的题目（不提交），一条批量 INSERT"""
+    table = TestQuestion.__table__
+    db.session.execute(table.delete().where(table.c.test_id == test_id))
+    if problem_ids:
+        db.session.execute(table.insert(), [
+            {'test_id': test_id, 'problem_id': problem_id, 'order': order}
+            for order, problem_id in enumerate(problem_ids, 1)
+        ])
+
 class TestSubmission(db.Model):
     """测试提交记录"""
     __tablename__ = 'test_submissions'
+    __table_args__ = (
+        # 测试列表外连接当前用户的提交记录判断是否完成
+        db.Index('ix_test_submissions_user_test', 'user_id', 'test_id'),
+        # 按测试统计提交
+        db.Index('ix_test_submissions_test', 'test_id'),
+        # 写后队列的回执号，重放日志时据此去重
+        db.Index('uq_test_submissions_receipt', 'receipt', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
@@ -60,6 +132,9 @@ class TestSubmission(db.Model):
     answers = db.Column(db.Text, nullable=False)  # JSON格式存储答案
     duration = db.Column(db.Integer, default=0)  # 做题时长（秒）
     submit_time = db.Column(db.DateTime, default=datetime.utcnow)
+    paper_version = db.Column(db.Integer)  # 作答的试卷快照版本
+    result_json = db.Column(db.Text)  # 提交时生成的结果页JSON（判分结果、知识点统计、题目详情）
+    receipt = db.Column(db.String(32))  # 写后队列的回执号，同步提交时为空
     
     def to_dict(self):
         return {
@@ -72,48 +147,167 @@ class TestSubmission(db.Model):
             'answers': self.answers
         }
 
+class SubmissionAnswer(db.Model):
+    """测试提交中每道题的作答，试卷中的每道题一行（未作答的题 answer 为空）"""
+    __tablename__ = 'submission_answers'
+    __table_args__ = (
+        db.Index('ix_submission_answers_problem', 'problem_id'),
+        db.Index('ix_submission_answers_submission', 'submission_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, db.ForeignKey('test_submissions.id'), nullable=False)
+    problem_id = db.Column(db.Integer, db.ForeignKey('problems.id'), nullable=False)
+    answer = db.Column(db.Text)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+    time_spent = db.Column(db.Integer)  # 该题用时（秒），客户端未上报时为空
+
+class TestSnapshot(db.Model):
+    """发布后的学生试卷快照，生成后不再修改，重新发布时生成新版本"""
+    __tablename__ = 'test_snapshots'
+    __table_args__ = (
+        db.Index('uq_test_snapshots_test_version', 'test_id', 'version', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    problem_ids = db.Column(db.Text, nullable=False)  # 发布时的题目ID列表（逗号分隔），判分按此列表
+    payload = db.Column(db.LargeBinary, nullable=False)  # 序列化好的试卷JSON
+    payload_gzip = db.Column(db.LargeBinary)  # gzip 压缩后的试卷，试卷较小时为空
+    etag = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TestDraft(db.Model):
+    """学生正在作答的测试（每人每个测试一份），作答内容追加写入 test_draft_entries，交卷后删除"""
+    __tablename__ = 'test_drafts'
+    __table_args__ = (
+        db.Index('uq_test_drafts_test_user', 'test_id', 'user_id', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    paper_version = db.Column(db.Integer)  # 作答的试卷快照版本
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    time_spent = db.Column(db.Text)  # 每道题的累计作答用时 JSON {题目ID: 秒}，以最后一次上报为准
+
+class TestDraftEntry(db.Model):
+    """草稿作答日志，只追加不修改；同一道题以最后一条为准，被覆盖的记录定期压缩掉"""
+    __tablename__ = 'test_draft_entries'
+    __table_args__ = (
+        db.Index('ix_test_draft_entries_draft', 'draft_id', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    draft_id = db.Column(db.Integer, db.ForeignKey('test_drafts.id'), nullable=False)
+    problem_id = db.Column(db.Integer, nullable=False)
+    answer = db.Column(db.Text)  # JSON 编码的答案，null 表示清空
+    elapsed = db.Column(db.Integer)  # 写入时已作答的时长（秒）
+
+# 分数段：(标签, 计数列, 下限)，按下限从高到低
+SCORE_BUCKETS = [
+    ('90-100', 'bucket_90', 90),
+    ('80-89', 'bucket_80', 80),
+    ('60-79', 'bucket_60', 60),
+    ('0-59', 'bucket_0', 0),
+]
+PASS_SCORE = 60
+
+def score_bucket(score):
+    """得分所在分数段的计数列"""
+    for _, column, lower in SCORE_BUCKETS:
+        if score >= lower:
+            return column
+    return SCORE_BUCKETS[-1][1]
+
 class TestResult(db.Model):
-    """测试整体统计结果"""
+    """
+    测试整体统计（每个测试一行）
+    - 提交测试时在同一事务中累加计数（completed_count、score_sum 等），读取时由累计值算出平均分、及格率和分数分布
+    - average_score 等派生字段是旧版按全量计算存储的结果，只在全量校验修复时写入，读取不再使用
+    """
     __tablename__ = 'test_results'
+    __table_args__ = (
+        db.Index('uq_test_results_test', 'test_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
-    total_students = db.Column(db.Integer, nullable=False)  # 总学生数
-    completed_count = db.Column(db.Integer, nullable=False)  # 完成人数
-    average_score = db.Column(db.Float, nullable=False)  # 平均分
-    average_time = db.Column(db.Integer, nullable=False)  # 平均用时（分钟）
-    completion_rate = db.Column(db.Float, nullable=False)  # 完成率
-    pass_rate = db.Column(db.Float, nullable=False)  # 及格率
-    score_distribution = db.Column(db.JSON, nullable=False)  # 分数分布
+    total_students = db.Column(db.Integer, nullable=False, default=0)  # 总学生数
+    completed_count = db.Column(db.Integer, nullable=False, default=0)  # 完成人数（提交次数）
+    average_score = db.Column(db.Float, nullable=False, default=0)  # 平均分
+    average_time = db.Column(db.Integer, nullable=False, default=0)  # 平均用时（分钟）
+    completion_rate = db.Column(db.Float, nullable=False, default=0)  # 完成率
+    pass_rate = db.Column(db.Float, nullable=False, default=0)  # 及格率
+    score_distribution = db.Column(db.JSON, nullable=False, default=dict)  # 分数分布
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)  # 最后更新时间
+    # 累计值
+    score_sum = db.Column(db.Float, nullable=False, default=0)  # 得分之和
+    duration_sum = db.Column(db.Integer, nullable=False, default=0)  # 用时之和（秒）
+    passed_count = db.Column(db.Integer, nullable=False, default=0)  # 及格次数
+    bucket_90 = db.Column(db.Integer, nullable=False, default=0)  # 各分数段的提交次数
+    bucket_80 = db.Column(db.Integer, nullable=False, default=0)
+    bucket_60 = db.Column(db.Integer, nullable=False, default=0)
+    bucket_0 = db.Column(db.Integer, nullable=False, default=0)
+    # 项目分析（全量重算时更新）
+    examinee_count = db.Column(db.Integer)  # 分析样本的学生数
+    reliability = db.Column(db.Float)  # Cronbach's alpha
+    score_quantiles = db.Column(db.JSON)  # 得分分位数 {'0.5': 中位数, ...}
+    analyzed_at = db.Column(db.DateTime)
     
     # 关联关系
     test = db.relationship('Test', backref=db.backref('result', uselist=False))
     
-    def to_dict(self):
+    def to_dict(self, total_students=None):
+        """由累计值计算统计结果，total_students 为当前学生总数"""
+        count = self.completed_count or 0
+        if total_students is None:
+            total_students = self.total_students
         return {
             'id': self.id,
             'test_id': self.test_id,
-            'total_students': self.total_students,
-            'completed_count': self.completed_count,
-            'average_score': self.average_score,
-            'average_time': self.average_time,
-            'completion_rate': self.completion_rate,
-            'pass_rate': self.pass_rate,
-            'score_distribution': self.score_distribution,
+            'total_students': total_students,
+            'completed_count': count,
+            'average_score': round(self.score_sum / count, 1) if count else 0,
+            'average_time': round(self.duration_sum / count / 60) if count else 0,  # 分钟
+            'completion_rate': round(count / total_students * 100, 1) if total_students else 0,
+            'pass_rate': round(self.passed_count / count * 100, 1) if count else 0,
+            'score_distribution': {label: getattr(self, column) or 0 for label, column, _ in SCORE_BUCKETS},
+            'item_analysis': {
+                'examinee_count': self.examinee_count,
+                'reliability': self.reliability,
+                'score_quantiles': self.score_quantiles,
+                'analyzed_at': self.analyzed_at.isoformat()
+            } if self.analyzed_at else None,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
 
 class QuestionStat(db.Model):
-    """测试中每道题的统计数据"""
+    """
+    测试中每道题的统计（每个测试每道题一行），提交测试时在同一事务中累加
+    correct_rate、average_time 是旧版存储的派生字段，读取时由累计值计算
+    """
     __tablename__ = 'question_stats'
+    __table_args__ = (
+        db.Index('uq_question_stats_test_question', 'test_id', 'question_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
     question_id = db.Column(db.Integer, db.ForeignKey('problems.id'), nullable=False)
-    correct_rate = db.Column(db.Float, nullable=False)  # 正确率
-    average_time = db.Column(db.Float, nullable=False)  # 平均用时（分钟）
+    correct_rate = db.Column(db.Float, nullable=False, default=0)  # 正确率
+    average_time = db.Column(db.Float, nullable=False, default=0)  # 平均用时（分钟）
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)  # 最后更新时间
+    # 累计值
+    answer_count = db.Column(db.Integer, nullable=False, default=0)  # 作答次数（含未作答）
+    correct_count = db.Column(db.Integer, nullable=False, default=0)  # 答对次数
+    time_sum = db.Column(db.Integer, nullable=False, default=0)  # 上报了用时的作答的用时之和（秒）
+    timed_count = db.Column(db.Integer, nullable=False, default=0)  # 上报了用时的作答次数
+    # 项目分析（全量重算时更新）
+    difficulty = db.Column(db.Float)  # 难度（分析样本中的答对比例）
+    discrimination = db.Column(db.Float)  # 区分度（高分组与低分组答对比例之差）
+    point_biserial = db.Column(db.Float)  # 校正后的点二列相关
     
     # 关联关系
     test = db.relationship('Test', backref=db.backref('question_stats', lazy='dynamic'))
@@ -124,7 +318,32 @@ class QuestionStat(db.Model):
             'id': self.id,
             'test_id': self.test_id,
             'question_id': self.question_id,
-            'correct_rate': self.correct_rate,
-            'average_time': self.average_time,
+            'correct_rate': round(self.correct_count / self.answer_count, 2) if self.answer_count else 0,
+            'average_time': round(self.time_sum / self.timed_count / 60, 1) if self.timed_count else 0,  # 分钟
+            'difficulty': self.difficulty,
+            'discrimination': self.discrimination,
+            'point_biserial': self.point_biserial,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
-        } 
\ No newline at end of file
+        }
+
+
+class AnswerStat(db.Model):
+    """
+    测试中每道题各个答案的作答次数（每个测试每道题每个答案一行），提交测试时在同一事务中更新
+    - 选择题：每个选项被选择的次数，精确计数
+    - 填空题：答错的答案按答案键归并，每道题最多保留固定个数（Space-Saving），
+      count 是次数的上界，count - error 是下界
+    """
+    __tablename__ = 'answer_stats'
+    __table_args__ = (
+        db.Index('uq_answer_stats_test_question_key', 'test_id', 'question_id', 'answer_key', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    test_id = db.Column(db.Integer, db.ForeignKey('tests.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('problems.id'), nullable=False)
+    answer_key = db.Column(db.String(200), nullable=False)  # 答案的规范形式
+    answer = db.Column(db.String(200), nullable=False)  # 展示用的写法（选择题为选项原文，填空题为第一次出现时的写法）
+    count = db.Column(db.Integer, nullable=False, default=0)  # 作答次数（上界）
+    error = db.Column(db.Integer, nullable=False, default=0)  # 替换进来时继承的次数，0 表示精确
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
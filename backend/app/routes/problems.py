@@ -1,46 +1,53 @@
 from flask import Blueprint, jsonify, request
-from app.models import db, Problem, UserProblemStatus, DailyUserSubmission, User
+from app.models import db, Problem, User
+from app.models.problem import content_hash_for
+from app.services.problem_service import list_problems, search_problems, DEFAULT_PAGE_SIZE
+from app.services.search_service import index_problem
+from app.services.grading import grade_answer
+from app.services.similarity import update_related_for, load_related
+from app.services.recommender import next_problems, DEFAULT_LIMIT, MAX_LIMIT
+from app.services.practice_service import submit_batch, record_answer, MAX_BATCH_SIZE
+from app.cache import cache
+from app.models.data_version import bump_version
+from app.utils.etag import conditional_get
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-import json
 
 bp = Blueprint('problems', __name__, url_prefix='/api/problems')
 
 @bp.route('', methods=['GET'])
 @jwt_required()
+@conditional_get('problems')
 def get_problems():
-    """获取所有题目列表"""
+    """
+    获取题目列表（分页）
+    - 查询参数: type, difficulty, topic, q(关键词), sort(id/difficulty/created_at，'-'前缀表示降序),
+      cursor(上一页返回的 next_cursor), limit(每页数量，最大100)
+    - 返回当前页题目、下一页游标、总数以及各维度的分面计数
+    """
     try:
-        print("\n=== 开始处理获取题目列表请求 ===")
-        print("请求头:", dict(request.headers))
-        print("Authorization头:", request.headers.get('Authorization'))
-        
         current_user_id = get_jwt_identity()
         if not current_user_id:
             print("未找到用户ID")
             return jsonify({'error': '未找到用户信息'}), 401
-            
-        print(f"当前用户ID: {current_user_id}")
-        
-        # 获取所有题目
-        problems = Problem.query.all()
-        print(f"从数据库查询到 {len(problems)} 个题目")
-        
-        if not problems:
-            print("没有找到任何题目")
-            return jsonify([])
-        
-        result = [{
-            'id': problem.id,
-            'title': problem.title,
-            'content': problem.content,
-            'type': problem.type,
-            'difficulty': problem.difficulty,
-            'topics': problem.topics.split(',') if problem.topics else [],
-            'options': json.loads(problem.options) if problem.options else None
-        } for problem in problems]
-        
-        print(f"返回 {len(result)} 个题目数据")
+
+        filters = {
+            'type': request.args.get('type'),
+            'difficulty': request.args.get('difficulty', type=int),
+            'topic': request.args.get('topic'),
+            'q': (request.args.get('q') or '').strip()
+        }
+
+        try:
+            result = list_problems(
+                filters,
+                sort=request.args.get('sort'),
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        print(f"返回 {len(result['problems'])} 个题目数据，共 {result['total']} 个")
         return jsonify(result)
         
     except Exception as e:
@@ -51,24 +58,94 @@ def get_problems():
         print(f"错误堆栈:\n{traceback.format_exc()}")
         return jsonify({'error': '获取题目列表失败', 'msg': str(e)}), 500
 
+@bp.route('/search', methods=['GET'])
+@jwt_required()
+def search():
+    """
+    全文检索题目
+    - 查询参数: q(关键词，空格分隔表示同时包含), type, difficulty, topic, limit, offset
+    - 按相关度排序，返回高亮后的标题和题干片段
+    """
+    try:
+        keywords = (request.args.get('q') or '').strip()
+        if not keywords:
+            return jsonify({'error': '请输入搜索关键词'}), 400
+
+        filters = {
+            'type': request.args.get('type'),
+            'difficulty': request.args.get('difficulty', type=int),
+            'topic': request.args.get('topic')
+        }
+        result = search_problems(
+            keywords,
+            filters,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify(result)
+    except Exception as e:
+        print(f"Error searching problems: {e}")
+        return jsonify({'error': '搜索题目失败', 'msg': str(e)}), 500
+
+@bp.route('/next', methods=['GET'])
+@jwt_required()
+@conditional_get('problems', 'user:{user}')
+def get_next_problems():
+    """
+    推荐下一批练习题
+    - 查询参数: limit(默认5，最多20), exclude(逗号分隔的题目ID，已展示过的不再推荐)
+    - 优先推荐薄弱知识点下难度合适、还没做对的题目
+    """
+    try:
+        user_id = get_jwt_identity()
+        limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+        try:
+            exclude = [int(pid) for pid in request.args.get('exclude', '').split(',') if pid.strip()]
+        except ValueError:
+            return jsonify({'error': 'Invalid exclude'}), 400
+
+        problems = next_problems(user_id, limit, exclude)
+        return jsonify({'problems': problems})
+    except Exception as e:
+        print(f"Error recommending problems: {e}")
+        db.session.rollback()
+        return jsonify({'error': '获取推荐题目失败', 'msg': str(e)}), 500
+
 @bp.route('/<int:problem_id>', methods=['GET'])
+@conditional_get('problems')
 def get_problem(problem_id):
     """获取单个题目的详细信息"""
     try:
-        problem = Problem.query.get_or_404(problem_id)
-        return jsonify({
-            'id': problem.id,
-            'title': problem.title,
-            'content': problem.content,
-            'type': problem.type,
-            'options': json.loads(problem.options) if problem.options else [],  # 解析JSON字符串
-            'topics': problem.topics.split(',') if problem.topics else [],
-            'difficulty': problem.difficulty
-        })
+        def build():
+            # 直接使用写入时生成的题目JSON片段
+            return Problem.query.get_or_404(problem_id).public_fragment()
+
+        return cache.json_response(f'problem:{problem_id}', [f'problem:{problem_id}'], build)
     except Exception as e:
         print(f"Error fetching problem: {e}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:problem_id>/related', methods=['GET'])
+@conditional_get('problems')
+def get_related_problems(problem_id):
+    """获取相似题目（写入时预先计算，直接读取）"""
+    try:
+        if not db.session.query(Problem.id).filter_by(id=problem_id).first():
+            return jsonify({'error': 'Problem not found'}), 404
+
+        def tags(data):
+            # 相似题目的标题等信息变化时也要失效
+            return [f'related:{problem_id}', f'problem:{problem_id}'] + [f"problem:{r['id']}" for r in data['related']]
+
+        return cache.json_response(
+            f'related:{problem_id}',
+            tags,
+            lambda: {'problem_id': problem_id, 'related': load_related(problem_id)}
+        )
+    except Exception as e:
+        print(f"Error fetching related problems: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/', methods=['POST'])
 def create_problem():
     """
@@ -79,18 +156,28 @@ def create_problem():
     - TODO: 应该添加JWT认证和教师权限验证
     """
     data = request.get_json()
+    content_hash = content_hash_for(data['type'], data['content'], data.get('options'))
+    existing = Problem.query.filter_by(content_hash=content_hash).first()
+    if existing:
+        return jsonify({'error': '题库中已有相同的题目', 'id': existing.id}), 409
     problem = Problem(
         title=data['title'],
         content=data['content'],
         type=data['type'],
         difficulty=data['difficulty'],
-        topics=','.join(data['topics']),
         options=data.get('options'),
         correct_answer=data['correctAnswer'],
         explanation=data.get('explanation')
     )
+    problem.set_topics(data['topics'])
     db.session.add(problem)
+    db.session.flush()
+    index_problem(problem)
+    bump_version('problems')
+    # 增量更新相似题目（新题目的邻居，以及新题目挤进其邻居列表的题目）
+    changed = update_related_for(problem)
     db.session.commit()
+    cache.invalidate(f'problem:{problem.id}', *[f'related:{pid}' for pid in changed])
     return jsonify({'id': problem.id}), 201
 
 @bp.route('/<int:id>/submit', methods=['POST'])
@@ -113,44 +200,12 @@ def submit_answer(id):
         problem = Problem.query.get_or_404(id)
         print(f"Problem found: {problem.id}, correct answer: {problem.correct_answer}")
         
-        # 检查答案正确性
-        is_correct = answer == problem.correct_answer
+        # 检查答案正确性（按规范形式比较，1/4 与 0.25 视为相同）
+        is_correct = grade_answer(problem, answer)
         print(f"Answer is correct: {is_correct}")
         
-        # 更新或创建做题记录
-        status = UserProblemStatus.query.filter_by(
-            user_id=user_id,
-            problem_id=id
-        ).first()
-        
-        if not status:
-            status = UserProblemStatus(
-                user_id=user_id,
-                problem_id=id,
-                status='正确' if is_correct else '错误'
-            )
-            db.session.add(status)
-        else:
-            status.status = '正确' if is_correct else '错误'
-            status.submitted_at = datetime.utcnow()
-        
-        # 更新每日提交记录
-        today = datetime.now().date()
-        daily_submission = DailyUserSubmission.query.filter_by(
-            user_id=user_id,
-            submission_date=today
-        ).first()
-        
-        if not daily_submission:
-            daily_submission = DailyUserSubmission(
-                user_id=user_id,
-                submission_date=today,
-                count=1
-            )
-            db.session.add(daily_submission)
-        else:
-            daily_submission.count += 1
-        
+        # 更新做题记录和每日提交数（单条 upsert，并发提交安全）
+        record_answer(user_id, id, is_correct)
         db.session.commit()
         print(f"Status and daily submission updated successfully")
         
@@ -168,4 +223,39 @@ def submit_answer(id):
         print("Error in submit_answer:")
         print(traceback.format_exc())
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500 
+@bp.route('/submit-batch', methods=['POST'])
+@jwt_required()
+def submit_batch_answers():
+    """
+    批量提交练习答案
+    - 请求体: {"items": [{"problem_id": 1, "answer": "...", "answered_at": "ISO时间，可选"}]}
+    - 整批在一个事务中判分并保存，返回与提交顺序一致的逐题结果
+    """
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json()
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No items provided'}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({'error': f'At most {MAX_BATCH_SIZE} items per batch'}), 400
+
+        print(f"Processing batch submission for user {user_id}: {len(items)} items")
+        results = submit_batch(user_id, items)
+        db.session.commit()
+
+        graded = [r for r in results if 'error' not in r]
+        return jsonify({
+            'results': results,
+            'submitted': len(graded),
+            'correct_count': sum(1 for r in graded if r['correct']),
+            'failed': len(results) - len(graded)
+        })
+
+    except Exception as e:
+        import traceback
+        print("Error in submit_batch_answers:")
+        print(traceback.format_exc())
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -3,12 +3,14 @@ from werkzeug.utils import secure_filename
 import os
 import json
 from app.models.user import User
-from app.models.study_record import StudyRecord, StudyStatistics, UserKnowledgeStatus
+from app.models.study_record import StudyRecord, StudyStatistics, UserKnowledgeStatus, KnowledgePoint, problem_topics
 from app.models.problem import DailyUserSubmission, Problem, UserProblemStatus
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
-from sqlalchemy import func
+from sqlalchemy import func, case
+from app.models.data_version import bump_version
+from app.utils.etag import conditional_get
 
 bp = Blueprint('profile', __name__, url_prefix='/api/profile')
 
@@ -33,6 +35,7 @@ def upload_avatar():
         
         user = User.query.get(int(user_id))
         user.avatar_url = f"/uploads/{filename}"
+        bump_version(f'user:{user_id}')
         db.session.commit()
         
         return jsonify({'avatar_url': user.avatar_url})
@@ -41,6 +44,7 @@ def upload_avatar():
 
 @bp.route('/info', methods=['GET', 'PUT', 'PATCH'])
 @jwt_required()
+@conditional_get('user:{user}')
 def handle_profile():
     try:
         user_id = get_jwt_identity()
@@ -99,6 +103,7 @@ def handle_profile():
                     user.achievements = json.dumps(data['achievements'])
                 
                 print("User data before commit:", user.to_dict())
+                bump_version(f'user:{user_id}')
                 db.session.commit()
                 print("Database committed successfully")
                 
@@ -119,6 +124,7 @@ def handle_profile():
 
 @bp.route('/statistics', methods=['GET'])
 @jwt_required()
+@conditional_get('user:{user}')
 def get_statistics():
     user_id = get_jwt_identity()
     stats = StudyStatistics.query.filter_by(user_id=int(user_id)).first()
@@ -137,6 +143,7 @@ def get_statistics():
 
 @bp.route('/activity', methods=['GET'])
 @jwt_required()
+@conditional_get('user:{user}', daily=True)
 def get_activity():
     """获取用户的做题活动记录"""
     user_id = get_jwt_identity()
@@ -163,36 +170,30 @@ def get_activity():
 
 @bp.route('/knowledge_status', methods=['GET'])
 @jwt_required()
+@conditional_get('user:{user}', 'problems')
 def get_knowledge_status():
     """获取用户知识点掌握度数据"""
     try:
         user_id = get_jwt_identity()
         print(f"Getting knowledge status for user {user_id}")
         
-        # 获取用户所有做题记录
-        problem_statuses = UserProblemStatus.query.filter_by(user_id=user_id).all()
-        print(f"Found {len(problem_statuses)} problem statuses")
-        
-        # 统计每个知识点的正确率
-        knowledge_stats = {}
-        for status in problem_statuses:
-            problem = Problem.query.get(status.problem_id)
-            if not problem or not problem.topics:
-                continue
-                
-            topics = problem.topics.split(',')
-            for topic in topics:
-                topic = topic.strip()  # 去除可能的空格
-                if not topic:  # 跳过空字符串
-                    continue
-                    
-                if topic not in knowledge_stats:
-                    knowledge_stats[topic] = {'correct': 0, 'total': 0}
-                
-                knowledge_stats[topic]['total'] += 1
-                if status.status == '正确':
-                    knowledge_stats[topic]['correct'] += 1
+        # 通过知识点关联表一次性按知识点汇总做题记录
+        rows = db.session.query(
+            KnowledgePoint.name,
+            func.count(UserProblemStatus.id),
+            func.sum(case((UserProblemStatus.status == '正确', 1), else_=0))
+        ).join(
+            problem_topics, problem_topics.c.knowledge_id == KnowledgePoint.id
+        ).join(
+            UserProblemStatus, UserProblemStatus.problem_id == problem_topics.c.problem_id
+        ).filter(
+            UserProblemStatus.user_id == user_id
+        ).group_by(KnowledgePoint.name).all()
         
+        knowledge_stats = {
+            name: {'correct': int(correct or 0), 'total': total}
+            for name, total, correct in rows
+        }
         print(f"Knowledge stats: {knowledge_stats}")
         
         # 计算掌握度
@@ -213,6 +214,7 @@ def get_knowledge_status():
 
 @bp.route('/difficulty_distribution', methods=['GET'])
 @jwt_required()
+@conditional_get('user:{user}', 'problems')
 def get_difficulty_distribution():
     """获取用户不同难度题目的完成情况"""
     try:
@@ -1,17 +1,30 @@
-from flask import Blueprint, jsonify, request
-from app.models.test import Test, TestQuestion, TestSubmission
+from flask import Blueprint, jsonify, request, current_app, make_response
+from app.models.test import Test, TestSubmission, save_questions, load_question_ids
 from app.models.problem import Problem
 from app import db
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-import json
 from app.models.user import User
+from app.cache import cache
+from app.models.data_version import bump_version
+from app.utils.etag import conditional_get
+from app.services.test_service import (
+    list_student_tests, DEFAULT_PAGE_SIZE, get_test_statistics, calculate_test_statistics
+)
+from app.services.snapshot_service import publish_test, current_version, load_snapshot
+from app.services.result_service import load_latest_result
+from app.services.submission_service import resolve_paper, save_submission
+from app.services.submission_queue import submission_queue, QueueFull
+from app.services.assembly_service import parse_spec, assemble_test
+from app.services.draft_service import draft_store
+from app.services.stats_refresh import stats_refresher
 
 # 创建测试蓝图,设置URL前缀
 bp = Blueprint('tests', __name__, url_prefix='/api/tests')
 
 @bp.route('', methods=['GET', 'POST'])
 @jwt_required()
+@conditional_get('tests', 'user:{user}')
 def handle_tests():
     """处理测试相关的请求"""
     if request.method == 'GET':
@@ -56,49 +69,18 @@ def get_tests():
         current_user = User.query.get(user_id)
         if not current_user:
             return jsonify({'error': '用户不存在'}), 404
-            
-        # 根据用户角色获取不同的测试列表
-        if current_user.role == 'teacher':
+
+        if current_user.role != 'teacher':
+            return get_student_tests(user_id)
+
+        def build():
             # 教师只能看到自己创建的测试
-            tests = Test.query.filter_by(created_by=user_id).all()
-        else:
-            # 学生可以看到所有测试
-            tests = Test.query.all()
-            
-        print(f"从数据库查询到 {len(tests)} 个测试")
-        
-        if not tests:
-            print("没有找到任何测试")
-            return jsonify([])
-            
-        # 获取用户已完成的测试ID列表
-        completed_submissions = TestSubmission.query.filter_by(user_id=user_id).all()
-        completed_test_ids = {sub.test_id for sub in completed_submissions}
-        
-        # 构建测试列表，并标记是否完成
-        result = []
-        for test in tests:
-            test_data = {
-                'id': test.id,
-                'title': test.title,
-                'description': test.description,
-                'type': test.type,
-                'total_questions': test.total_questions,
-                'estimated_time': test.estimated_time,
-                'topics': test.topics.split(',') if test.topics else [],
-                'difficulty': test.difficulty,
-                'created_at': test.created_at.isoformat() if test.created_at else None,
-                'deadline': test.deadline.isoformat() if test.deadline else None,
-                'created_by': test.created_by,
-                'is_completed': test.id in completed_test_ids
-            }
-            result.append(test_data)
-            
-        # 对结果进行排序：未完成的在前，已完成的在后
-        result.sort(key=lambda x: (x['is_completed'], -datetime.fromisoformat(x['created_at']).timestamp() if x['created_at'] else 0))
-        
-        print(f"返回 {len(result)} 个测试数据")
-        return jsonify(result)
+            tests = Test.query.filter_by(created_by=user_id).order_by(Test.created_at.desc(), Test.id.desc()).all()
+            print(f"从数据库查询到 {len(tests)} 个测试")
+            questions = load_question_ids([test.id for test in tests])
+            return [{**test.to_dict(questions.get(test.id, [])), 'is_completed': False} for test in tests]
+
+        return cache.json_response(f'tests:user:{user_id}', ['tests', f'user-tests:{user_id}'], build)
         
     except Exception as e:
         print(f"\n!!! 获取测试列表时发生错误 !!!")
@@ -108,6 +90,41 @@ def get_tests():
         print(f"错误堆栈:\n{traceback.format_exc()}")
         return jsonify({'error': '获取测试列表失败', 'msg': str(e)}), 500
 
+def get_student_tests(user_id):
+    """
+    学生的测试列表（分页）
+    - 查询参数: status(pending/completed), type, deadline_from, deadline_to(ISO时间),
+      cursor(上一页返回的 next_cursor), limit(每页数量，最大100)
+    - 返回当前页测试、下一页游标、总数以及各状态标签页的数量
+    """
+    try:
+        filters = {
+            'type': request.args.get('type'),
+            'deadline_from': parse_datetime_arg('deadline_from'),
+            'deadline_to': parse_datetime_arg('deadline_to')
+        }
+    except ValueError:
+        return jsonify({'error': '截止日期格式错误'}), 400
+    status = request.args.get('status')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+
+    def build():
+        result = list_student_tests(user_id, filters, status=status, cursor=cursor, limit=limit)
+        print(f"返回 {len(result['tests'])} 个测试数据，共 {result['total']} 个")
+        return result
+
+    # 列表中的完成状态因人而异，按用户和查询参数缓存；新建测试或用户提交后失效
+    key = f'tests:user:{user_id}:' + '&'.join(f'{k}={v}' for k, v in sorted(request.args.items()))
+    try:
+        return cache.json_response(key, ['tests', f'user-tests:{user_id}'], build)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def parse_datetime_arg(name):
+    value = request.args.get(name)
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
 def create_test():
     """
     创建新测试
@@ -166,9 +183,14 @@ def create_test():
             return jsonify({'error': '难度和预计时间必须是数字'}), 400
             
         # 验证题目ID是否存在
-        problem_ids = [str(q['problemId']) for q in data['questions']]
-        problems = Problem.query.filter(Problem.id.in_([int(pid) for pid in problem_ids])).all()
-        if len(problems) != len(problem_ids):
+        try:
+            problem_ids = [int(q['problemId']) for q in data['questions']]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': '题目ID格式错误'}), 400
+        if len(set(problem_ids)) != len(problem_ids):
+            return jsonify({'error': '题目不能重复'}), 400
+        found = Problem.query.filter(Problem.id.in_(problem_ids)).count()
+        if found != len(problem_ids):
             print("部分题目ID不存在")
             return jsonify({'error': '部分题目不存在'}), 400
         
@@ -188,28 +210,26 @@ def create_test():
             difficulty=difficulty,
             deadline=deadline,
             estimated_time=estimated_time,
-            topics=','.join(data.get('topics', [])),
-            total_questions=len(data['questions']),
-            problem_ids=','.join(problem_ids)
+            total_questions=len(problem_ids)
         )
+        test.content_hash = test.build_content_hash(problem_ids)
+        test.set_topics(data.get('topics', []))
         
         print("创建测试记录:", test.__dict__)
         db.session.add(test)
-        db.session.commit()
+        db.session.flush()
         print(f"测试记录创建成功，ID: {test.id}")
         
-        # 添加测试题目关联
-        for i, q in enumerate(data['questions']):
-            test_question = TestQuestion(
-                test_id=test.id,
-                problem_id=q['problemId'],
-                order=i + 1  # 保持题目顺序
-            )
-            db.session.add(test_question)
-            print(f"添加题目 {q['problemId']} 到位置 {i+1}")
+        # 题目关联与测试在同一事务中批量写入，保持题目顺序
+        save_questions(test.id, problem_ids)
+        print(f"添加 {len(problem_ids)} 道题目")
         
+        # 创建即发布，生成第一版试卷快照
+        publish_test(test)
+        bump_version('tests')
         db.session.commit()
         print("题目关联创建成功")
+        cache.invalidate('tests')
         
         return jsonify({
             'id': test.id,
@@ -229,90 +249,183 @@ def create_test():
             'type': type(e).__name__
         }), 500
 
+@bp.route('/assemble', methods=['POST'])
+@jwt_required()
+def assemble():
+    """
+    自动组卷，返回草稿（不保存）
+    - 请求体: count(题目数量), type_counts({题型: 数量}), topics({知识点: 最少题数} 或知识点列表),
+      difficulty({mean, min, max}), time_budget(分钟), avoid_seen(避开自己布置过的题目), exclude(题目ID列表), seed
+    - 返回 {seed, summary(各项统计及未满足的条件), problems}
+    """
+    try:
+        user_id = get_jwt_identity()
+        current_user = User.query.get(user_id)
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'error': '只有教师可以组卷'}), 403
+
+        data = request.get_json() or {}
+        try:
+            spec = parse_spec(data)
+            seed = int(data['seed']) if data.get('seed') is not None else None
+            payload = assemble_test(spec, int(user_id), seed)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return current_app.response_class(payload, mimetype='application/json')
+    except Exception as e:
+        print(f"Error assembling test: {e}")
+        return jsonify({'error': '组卷失败', 'msg': str(e)}), 500
+
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_test_detail(id):
-    """获取单个测试的详细信息"""
+    """
+    获取学生试卷
+    - 直接返回发布时生成的快照，客户端支持 gzip 时返回预先压缩好的版本
+    - ETag 由快照版本决定，重新发布前一直有效
+    """
     try:
         user_id = get_jwt_identity()
         if not user_id:
             return jsonify({'error': '未找到用户信息'}), 401
-            
-        test = Test.query.get_or_404(id)
-        problem_ids = [int(pid) for pid in test.problem_ids.split(',')]
-        problems = Problem.query.filter(Problem.id.in_(problem_ids)).all()
-        
-        # 按照problem_ids的顺序排序problems
-        problems_dict = {p.id: p for p in problems}
-        ordered_problems = [problems_dict[pid] for pid in problem_ids]
-    
-        return jsonify({
-            'test_info': {
-                'id': test.id,
-                'title': test.title,
-                'description': test.description,
-                'type': test.type,
-                'total_questions': test.total_questions,
-                'estimated_time': test.estimated_time,
-                'topics': test.topics.split(',') if test.topics else [],
-                'difficulty': test.difficulty,
-                'created_at': test.created_at.isoformat() if test.created_at else None,
-                'deadline': test.deadline.isoformat() if test.deadline else None
-            },
-            'problems': [{
-                'id': p.id,
-                'title': p.title,
-                'content': p.content,
-                'type': p.type,
-                'options': json.loads(p.options) if p.options else None,
-                'topics': p.topics.split(',') if p.topics else []
-            } for p in ordered_problems]
-        })
+
+        version = current_version(id)
+        if version is None:
+            return jsonify({'error': '测试不存在'}), 404
+        etag, payload, payload_gzip, _ = load_snapshot(id, version)
+
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        elif payload_gzip is not None and 'gzip' in request.accept_encodings:
+            response = current_app.response_class(payload_gzip, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = current_app.response_class(payload, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Accept-Encoding')
+        return response
     except Exception as e:
         print(f"Error fetching test detail: {e}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:id>/publish', methods=['POST'])
+@jwt_required()
+def publish(id):
+    """重新发布测试：按当前题目生成新版本的试卷快照，已在作答的学生仍按原版本判分"""
+    try:
+        user_id = get_jwt_identity()
+        current_user = User.query.get(user_id)
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'error': '只有教师可以发布测试'}), 403
+        test = Test.query.get_or_404(id)
+        # 初始化的测试没有创建者，任何教师都可以发布
+        if test.created_by is not None and str(test.created_by) != str(user_id):
+            return jsonify({'error': '只能发布自己创建的测试'}), 403
+
+        snapshot = publish_test(test)
+        db.session.commit()
+        print(f"测试 {id} 已发布版本 {snapshot.version}")
+        return jsonify({'id': id, 'version': snapshot.version})
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error publishing test: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _invalid_submission(data):
+    """校验提交请求体中 duration、time_spent 的格式，不对时返回错误信息"""
+    duration = data.get('duration')
+    if duration is not None and (not isinstance(duration, int) or isinstance(duration, bool) or duration < 0):
+        return 'duration 必须是非负整数（秒）'
+    if not _valid_time_spent(data.get('time_spent')):
+        return 'time_spent 必须是 {题目ID: 秒}'
+    return None
+
+
+def _valid_time_spent(time_spent):
+    """每道题的作答用时 {题目ID: 秒}，可以省略"""
+    return time_spent is None or (
+        isinstance(time_spent, dict)
+        and all(_is_number(seconds) and seconds >= 0 for seconds in time_spent.values())
+    )
+
+
 @bp.route('/<int:id>/submit', methods=['POST'])
 @jwt_required()
 def submit_test(id):
-    """提交测试答案"""
+    """
+    提交测试答案
+    - 请求体: answers({题目ID: 答案}), duration(秒), version(试卷版本，可选), time_spent({题目ID: 秒}，可选)
+    - 有自动保存的草稿时以草稿为基础合并请求中的答案（请求中可以省略 answers），提交后删除草稿
+    - 同步模式直接返回得分；队列模式（SUBMISSION_MODE=queue）写入提交日志后返回 202 和回执号，
+      客户端通过 /api/tests/submissions/<回执号> 查询处理结果
+    """
     try:
         user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request.get_json() or {}
         
-        if not data or 'answers' not in data:
+        if 'answers' in data and not isinstance(data['answers'], dict):
             return jsonify({'error': 'No answers provided'}), 400
-            
-        test = Test.query.get_or_404(id)
-        problems = Problem.query.filter(Problem.id.in_([int(pid) for pid in test.problem_ids.split(',')])).all()
-        problems_dict = {str(p.id): p for p in problems}
-        
-        # 计算得分
-        total_questions = len(problems)
-        correct_count = 0
-        for problem_id, answer in data['answers'].items():
-            if problem_id in problems_dict:
-                if str(answer) == str(problems_dict[problem_id].correct_answer):
-                    correct_count += 1
-        
-        score = round((correct_count / total_questions) * 100, 1)  # 四舍五入到一位小数
-        
-        # 保存提交记录
-        submission = TestSubmission(
-            test_id=id,
-            user_id=user_id,
-            score=score,
-            answers=json.dumps(data['answers']),
-            duration=data.get('duration', 0)  # 添加做题时长
-        )
-        db.session.add(submission)
+        # 队列模式下提交先写入日志、之后才保存，格式不对的提交在这里拒绝，不能进入队列
+        error = _invalid_submission(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        # 以自动保存的草稿为基础，请求中的答案优先
+        draft = draft_store.load(id, user_id)
+        if draft is None and 'answers' not in data:
+            return jsonify({'error': 'No answers provided'}), 400
+        answers = dict(draft['answers']) if draft else {}
+        answers.update(data.get('answers') or {})
+        # 每道题的用时同样以草稿为基础，请求中的优先
+        time_spent = dict(draft['time_spent']) if draft else {}
+        time_spent.update(data.get('time_spent') or {})
+
+        # 按学生作答的试卷版本判分，未指定时使用草稿或当前发布的版本
+        try:
+            version, _ = resolve_paper(id, data.get('version') or (draft and draft['version']))
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        item = {
+            'test_id': id,
+            'user_id': int(user_id),
+            'answers': answers,
+            'duration': data.get('duration') or (draft['duration'] if draft else 0),  # 做题时长
+            'version': version,
+            'time_spent': time_spent or None
+        }
+
+        if submission_queue.enabled:
+            try:
+                receipt = submission_queue.enqueue(item)
+            except QueueFull:
+                response = jsonify({'error': '提交人数过多，请稍后重试'})
+                response.headers['Retry-After'] = '5'
+                return response, 503
+            # 提交已写入日志，草稿不再需要
+            draft_store.discard(id, user_id)
+            db.session.commit()
+            return jsonify({'receipt': receipt, 'status': 'queued'}), 202
+
+        # 先删除草稿再写入提交：discard 要等草稿的写锁，持有写锁的刷新线程又在等数据库写锁，
+        # 本请求写入提交（持有数据库写锁）之后再等草稿写锁会互相等待，直到数据库忙等超时
+        draft_store.discard(id, user_id)
+        summary, tags = save_submission(item)
         db.session.commit()
+        cache.invalidate(*tags)
         
         return jsonify({
-            'score': score,
-            'correct_count': correct_count,
-            'total_questions': total_questions,
-            'duration': data.get('duration', 0)
+            'score': summary['score'],
+            'correct_count': summary['correct_count'],
+            'total_questions': summary['total_questions'],
+            'duration': summary['duration']
         })
         
     except Exception as e:
@@ -320,89 +433,137 @@ def submit_test(id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<int:id>/draft', methods=['GET', 'PUT'])
+@jwt_required()
+def handle_draft(id):
+    """
+    作答草稿（自动保存）
+    - PUT 请求体: answers({题目ID: 答案}，只需包含上次保存后变化的题目，null 表示清空), elapsed(已作答秒数), version(试卷版本),
+      time_spent({题目ID: 秒}，每道题的累计用时，完整的一份)
+    - GET 返回 {version, answers, duration, time_spent}，没有草稿时返回 404
+    """
+    try:
+        user_id = get_jwt_identity()
+        if request.method == 'GET':
+            draft = draft_store.load(id, user_id)
+            if draft is None:
+                return jsonify({'error': '没有作答草稿'}), 404
+            return jsonify(draft)
+
+        data = request.get_json() or {}
+        answers = data.get('answers')
+        if not isinstance(answers, dict):
+            return jsonify({'error': 'No answers provided'}), 400
+        try:
+            version, problem_ids = resolve_paper(id, data.get('version'))
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        paper = {str(pid) for pid in problem_ids}
+        if any(str(pid) not in paper for pid in answers):
+            return jsonify({'error': '题目不在试卷中'}), 400
+        time_spent = data.get('time_spent')
+        if not _valid_time_spent(time_spent):
+            return jsonify({'error': 'time_spent 必须是 {题目ID: 秒}'}), 400
+        if time_spent is not None:
+            time_spent = {pid: int(seconds) for pid, seconds in time_spent.items() if pid in paper}
+        elapsed = data.get('elapsed')
+        draft_store.record(id, user_id, version, answers, elapsed if isinstance(elapsed, int) else None, time_spent)
+        return jsonify({'saved': len(answers)})
+    except Exception as e:
+        print(f"Error saving draft: {e}")
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/submissions/<receipt>', methods=['GET'])
+@jwt_required()
+def get_submission_status(receipt):
+    """查询排队提交的处理状态: queued / done（附带得分） / failed（附带错误信息）"""
+    try:
+        status = submission_queue.status(receipt, get_jwt_identity())
+        if status is None:
+            return jsonify({'error': '未找到提交记录'}), 404
+        return jsonify(status)
+    except Exception as e:
+        print(f"Error fetching submission status: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/<int:test_id>/result', methods=['GET'])
 @jwt_required()
 def get_test_result(test_id):
-    """获取测试结果"""
+    """获取测试结果：直接返回提交时保存的结果"""
     try:
         current_user_id = get_jwt_identity()
         
-        # 获取测试信息
-        test = Test.query.get_or_404(test_id)
-        
-        # 获取最新的提交记录
-        submission = TestSubmission.query.filter_by(
-            test_id=test_id,
-            user_id=current_user_id
-        ).order_by(TestSubmission.submit_time.desc()).first()
-        
-        if not submission:
+        payload = load_latest_result(test_id, current_user_id)
+        if payload is None:
             return jsonify({'error': '未找到测试提交记录'}), 404
-            
-        # 获取用户答案
-        user_answers = json.loads(submission.answers)
-        
-        # 获取题目详情和正确答案
-        problem_ids = [int(x) for x in test.problem_ids.split(',')]
-        problems_details = []
-        topic_stats = {}  # 知识点统计
-        
-        for pid in problem_ids:
-            problem = Problem.query.get(pid)
-            if not problem:
-                continue
-                
-            # 处理每个题目的知识点统计
-            if problem.topics:
-                for topic in problem.topics.split(','):
-                    if topic not in topic_stats:
-                        topic_stats[topic] = {'correct': 0, 'total': 0}
-                    topic_stats[topic]['total'] += 1
-                    if str(user_answers.get(str(pid))) == str(problem.correct_answer):
-                        topic_stats[topic]['correct'] += 1
-            
-            problems_details.append({
-                'id': problem.id,
-                'title': problem.title,
-                'content': problem.content,
-                'type': problem.type,
-                'options': json.loads(problem.options) if problem.options else None,
-                'topics': problem.topics.split(',') if problem.topics else [],
-                'user_answer': user_answers.get(str(pid)),
-                'correct_answer': problem.correct_answer,
-                'explanation': problem.explanation,
-                'is_correct': str(user_answers.get(str(pid))) == str(problem.correct_answer)
-            })
-        
-        # 计算知识点掌握度
-        topic_mastery = {}
-        weak_topics = []
-        for topic, stats in topic_stats.items():
-            if stats['total'] > 0:
-                accuracy = stats['correct'] / stats['total']
-                topic_mastery[topic] = round(accuracy * 100, 2)
-                if accuracy < 0.6:  # 低于60%认为是薄弱知识点
-                    weak_topics.append({
-                        'topic': topic,
-                        'accuracy': accuracy * 100
-                    })
-        
-        return jsonify({
-            'test_info': test.to_dict(),
-            'submission_info': {
-                'score': submission.score,
-                'submit_time': submission.submit_time.isoformat(),
-                'duration': submission.duration,
-                'correct_count': sum(1 for p in problems_details if p['is_correct']),
-                'total_count': len(problems_details)
-            },
-            'topic_analysis': {
-                'topic_mastery': topic_mastery,
-                'weak_topics': sorted(weak_topics, key=lambda x: x['accuracy'])
-            },
-            'problems': problems_details
-        })
+        return current_app.response_class(payload, mimetype='application/json')
         
     except Exception as e:
         print(f"Error getting test result: {e}")
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<int:test_id>/statistics', methods=['GET'])
+@jwt_required()
+def get_test_stats(test_id):
+    """获取测试的统计数据（提交时累加的统计，读取一行）"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'success': False, 'message': '只有教师可以查看测试统计'}), 403
+        stats = get_test_statistics(test_id)
+        if not stats:
+            return jsonify({'success': False, 'message': '未找到测试或暂无统计数据'}), 404
+        return jsonify({'success': True, 'data': stats})
+    except Exception as e:
+        print(f"Error fetching test statistics: {e}")
+        return jsonify({'success': False, 'message': f'获取测试统计数据失败: {str(e)}'}), 500
+
+@bp.route('/<int:test_id>/statistics/refresh', methods=['POST'])
+@jwt_required()
+def refresh_test_stats(test_id):
+    """按提交记录全量重算测试统计，修复与累计值不一致的部分"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'success': False, 'message': '只有教师可以刷新测试统计'}), 403
+        stats = calculate_test_statistics(test_id)
+        if not stats:
+            return jsonify({'success': False, 'message': '未找到测试或暂无提交记录'}), 404
+        return jsonify({'success': True, 'data': stats})
+    except Exception as e:
+        print(f"Error refreshing test statistics: {e}")
+        return jsonify({'success': False, 'message': f'刷新测试统计数据失败: {str(e)}'}), 500
+
+@bp.route('/statistics/refresh-all', methods=['POST'])
+@jwt_required()
+def refresh_all_test_stats():
+    """在后台重算所有测试的统计，返回任务ID（202），已有任务在运行时返回该任务"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'success': False, 'message': '只有教师可以刷新测试统计'}), 403
+        job, created = stats_refresher.start()
+        print(f"测试统计重算任务 {job['id']} {'已启动' if created else '正在运行'}")
+        return jsonify({'success': True, 'data': job}), 202
+    except Exception as e:
+        print(f"Error starting statistics refresh: {e}")
+        return jsonify({'success': False, 'message': f'刷新所有测试统计数据失败: {str(e)}'}), 500
+
+@bp.route('/statistics/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_stats_refresh_job(job_id):
+    """查询统计重算任务的进度"""
+    try:
+        current_user = User.query.get(get_jwt_identity())
+        if not current_user or current_user.role != 'teacher':
+            return jsonify({'success': False, 'message': '只有教师可以查看统计任务'}), 403
+        job = stats_refresher.status(job_id)
+        if job is None:
+            return jsonify({'success': False, 'message': '未找到统计任务'}), 404
+        return jsonify({'success': True, 'data': job})
+    except Exception as e:
+        print(f"Error fetching statistics job: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,203 @@
+"""
+每道题的答案分布与常见错误（教师端测试分析的 option_counts / common_mistakes）
+- 选择题：统计每个选项被选择的次数；学生答案按答案键对应到选项，选项数有限，精确计数
+- 填空题：答错的答案按答案键归并（"1/4" 与 "0.25" 算同一个答案），每道题最多保留 SKETCH_SIZE 个答案（Space-Saving）：
+  新答案在已满时替换次数最少的一个，继承其次数并记为误差。count 是次数的上界，count - error 是下界，
+  次数超过该题答错总数 1/SKETCH_SIZE 的答案一定在其中，占用的行数与提交数无关
+- 提交时与测试统计在同一事务中增量更新，每次提交固定几条查询；更新在 test_results 的 upsert 之后执行，
+  同一测试的提交在该行上排队，读取后替换不会交错
+- 统计包括每个学生的全部提交；未作答的题目、解答题不统计
+"""
+from app import db
+from app.models.test import TestSubmission, SubmissionAnswer, AnswerStat
+from app.models.problem import Problem
+from app.services.grading import canonicalize, answer_key
+from sqlalchemy import bindparam, select
+from collections import Counter
+from datetime import datetime
+import json
+
+# 每道填空题保留的答案个数
+SKETCH_SIZE = 50
+# 教师端每道题展示的常见错误个数
+MISTAKE_LIMIT = 5
+# 答案键、展示写法的最大长度（与 answer_stats 的列宽一致），答案键更长的答案不统计
+MAX_LENGTH = 200
+
+CHOICE_TYPES = ('选择题', 'choice', 'multiple_choice')
+FILL_TYPES = ('填空题', 'fill', 'fill_blank')
+
+
+def load_options(raw):
+    """题目选项（JSON 数组）转成字符串列表，格式不对时返回空列表"""
+    try:
+        options = json.loads(raw) if raw else []
+    except ValueError:
+        return []
+    return [str(option) for option in options] if isinstance(options, list) else []
+
+
+def _option_keys(options):
+    """{答案键: 选项原文}，答案键相同的选项以第一个为准"""
+    keys = {}
+    for option in options:
+        keys.setdefault(canonicalize(option)[:MAX_LENGTH], option[:MAX_LENGTH])
+    return keys
+
+
+def classify(problem_type, option_keys, answer, is_correct):
+    """
+    一道题的作答计入哪个答案，返回 (答案键, 展示写法)，不统计时返回 None
+    - 选择题计入所选的选项（不论对错），不在选项中的答案不统计
+    - 填空题只统计答错的答案
+    """
+    if answer is None or not str(answer).strip():
+        return None
+    answer = str(answer)
+    if problem_type in CHOICE_TYPES and option_keys:
+        key = canonicalize(answer)[:MAX_LENGTH]
+        return (key, option_keys[key]) if key in option_keys else None
+    if problem_type in FILL_TYPES and not is_correct:
+        key = canonicalize(answer)
+        return (key, answer.strip()[:MAX_LENGTH]) if len(key) <= MAX_LENGTH else None
+    return None
+
+
+def _question_info(question_ids):
+    """{题目ID: (题型, {答案键: 选项原文})}"""
+    rows = db.session.query(Problem.id, Problem.type, Problem.options).filter(Problem.id.in_(question_ids))
+    return {row.id: (row.type, _option_keys(load_options(row.options))) for row in rows}
+
+
+def record_answer_stats(test_id, answer_rows):
+    """
+    把一次提交的作答累加到答案分布（不提交），在 record_submission_stats 中调用
+    - answer_rows: save_submission_answers 写入的每道题作答
+    - 已有的答案一条批量 UPDATE；新答案在未满时插入，已满的填空题替换次数最少的答案
+    """
+    info = _question_info([row['problem_id'] for row in answer_rows])
+    entries = {}  # 题目ID -> (答案键, 展示写法)
+    for row in answer_rows:
+        problem_type, option_keys = info.get(row['problem_id'], (None, {}))
+        entry = classify(problem_type, option_keys, row['answer'], row['is_correct'])
+        if entry is not None:
+            entries[row['problem_id']] = entry
+    if not entries:
+        return
+
+    now = datetime.utcnow()
+    table = AnswerStat.__table__
+    rows = db.session.execute(
+        select(table.c.id, table.c.question_id, table.c.answer_key)
+        .where(table.c.test_id == test_id, table.c.question_id.in_(list(entries)),
+               table.c.answer_key.in_({key for key, _ in entries.values()}))
+    )
+    hits = {row.question_id: row.id for row in rows if entries[row.question_id][0] == row.answer_key}
+    if hits:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id'))
+            .values(count=table.c.count + 1, last_updated=now),
+            [{'row_id': row_id} for row_id in hits.values()]
+        )
+
+    misses = {qid: entry for qid, entry in entries.items() if qid not in hits}
+    if not misses:
+        return
+    # 选择题的选项数有限，直接插入；填空题已满时替换次数最少的答案
+    full = {}  # 题目ID -> [(次数, 行ID)]
+    fill_misses = [qid for qid in misses if info[qid][0] not in CHOICE_TYPES]
+    if fill_misses:
+        rows = db.session.execute(
+            select(table.c.id, table.c.question_id, table.c.count)
+            .where(table.c.test_id == test_id, table.c.question_id.in_(fill_misses))
+        )
+        for row in rows:
+            full.setdefault(row.question_id, []).append((row.count, row.id))
+    inserts, replaces = [], []
+    for qid, (key, text) in misses.items():
+        monitored = full.get(qid, [])
+        if len(monitored) < SKETCH_SIZE:
+            inserts.append({'test_id': test_id, 'question_id': qid, 'answer_key': key, 'answer': text,
+                            'count': 1, 'error': 0, 'last_updated': now})
+        else:
+            count, row_id = min(monitored)
+            replaces.append({'row_id': row_id, 'new_key': key, 'new_answer': text,
+                             'new_count': count + 1, 'new_error': count})
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if replaces:
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('row_id')).values(
+                answer_key=bindparam('new_key'), answer=bindparam('new_answer'),
+                count=bindparam('new_count'), error=bindparam('new_error'), last_updated=now
+            ),
+            replaces
+        )
+
+
+def rebuild_answer_stats(test_ids):
+    """
+    按提交记录重建答案分布（不提交），迁移回填时调用
+    精确计数后每道填空题保留次数最多的 SKETCH_SIZE 个答案（误差为 0），之后的提交在此基础上继续增量更新
+    """
+    table = AnswerStat.__table__
+    db.session.execute(table.delete().where(table.c.test_id.in_(test_ids)))
+    rows = db.session.execute(
+        select(TestSubmission.test_id, SubmissionAnswer.problem_id,
+               SubmissionAnswer.answer, SubmissionAnswer.is_correct)
+        .join(TestSubmission, TestSubmission.id == SubmissionAnswer.submission_id)
+        .where(TestSubmission.test_id.in_(test_ids)).order_by(SubmissionAnswer.id)
+    ).all()
+    info = _question_info({row.problem_id for row in rows})
+    counts = {}  # (测试ID, 题目ID) -> Counter(答案键)
+    texts = {}  # (测试ID, 题目ID, 答案键) -> 第一次出现时的写法
+    for test_id, problem_id, answer, is_correct in rows:
+        problem_type, option_keys = info.get(problem_id, (None, {}))
+        entry = classify(problem_type, option_keys, answer, is_correct)
+        if entry is not None:
+            counts.setdefault((test_id, problem_id), Counter())[entry[0]] += 1
+            texts.setdefault((test_id, problem_id, entry[0]), entry[1])
+
+    now = datetime.utcnow()
+    inserts = []
+    for (test_id, problem_id), counter in counts.items():
+        keep = None if info[problem_id][0] in CHOICE_TYPES else SKETCH_SIZE
+        inserts.extend({'test_id': test_id, 'question_id': problem_id, 'answer_key': key,
+                        'answer': texts[test_id, problem_id, key],
+                        'count': count, 'error': 0, 'last_updated': now}
+                       for key, count in counter.most_common(keep))
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+
+
+def load_answer_stats(test_id):
+    """{题目ID: [(答案键, 展示写法, 次数, 误差)]}，按次数从多到少"""
+    rows = db.session.query(AnswerStat.question_id, AnswerStat.answer_key, AnswerStat.answer,
+                            AnswerStat.count, AnswerStat.error) \
+        .filter(AnswerStat.test_id == test_id).order_by(AnswerStat.count.desc(), AnswerStat.id)
+    result = {}
+    for question_id, key, answer, count, error in rows:
+        result.setdefault(question_id, []).append((key, answer, count, error))
+    return result
+
+
+def summarize_answers(problem, rows):
+    """
+    一道题的答案分布，返回 (选项分布, 常见错误)
+    - problem: 需要 type、options、answer_key、correct_answer
+    - 选项分布只有选择题有：按选项顺序 [{'option', 'count', 'is_correct'}]
+    - 常见错误：次数最多的 MISTAKE_LIMIT 个错误答案 [{'answer', 'count', 'error'}]，error 为 0 时次数精确
+    """
+    if problem is None:
+        return [], []
+    if problem.type in CHOICE_TYPES:
+        correct = (problem.answer_key or answer_key(problem.correct_answer) or '')[:MAX_LENGTH]
+        counts = {key: count for key, _, count, _ in rows}
+        option_counts = [{'option': option, 'count': counts.get(key, 0), 'is_correct': key == correct}
+                         for key, option in _option_keys(load_options(problem.options)).items()]
+        mistakes = [{'answer': item['option'], 'count': item['count'], 'error': 0}
+                    for item in sorted(option_counts, key=lambda item: -item['count'])
+                    if item['count'] and not item['is_correct']]
+        return option_counts, mistakes[:MISTAKE_LIMIT]
+    return [], [{'answer': answer, 'count': count, 'error': error}
+                for _, answer, count, error in rows[:MISTAKE_LIMIT]]
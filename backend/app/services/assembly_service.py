@@ -0,0 +1,446 @@
+"""
+自动组卷
+- 教师给出题目数量、各题型数量、知识点覆盖、难度（平均值和范围）、预计用时和需要避开的题目，从题库中选出一份草稿
+- 题库按 (题型, 难度) 和 (知识点, 难度) 预先分桶，连同每道题的预计用时缓存在进程内；题库版本（data_versions 中的 problems）变化后重建
+- 求解分两步：
+  * 贪心：先为每个知识点选题（题目少的知识点优先），再补足各题型数量，最后补足总数；
+    每一步只从相关的桶里随机抽取少量候选，按“覆盖未满足的知识点、难度接近剩余题目应有的平均难度、用时不超过剩余预算”打分取最好的
+  * 局部搜索：在不破坏题型数量和知识点覆盖的前提下，把已选题目换成同题型、难度或用时更合适的题目，直到平均难度和总用时满足要求
+- 每一步只看固定数量的候选，耗时与题库大小基本无关
+- 只返回草稿，不保存；教师调整后仍通过 POST /api/tests 创建
+"""
+from app import db
+from app.models.problem import Problem
+from app.models.test import Test, TestQuestion, SubmissionAnswer
+from app.models.study_record import KnowledgePoint, problem_topics, normalize_topics
+from app.models.data_version import get_versions
+from app.utils.json_codec import join_array, with_raw_field
+from sqlalchemy import func, select
+from collections import Counter, defaultdict
+from itertools import islice
+import random
+import threading
+
+MAX_QUESTIONS = 100
+DIFFICULTIES = range(1, 6)
+
+# 没有足够作答记录时按题型和难度估计每道题的用时（分钟）
+TYPE_MINUTES = {'选择题': 2, '填空题': 3, '解答题': 10}
+DEFAULT_MINUTES = 4
+DIFFICULTY_FACTOR = {1: 0.6, 2: 0.8, 3: 1.0, 4: 1.3, 5: 1.6}
+# 作答记录达到这个数量后改用实际平均用时
+MIN_TIMING_SAMPLES = 5
+
+# 每个桶抽取的候选数量，以及每一步最多比较的候选数量
+DRAWS_PER_BUCKET = 12
+SAMPLE_SIZE = 48
+
+# 覆盖一个未满足的知识点相当于难度相差多少
+TOPIC_WEIGHT = 10
+# 总用时超出预算的比例折算成多少难度差
+TIME_WEIGHT = 2
+
+LOCAL_SEARCH_STEPS = 400
+# 局部搜索连续这么多步没有改进就停止
+PATIENCE = 80
+# 平均难度与目标相差在这个范围内视为满足
+DIFFICULTY_TOLERANCE = 0.1
+
+
+def estimate_minutes(type_, difficulty, measured=None):
+    """一道题的预计用时（分钟）：有足够作答记录时用实际平均用时，否则按题型和难度估计"""
+    if measured is not None:
+        return measured / 60
+    return TYPE_MINUTES.get(type_, DEFAULT_MINUTES) * DIFFICULTY_FACTOR.get(difficulty, 1.0)
+
+
+class ProblemIndex:
+    """组卷用的题库索引，题目按加载顺序编号（位置），桶中存放位置"""
+
+    def __init__(self, version):
+        self.version = version
+        self.ids = []
+        self.types = []
+        self.difficulties = []
+        self.topics = []  # 每道题的知识点ID元组
+        self.minutes = []
+        self.position = {}  # 题目ID -> 位置
+        self.by_type = defaultdict(list)  # (题型, 难度) -> [位置]
+        self.by_topic = defaultdict(list)  # (知识点ID, 难度) -> [位置]
+        self.topic_ids = {}  # 知识点名称 -> ID
+        self.topic_names = {}
+
+    def load(self):
+        self.topic_ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+        self.topic_names = {kid: name for name, kid in self.topic_ids.items()}
+        timing = dict(
+            db.session.query(SubmissionAnswer.problem_id, func.avg(SubmissionAnswer.time_spent))
+            .filter(SubmissionAnswer.time_spent.isnot(None))
+            .group_by(SubmissionAnswer.problem_id)
+            .having(func.count(SubmissionAnswer.time_spent) >= MIN_TIMING_SAMPLES)
+        )
+        topics = defaultdict(list)
+        for problem_id, knowledge_id in db.session.execute(
+                select(problem_topics.c.problem_id, problem_topics.c.knowledge_id)):
+            topics[problem_id].append(knowledge_id)
+
+        rows = db.session.query(Problem.id, Problem.type, Problem.difficulty).order_by(Problem.id)
+        for pos, (problem_id, type_, difficulty) in enumerate(rows):
+            kids = tuple(topics.get(problem_id, ()))
+            self.ids.append(problem_id)
+            self.types.append(type_)
+            self.difficulties.append(difficulty)
+            self.topics.append(kids)
+            self.minutes.append(estimate_minutes(type_, difficulty, timing.get(problem_id)))
+            self.position[problem_id] = pos
+            self.by_type[(type_, difficulty)].append(pos)
+            for kid in kids:
+                self.by_topic[(kid, difficulty)].append(pos)
+        return self
+
+    def type_names(self):
+        return sorted({type_ for type_, _ in self.by_type}, key=_type_order)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """当前题库版本的索引，版本变化后重建"""
+    global _index
+    version = (str(db.engine.url), get_versions(['problems'])[0])
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = ProblemIndex(version).load()
+            print(f"组卷索引已重建: {len(_index.ids)} 道题目")
+        return _index
+
+
+def _type_order(type_):
+    """草稿中题目按 选择题、填空题、解答题 的顺序排列"""
+    order = list(TYPE_MINUTES)
+    return (order.index(type_) if type_ in order else len(order), type_)
+
+
+def parse_spec(data):
+    """校验组卷条件，格式错误时抛出 ValueError"""
+    try:
+        count = int(data.get('count') or 0)
+        type_counts = {}
+        for type_, n in (data.get('type_counts') or {}).items():
+            if int(n) > 0:
+                type_counts[str(type_)] = int(n)
+        topics = data.get('topics') or {}
+        if isinstance(topics, list):
+            topics = {name: 1 for name in normalize_topics(topics)}
+        topics = {str(name).strip(): int(n) for name, n in topics.items() if int(n) > 0}
+        difficulty = data.get('difficulty') or {}
+        low = int(difficulty.get('min', 1))
+        high = int(difficulty.get('max', 5))
+        mean = float(difficulty['mean']) if difficulty.get('mean') is not None else (low + high) / 2
+        time_budget = float(data['time_budget']) if data.get('time_budget') else None
+        exclude = [int(pid) for pid in data.get('exclude') or []]
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise ValueError('组卷条件格式错误')
+
+    if not 1 <= count <= MAX_QUESTIONS:
+        raise ValueError(f'题目数量必须在1-{MAX_QUESTIONS}之间')
+    if sum(type_counts.values()) > count:
+        raise ValueError('各题型数量之和超过题目数量')
+    if not 1 <= low <= high <= 5:
+        raise ValueError('难度范围必须在1-5之间')
+    if not low <= mean <= high:
+        raise ValueError('平均难度必须在难度范围内')
+    if time_budget is not None and time_budget <= 0:
+        raise ValueError('预计时间必须大于0')
+    return {
+        'count': count,
+        'type_counts': type_counts,
+        'topics': topics,
+        'difficulty_min': low,
+        'difficulty_max': high,
+        'difficulty_mean': mean,
+        'time_budget': time_budget,
+        'exclude': exclude,
+        'avoid_seen': bool(data.get('avoid_seen'))
+    }
+
+
+def seen_problem_ids(teacher_id):
+    """教师之前布置过的测试里的题目"""
+    query = db.session.query(TestQuestion.problem_id).join(Test, Test.id == TestQuestion.test_id) \
+        .filter(Test.created_by == teacher_id).distinct()
+    return {problem_id for problem_id, in query}
+
+
+class _Draft:
+    """组卷过程中的草稿：已选题目及各项计数"""
+
+    def __init__(self, index, spec, topic_need, blocked, rng):
+        self.index = index
+        self.rng = rng
+        self.count = spec['count']
+        self.low = spec['difficulty_min']
+        self.high = spec['difficulty_max']
+        self.target = spec['difficulty_mean']
+        self.budget = spec['time_budget']
+        self.type_need = spec['type_counts']
+        self.topic_need = topic_need
+        self.blocked = blocked
+        self.free = self.count - sum(self.type_need.values())  # 不限题型的名额
+        self.free_used = 0
+        self.selected = []
+        self.chosen = set()
+        self.type_count = Counter()
+        self.topic_count = Counter()
+        self.difficulty_sum = 0
+        self.minutes_sum = 0.0
+
+    # ---- 计数 ----
+
+    def _add(self, pos):
+        type_ = self.index.types[pos]
+        if self.type_count[type_] >= self.type_need.get(type_, 0):
+            self.free_used += 1
+        self.type_count[type_] += 1
+        self.topic_count.update(self.index.topics[pos])
+        self.difficulty_sum += self.index.difficulties[pos]
+        self.minutes_sum += self.index.minutes[pos]
+        self.selected.append(pos)
+        self.chosen.add(pos)
+
+    def _replace(self, old, new):
+        """同题型替换，题型计数不变"""
+        self.topic_count.subtract(self.index.topics[old])
+        self.topic_count.update(self.index.topics[new])
+        self.difficulty_sum += self.index.difficulties[new] - self.index.difficulties[old]
+        self.minutes_sum += self.index.minutes[new] - self.index.minutes[old]
+        self.selected[self.selected.index(old)] = new
+        self.chosen.discard(old)
+        self.chosen.add(new)
+
+    def _available(self, pos):
+        return pos not in self.chosen and pos not in self.blocked \
+            and self.low <= self.index.difficulties[pos] <= self.high
+
+    def _type_open(self, type_):
+        return self.type_count[type_] < self.type_need.get(type_, 0) or self.free_used < self.free
+
+    def _ideal_difficulty(self):
+        """剩余题目应有的平均难度"""
+        remaining = self.count - len(self.selected)
+        ideal = (self.target * self.count - self.difficulty_sum) / remaining
+        return min(max(ideal, self.low), self.high)
+
+    def _ideal_minutes(self):
+        """剩余题目平均每道可用的时间"""
+        if self.budget is None:
+            return None
+        return max(self.budget - self.minutes_sum, 0) / (self.count - len(self.selected))
+
+    def _difficulties_near(self, ideal):
+        return sorted(range(self.low, self.high + 1), key=lambda d: (abs(d - ideal), d))
+
+    # ---- 候选 ----
+
+    def _candidates(self, buckets, accept):
+        """
+        按顺序从各个桶中随机抽取候选，凑够 SAMPLE_SIZE 个就停止
+        桶里大部分题目已被选走或排除时随机抽取可能落空，这时退回顺序查找
+        """
+        found = []
+        for bucket in buckets:
+            if len(bucket) <= DRAWS_PER_BUCKET:
+                draws = bucket
+            else:
+                draws = [bucket[self.rng.randrange(len(bucket))] for _ in range(DRAWS_PER_BUCKET)]
+            found.extend(pos for pos in draws if accept(pos))
+            if len(found) >= SAMPLE_SIZE:
+                return found
+        if not found:
+            for bucket in buckets:
+                found.extend(islice((pos for pos in bucket if accept(pos)), SAMPLE_SIZE - len(found)))
+                if len(found) >= SAMPLE_SIZE:
+                    break
+        return found
+
+    def _score(self, pos, ideal_difficulty, ideal_minutes):
+        gain = sum(1 for kid in self.index.topics[pos] if self.topic_count[kid] < self.topic_need.get(kid, 0))
+        score = gain * TOPIC_WEIGHT - abs(self.index.difficulties[pos] - ideal_difficulty)
+        if ideal_minutes is not None:
+            score -= TIME_WEIGHT * max(self.index.minutes[pos] - ideal_minutes, 0) / max(ideal_minutes, 1)
+        return score + self.rng.random() * 0.01
+
+    def _pick(self, buckets, accept):
+        """从候选中选出得分最高的题目加入草稿，没有候选时返回 False"""
+        candidates = self._candidates(buckets, accept)
+        if not candidates:
+            return False
+        ideal_difficulty = self._ideal_difficulty()
+        ideal_minutes = self._ideal_minutes()
+        self._add(max(candidates, key=lambda pos: self._score(pos, ideal_difficulty, ideal_minutes)))
+        return True
+
+    # ---- 贪心 ----
+
+    def fill(self):
+        index = self.index
+        # 知识点：题目少的知识点优先
+        sizes = {kid: sum(len(index.by_topic.get((kid, d), ())) for d in DIFFICULTIES) for kid in self.topic_need}
+        for kid in sorted(self.topic_need, key=lambda kid: sizes[kid]):
+            while self.topic_count[kid] < self.topic_need[kid] and len(self.selected) < self.count:
+                ideal = self._ideal_difficulty()
+                buckets = [index.by_topic.get((kid, d), ()) for d in self._difficulties_near(ideal)]
+                if not self._pick(buckets, lambda pos: self._available(pos) and self._type_open(index.types[pos])):
+                    break
+
+        # 各题型数量
+        for type_, need in self.type_need.items():
+            while self.type_count[type_] < need and len(self.selected) < self.count:
+                buckets = [index.by_type.get((type_, d), ()) for d in self._difficulties_near(self._ideal_difficulty())]
+                if not self._pick(buckets, self._available):
+                    break
+
+        # 不限题型的名额
+        types = index.type_names()
+        while len(self.selected) < self.count:
+            self.rng.shuffle(types)
+            buckets = [index.by_type.get((type_, d), ())
+                       for d in self._difficulties_near(self._ideal_difficulty()) for type_ in types]
+            if not self._pick(buckets, lambda pos: self._available(pos) and self._type_open(index.types[pos])):
+                break
+
+    # ---- 局部搜索 ----
+
+    def _penalty(self, difficulty_sum, minutes_sum):
+        gap = abs(difficulty_sum / len(self.selected) - self.target)
+        penalty = max(gap - DIFFICULTY_TOLERANCE, 0) if gap > DIFFICULTY_TOLERANCE + 1e-9 else 0
+        if self.budget is not None:
+            penalty += TIME_WEIGHT * max(minutes_sum - self.budget, 0) / self.budget
+        return penalty
+
+    def _keeps_topics(self, old, new):
+        """换掉 old 后知识点覆盖仍然满足"""
+        new_topics = self.index.topics[new]
+        return all(
+            kid in new_topics or self.topic_count[kid] > self.topic_need.get(kid, 0)
+            for kid in self.index.topics[old]
+        )
+
+    def _swap_once(self):
+        index = self.index
+        n = len(self.selected)
+        mean = self.difficulty_sum / n
+        over = self.minutes_sum - self.budget if self.budget is not None else 0
+        if abs(mean - self.target) > DIFFICULTY_TOLERANCE + 1e-9:
+            # 换掉难度偏向错误一侧的题目
+            pool = [pos for pos in self.selected if (index.difficulties[pos] - self.target) * (mean - self.target) > 0]
+        elif over > 0:
+            pool = [pos for pos in self.selected if index.minutes[pos] > self.minutes_sum / n]
+        else:
+            return False
+        old = self.rng.choice(pool or self.selected)
+        ideal = index.difficulties[old] - (self.difficulty_sum - self.target * n)
+        ideal = min(max(ideal, self.low), self.high)
+        type_ = index.types[old]
+        buckets = [index.by_type.get((type_, d), ()) for d in self._difficulties_near(ideal)]
+        candidates = self._candidates(buckets, lambda pos: self._available(pos) and self._keeps_topics(old, pos))
+        if not candidates:
+            return False
+
+        current = self._penalty(self.difficulty_sum, self.minutes_sum)
+
+        def penalty_after(pos):
+            return self._penalty(
+                self.difficulty_sum + index.difficulties[pos] - index.difficulties[old],
+                self.minutes_sum + index.minutes[pos] - index.minutes[old]
+            )
+
+        best = min(candidates, key=penalty_after)
+        if penalty_after(best) < current - 1e-9:
+            self._replace(old, best)
+            return True
+        return False
+
+    def improve(self):
+        if not self.selected:
+            return
+        stale = 0
+        for _ in range(LOCAL_SEARCH_STEPS):
+            if self._penalty(self.difficulty_sum, self.minutes_sum) == 0 or stale >= PATIENCE:
+                break
+            if self._swap_once():
+                stale = 0
+            else:
+                stale += 1
+
+    # ---- 结果 ----
+
+    def ordered(self):
+        index = self.index
+        return sorted(self.selected, key=lambda pos: (_type_order(index.types[pos]), index.difficulties[pos], index.ids[pos]))
+
+    def summary(self):
+        index = self.index
+        n = len(self.selected)
+        mean = round(self.difficulty_sum / n, 2) if n else None
+        minutes = round(self.minutes_sum)
+        unmet = []
+        if n < self.count:
+            unmet.append(f'符合条件的题目不足：{n}/{self.count}')
+        for type_, need in self.type_need.items():
+            if self.type_count[type_] < need:
+                unmet.append(f'{type_}不足：{self.type_count[type_]}/{need}')
+        for kid, need in self.topic_need.items():
+            if self.topic_count[kid] < need:
+                unmet.append(f'知识点“{index.topic_names[kid]}”不足：{self.topic_count[kid]}/{need}')
+        if mean is not None and abs(self.difficulty_sum / n - self.target) > DIFFICULTY_TOLERANCE + 1e-9:
+            unmet.append(f'平均难度 {mean} 与目标 {round(self.target, 2)} 相差较大')
+        if self.budget is not None and self.minutes_sum > self.budget:
+            unmet.append(f'预计用时 {minutes} 分钟，超出 {round(self.budget)} 分钟')
+        return {
+            'total_questions': n,
+            'type_counts': dict(self.type_count),
+            'topic_counts': {index.topic_names[kid]: self.topic_count[kid] for kid in self.topic_need},
+            'difficulty_mean': mean,
+            'estimated_time': minutes,
+            'unmet': unmet
+        }
+
+
+def assemble_test(spec, teacher_id=None, seed=None):
+    """
+    按组卷条件生成草稿，返回序列化后的 {'seed', 'summary', 'problems'}
+    题目片段与题库列表一致，另附 estimated_minutes；知识点不存在时抛出 ValueError
+    相同的条件和 seed 得到相同的草稿，不传 seed 时随机生成，便于教师“换一批”
+    """
+    index = get_index()
+    topic_need = {}
+    for name, need in spec['topics'].items():
+        if name not in index.topic_ids:
+            raise ValueError(f'知识点不存在: {name}')
+        topic_need[index.topic_ids[name]] = need
+
+    excluded = set(spec['exclude'])
+    if spec['avoid_seen'] and teacher_id is not None:
+        excluded |= seen_problem_ids(teacher_id)
+    blocked = {index.position[pid] for pid in excluded if pid in index.position}
+
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    draft = _Draft(index, spec, topic_need, blocked, random.Random(seed))
+    draft.fill()
+    draft.improve()
+
+    positions = draft.ordered()
+    problem_ids = [index.ids[pos] for pos in positions]
+    problems = {p.id: p for p in Problem.query.filter(Problem.id.in_(problem_ids))}
+    fragments = [
+        problems[index.ids[pos]].public_fragment({'estimated_minutes': round(index.minutes[pos], 1)})
+        for pos in positions if index.ids[pos] in problems
+    ]
+    return with_raw_field({'seed': seed, 'summary': draft.summary()}, 'problems', join_array(fragments))
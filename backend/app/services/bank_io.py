@@ -0,0 +1,504 @@
+"""
+题库与测试的批量导入导出
+- 导入按流读取 JSON（数组或 {"problems": [...]} 形式）或 NDJSON，内存占用与文件大小无关
+- 逐行校验，不合法的行记录原因后跳过（严格模式下直接中止）
+- 按内容指纹 upsert：已存在的题目更新，新题目插入，不会清空已有数据
+- 每批数据用一条 executemany 写入，整个导入在同一个事务中完成，由调用方提交或回滚
+- 导出用 yield_per 分批读取，边读边写
+"""
+from app import db
+from app.models.problem import Problem, public_json_for, content_hash_for
+from app.models.test import Test, TestQuestion, test_hash_for, load_question_ids
+from app.models.study_record import KnowledgePoint, problem_topics, test_topics, normalize_topics
+from app.models.data_version import dialect_insert, bump_version
+from app.services.search_service import index_problems
+from app.services.grading import answer_key
+from app.cache import cache
+from types import SimpleNamespace
+from datetime import datetime
+import json
+import re
+import time
+
+DEFAULT_BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+# 题目 upsert 时允许更新的字段（题型、题干、选项决定指纹，不会变化）
+PROBLEM_UPDATE_COLUMNS = ('title', 'difficulty', 'topics', 'correct_answer', 'answer_key', 'explanation', 'public_json')
+
+
+class BankImportError(ValueError):
+    """严格模式下遇到不合法数据时抛出"""
+
+
+class ImportReport:
+    """导入统计"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0
+        self.inserted = 0
+        self.updated = 0
+        self.invalid = 0
+        self.errors = []  # [(序号, 原因)]，只保留前若干条
+
+    def error(self, index, reason, keep=50):
+        self.invalid += 1
+        if len(self.errors) < keep:
+            self.errors.append((index, reason))
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self):
+        return self.total / self.elapsed if self.elapsed > 0 else 0
+
+    def summary(self):
+        return (f"共 {self.total} 条：新增 {self.inserted}，更新 {self.updated}，无效 {self.invalid}；"
+                f"耗时 {self.elapsed:.2f}s，{self.rate:.0f} 条/秒")
+
+
+def detect_format(path):
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'json'
+
+
+def iter_ndjson(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_json_array(fp, key):
+    """
+    流式读取 JSON 数组中的对象
+    支持顶层就是数组，或顶层对象中 key 字段是数组两种形式
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    eof = False
+
+    def fill():
+        nonlocal buf, eof
+        chunk = fp.read(CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buf += chunk
+
+    while not buf.strip() and not eof:
+        fill()
+    stripped = buf.lstrip()
+    if stripped.startswith('{'):
+        pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        while True:
+            match = pattern.search(buf)
+            if match:
+                buf = buf[match.end():]
+                break
+            if eof:
+                raise ValueError(f'文件中没有找到 "{key}" 数组')
+            fill()
+    elif stripped.startswith('['):
+        buf = stripped[1:]
+    else:
+        raise ValueError('文件不是 JSON 数组或对象')
+
+    pos = 0
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = '', 0
+            fill()
+        if pos >= len(buf):
+            raise ValueError('JSON 数组没有正常结束')
+        if buf[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            buf, pos = buf[pos:], 0
+            fill()
+            continue
+        yield obj
+        pos = end
+        if pos > CHUNK_SIZE:
+            buf, pos = buf[pos:], 0
+
+
+def iter_records(fp, fmt, key):
+    return iter_ndjson(fp) if fmt == 'ndjson' else iter_json_array(fp, key)
+
+
+def _require_text(record, field, max_length=None):
+    value = record.get(field)
+    if value is None or not str(value).strip():
+        raise ValueError(f'缺少字段 {field}')
+    value = str(value)
+    if max_length and len(value) > max_length:
+        raise ValueError(f'{field} 超过 {max_length} 个字符')
+    return value
+
+
+def validate_problem(record):
+    """校验一条题目记录，返回 (题目表行数据, 知识点列表)，不合法时抛出 ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError('记录不是对象')
+    title = _require_text(record, 'title', 200)
+    content = _require_text(record, 'content')
+    type_ = _require_text(record, 'type', 50)
+    correct_answer = _require_text(record, 'correct_answer')
+    try:
+        difficulty = int(record.get('difficulty'))
+    except (TypeError, ValueError):
+        raise ValueError('difficulty 必须是整数')
+    if not 1 <= difficulty <= 5:
+        raise ValueError('difficulty 必须在1-5之间')
+
+    options = record.get('options')
+    if isinstance(options, str):
+        try:
+            options = json.loads(options)
+        except ValueError:
+            raise ValueError('options 不是合法的JSON')
+    if options is not None and not isinstance(options, list):
+        raise ValueError('options 必须是列表')
+
+    names = normalize_topics(record.get('topics'))
+    topics = ','.join(names)
+    if len(topics) > 200:
+        raise ValueError('topics 超过200个字符')
+
+    options_json = json.dumps(options, ensure_ascii=False) if options is not None else None
+    row = {
+        'title': title,
+        'content': content,
+        'type': type_,
+        'difficulty': difficulty,
+        'topics': topics,
+        'options': options_json,
+        'correct_answer': correct_answer,
+        'answer_key': answer_key(correct_answer),
+        'explanation': record.get('explanation'),
+        'public_json': public_json_for(title, content, type_, difficulty, topics, options),
+        'content_hash': content_hash_for(type_, content, options)
+    }
+    return row, names
+
+
+class _KnowledgeIds:
+    """知识点名称到ID的映射，缺失的知识点批量创建"""
+
+    def __init__(self):
+        self.ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+
+    def resolve(self, names):
+        missing = sorted({name for name in names if name not in self.ids})
+        if missing:
+            db.session.execute(KnowledgePoint.__table__.insert(), [{'name': name} for name in missing])
+            self.ids.update(db.session.query(KnowledgePoint.name, KnowledgePoint.id)
+                            .filter(KnowledgePoint.name.in_(missing)))
+        return self.ids
+
+
+def _replace_links(table, owner_column, links, knowledge):
+    """用新的知识点关联替换一批记录原有的关联"""
+    owner_ids = list(links)
+    if not owner_ids:
+        return
+    ids = knowledge.resolve([name for names in links.values() for name in names])
+    db.session.execute(table.delete().where(table.c[owner_column].in_(owner_ids)))
+    rows = [
+        {owner_column: owner_id, 'knowledge_id': ids[name]}
+        for owner_id, names in links.items()
+        for name in names
+    ]
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+
+def _write_problem_batch(batch, report, knowledge):
+    # 同一批内指纹重复时以最后一条为准
+    unique = {}
+    for row, names in batch:
+        unique[row['content_hash']] = (row, names)
+    hashes = list(unique)
+    existing = {h for (h,) in db.session.query(Problem.content_hash).filter(Problem.content_hash.in_(hashes))}
+
+    table = Problem.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.content_hash],
+        set_={column: stmt.excluded[column] for column in PROBLEM_UPDATE_COLUMNS}
+    )
+    db.session.execute(stmt, [row for row, _ in unique.values()])
+
+    ids = dict(db.session.query(Problem.content_hash, Problem.id).filter(Problem.content_hash.in_(hashes)))
+    _replace_links(problem_topics, 'problem_id', {ids[h]: names for h, (_, names) in unique.items()}, knowledge)
+    index_problems([
+        SimpleNamespace(id=ids[h], title=row['title'], content=row['content'], explanation=row['explanation'],
+                        topics=row['topics'])
+        for h, (row, _) in unique.items()
+    ])
+
+    report.inserted += len(hashes) - len(existing)
+    report.updated += len(existing)
+    return [ids[h] for h in existing]
+
+
+def import_problems(records, batch_size=DEFAULT_BATCH_SIZE, strict=False, progress=None):
+    """
+    批量导入题目（不提交事务）
+    - records: 题目字典的可迭代对象
+    - progress: 每写完一批后调用 progress(report)
+    """
+    report = ImportReport()
+    knowledge = _KnowledgeIds()
+    updated_ids = []
+    batch = []
+    for index, record in enumerate(records, 1):
+        report.total += 1
+        try:
+            batch.append(validate_problem(record))
+        except ValueError as e:
+            if strict:
+                raise BankImportError(f'第 {index} 条: {e}')
+            report.error(index, str(e))
+            continue
+        if len(batch) >= batch_size:
+            updated_ids += _write_problem_batch(batch, report, knowledge)
+            batch = []
+            if progress:
+                progress(report)
+    if batch:
+        updated_ids += _write_problem_batch(batch, report, knowledge)
+        if progress:
+            progress(report)
+
+    if report.inserted or report.updated:
+        bump_version('problems')
+        cache.invalidate(*[f'problem:{pid}' for pid in updated_ids])
+    return report
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+
+
+def validate_test(record, problem_ids_by_hash, created_by=None):
+    """校验一条测试记录，返回 (测试表行数据, 知识点列表, 题目ID列表)"""
+    if not isinstance(record, dict):
+        raise ValueError('记录不是对象')
+    title = _require_text(record, 'title', 100)
+    type_ = _require_text(record, 'type', 50)
+
+    if record.get('problem_hashes'):
+        missing = [h for h in record['problem_hashes'] if h not in problem_ids_by_hash]
+        if missing:
+            raise ValueError(f'有 {len(missing)} 道题目不在题库中')
+        problem_ids = [problem_ids_by_hash[h] for h in record['problem_hashes']]
+    else:
+        raw_ids = record.get('problem_ids') or []
+        if isinstance(raw_ids, str):
+            raw_ids = raw_ids.split(',')
+        try:
+            problem_ids = [int(pid) for pid in raw_ids]
+        except (TypeError, ValueError):
+            raise ValueError('problem_ids 必须是整数列表')
+    if not problem_ids:
+        raise ValueError('题目列表不能为空')
+
+    try:
+        difficulty = int(record.get('difficulty'))
+        estimated_time = int(record.get('estimated_time'))
+    except (TypeError, ValueError):
+        raise ValueError('difficulty 和 estimated_time 必须是整数')
+    if not 1 <= difficulty <= 5:
+        raise ValueError('difficulty 必须在1-5之间')
+
+    try:
+        created_at = _parse_datetime(record.get('created_at')) or datetime.utcnow()
+        deadline = _parse_datetime(record.get('deadline'))
+    except ValueError:
+        raise ValueError('日期格式错误')
+
+    names = normalize_topics(record.get('topics'))
+    creator = record.get('created_by')
+    row = {
+        'title': title,
+        'description': record.get('description'),
+        'type': type_,
+        'total_questions': len(problem_ids),
+        'estimated_time': estimated_time,
+        'topics': ','.join(names),
+        'difficulty': difficulty,
+        'created_at': created_at,
+        'deadline': deadline,
+        'created_by': creator if isinstance(creator, int) else created_by,
+        'content_hash': test_hash_for(title, type_, problem_ids)
+    }
+    return row, names, problem_ids
+
+
+def _write_test_batch(batch, report, knowledge):
+    # 同一批内指纹重复时以最后一条为准
+    unique = {}
+    for row, names, problem_ids in batch:
+        unique[row['content_hash']] = (row, names, problem_ids)
+    table = Test.__table__
+    hashes = list(unique)
+    existing = dict(db.session.query(Test.content_hash, Test.id).filter(Test.content_hash.in_(hashes)))
+
+    inserts = [row for h, (row, _, _) in unique.items() if h not in existing]
+    updates = [dict(row, tid=existing[h]) for h, (row, _, _) in unique.items() if h in existing]
+    if inserts:
+        db.session.execute(table.insert(), inserts)
+    if updates:
+        # 已存在的测试保留原创建者
+        columns = [c for c in batch[0][0] if c != 'created_by']
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('tid')).values({c: db.bindparam(c) for c in columns}),
+            updates
+        )
+
+    ids = dict(db.session.query(Test.content_hash, Test.id).filter(Test.content_hash.in_(hashes)))
+    _replace_links(test_topics, 'test_id', {ids[h]: names for h, (_, names, _) in unique.items()}, knowledge)
+
+    # 同步题目关联
+    test_ids = [ids[h] for h in hashes]
+    db.session.execute(TestQuestion.__table__.delete().where(TestQuestion.test_id.in_(test_ids)))
+    db.session.execute(TestQuestion.__table__.insert(), [
+        {'test_id': ids[h], 'problem_id': pid, 'order': order}
+        for h, (_, _, problem_ids) in unique.items()
+        for order, pid in enumerate(problem_ids, 1)
+    ])
+
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    return list(existing.values())
+
+
+def import_tests(records, batch_size=DEFAULT_BATCH_SIZE, strict=False, created_by=None, progress=None):
+    """
+    批量导入测试（不提交事务）
+    - 题目可以用 problem_ids（当前库中的ID）或 problem_hashes（题目内容指纹，跨库迁移时使用）指定
+    - created_by: 记录中没有整数 created_by 时使用的创建者
+    """
+    report = ImportReport()
+    knowledge = _KnowledgeIds()
+    problem_ids_by_hash = None
+    known_problem_ids = None
+    updated_ids = []
+    batch = []
+
+    for index, record in enumerate(records, 1):
+        report.total += 1
+        if problem_ids_by_hash is None and isinstance(record, dict) and record.get('problem_hashes'):
+            problem_ids_by_hash = dict(db.session.query(Problem.content_hash, Problem.id))
+        try:
+            row, names, problem_ids = validate_test(record, problem_ids_by_hash or {}, created_by)
+            if known_problem_ids is None:
+                known_problem_ids = {pid for (pid,) in db.session.query(Problem.id)}
+            if any(pid not in known_problem_ids for pid in problem_ids):
+                raise ValueError('部分题目不存在')
+            batch.append((row, names, problem_ids))
+        except ValueError as e:
+            if strict:
+                raise BankImportError(f'第 {index} 条: {e}')
+            report.error(index, str(e))
+            continue
+        if len(batch) >= batch_size:
+            updated_ids += _write_test_batch(batch, report, knowledge)
+            batch = []
+            if progress:
+                progress(report)
+    if batch:
+        updated_ids += _write_test_batch(batch, report, knowledge)
+        if progress:
+            progress(report)
+
+    if report.inserted or report.updated:
+        bump_version('tests')
+        cache.invalidate('tests', *[f'test:{tid}' for tid in updated_ids])
+    return report
+
+
+def iter_problem_exports(batch_size=DEFAULT_BATCH_SIZE):
+    """按ID顺序分批读取题目，生成导出记录"""
+    query = db.session.query(
+        Problem.title, Problem.content, Problem.type, Problem.difficulty, Problem.topics,
+        Problem.options, Problem.correct_answer, Problem.explanation, Problem.content_hash
+    ).order_by(Problem.id).yield_per(batch_size)
+    for title, content, type_, difficulty, topics, options, correct_answer, explanation, content_hash in query:
+        record = {
+            'title': title,
+            'content': content,
+            'type': type_,
+            'difficulty': difficulty,
+            'topics': topics.split(',') if topics else [],
+            'correct_answer': correct_answer,
+            'explanation': explanation,
+            'content_hash': content_hash
+        }
+        if options:
+            record['options'] = json.loads(options)
+        yield record
+
+
+def iter_test_exports(batch_size=DEFAULT_BATCH_SIZE):
+    """分批读取测试，题目同时以ID和内容指纹导出，便于导入到其他库"""
+    hashes = dict(db.session.query(Problem.id, Problem.content_hash))
+    query = Test.query.order_by(Test.id)
+    last_id = 0
+    while True:
+        tests = query.filter(Test.id > last_id).limit(batch_size).all()
+        if not tests:
+            break
+        last_id = tests[-1].id
+        questions = load_question_ids([test.id for test in tests])
+        yield from (_test_record(test, questions.get(test.id, []), hashes) for test in tests)
+
+
+def _test_record(test, problem_ids, hashes):
+    return {
+        'title': test.title,
+        'description': test.description,
+        'type': test.type,
+        'estimated_time': test.estimated_time,
+        'topics': test.topics.split(',') if test.topics else [],
+        'difficulty': test.difficulty,
+        'problem_ids': problem_ids,
+        'problem_hashes': [hashes.get(pid) for pid in problem_ids],
+        'created_at': test.created_at.isoformat() if test.created_at else None,
+        'deadline': test.deadline.isoformat() if test.deadline else None
+    }
+
+
+def write_records(records, fp, fmt, key):
+    """把记录流式写入文件，返回条数"""
+    count = 0
+    if fmt == 'ndjson':
+        for record in records:
+            fp.write(json.dumps(record, ensure_ascii=False))
+            fp.write('\n')
+            count += 1
+        return count
+
+    fp.write('{"%s": [\n' % key)
+    for record in records:
+        if count:
+            fp.write(',\n')
+        fp.write(json.dumps(record, ensure_ascii=False))
+        count += 1
+    fp.write('\n]}\n')
+    return count
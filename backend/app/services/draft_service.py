@@ -0,0 +1,218 @@
+"""
+测试作答草稿（自动保存）
+- 学生作答时客户端定期上报变化的答案（增量），刷新页面或浏览器崩溃后可以恢复，交卷时以草稿为基础
+- 增量先在内存中合并：同一份草稿同一道题在刷新间隔内多次修改只保留最后一次，
+  后台线程每 DRAFT_FLUSH_INTERVAL 秒把所有草稿的变化在一个事务中批量追加到 test_draft_entries
+- 草稿记录只追加不修改；同一份草稿累计追加的记录超过 COMPACT_THRESHOLD 条时，删除被覆盖的旧记录
+- 每道题的累计作答用时由客户端整份上报，保存在 test_drafts.time_spent（覆盖写入），交卷时与答案一起使用
+- 读取和交卷前先把这份草稿在内存中的变化写入数据库
+- DRAFT_FLUSH_INTERVAL 为 0 时每次上报直接写入（不合并）
+- 内存中的变化按进程保存，适用于单进程部署；进程退出时写入尚未保存的变化
+"""
+from app import db
+from app.models.test import TestDraft, TestDraftEntry
+from app.models.data_version import dialect_insert
+from sqlalchemy import bindparam, func, select, tuple_
+import atexit
+import json
+import threading
+import time
+import traceback
+
+DEFAULT_FLUSH_INTERVAL = 5
+
+# 每份草稿累计追加多少条记录后压缩一次
+COMPACT_THRESHOLD = 64
+
+
+class DraftStore:
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self._pending = {}  # (测试ID, 用户ID) -> {'version', 'answers': {题目ID: 答案}, 'elapsed', 'time_spent'}
+        self._draft_ids = {}  # (测试ID, 用户ID) -> 草稿ID
+        self._appended = {}  # 草稿ID -> 上次压缩后追加的记录数
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()  # 写入和删除草稿互斥，避免交卷后又写回草稿
+        self._worker = None
+
+    def init_app(self, app):
+        app.config.setdefault('DRAFT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        app.extensions['draft_store'] = self
+        self.app = app
+        self.flush_interval = app.config['DRAFT_FLUSH_INTERVAL']
+        self._draft_ids.clear()
+        self._appended.clear()
+        if self.flush_interval and self._worker is None:
+            self._worker = threading.Thread(target=self._run, name='draft-flush', daemon=True)
+            self._worker.start()
+            atexit.register(self._flush_on_exit)
+
+    # ---- 读写 ----
+
+    def record(self, test_id, user_id, version, answers, elapsed=None, time_spent=None):
+        """
+        合并一次上报的增量；未开启合并时直接写入
+        time_spent: 每道题的累计作答用时 {题目ID: 秒}（完整的一份，不是增量），以最后一次上报为准
+        """
+        key = (test_id, int(user_id))
+        with self._lock:
+            draft = self._pending.setdefault(key, {'version': version, 'answers': {}, 'elapsed': None,
+                                                   'time_spent': None})
+            draft['answers'].update(answers)
+            if elapsed is not None:
+                draft['elapsed'] = max(draft['elapsed'] or 0, int(elapsed))
+            if time_spent is not None:
+                draft['time_spent'] = time_spent
+        if not self.flush_interval:
+            self.flush([key])
+
+    def load(self, test_id, user_id):
+        """读取草稿 {'version', 'answers', 'duration', 'time_spent'}，没有草稿时返回 None"""
+        key = (test_id, int(user_id))
+        self.flush([key])
+        draft = db.session.query(TestDraft.id, TestDraft.paper_version, TestDraft.time_spent).filter(
+            TestDraft.test_id == test_id, TestDraft.user_id == key[1]
+        ).first()
+        if draft is None:
+            return None
+        answers = {}
+        duration = 0
+        entries = db.session.query(TestDraftEntry.problem_id, TestDraftEntry.answer, TestDraftEntry.elapsed) \
+            .filter(TestDraftEntry.draft_id == draft.id).order_by(TestDraftEntry.id)
+        for problem_id, answer, elapsed in entries:
+            answers[str(problem_id)] = json.loads(answer) if answer is not None else None
+            duration = max(duration, elapsed or 0)
+        return {
+            'version': draft.paper_version,
+            'answers': {pid: answer for pid, answer in answers.items() if answer is not None},
+            'duration': duration,
+            'time_spent': json.loads(draft.time_spent) if draft.time_spent else {}
+        }
+
+    def discard(self, test_id, user_id):
+        """删除草稿（不提交），交卷时与提交记录在同一事务中删除"""
+        key = (test_id, int(user_id))
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(key, None)
+            draft_ids = [draft_id for draft_id, in db.session.query(TestDraft.id).filter(
+                TestDraft.test_id == test_id, TestDraft.user_id == key[1])]
+            if draft_ids:
+                db.session.query(TestDraftEntry).filter(TestDraftEntry.draft_id.in_(draft_ids)) \
+                    .delete(synchronize_session=False)
+                db.session.query(TestDraft).filter(TestDraft.id.in_(draft_ids)).delete(synchronize_session=False)
+            self._draft_ids.pop(key, None)
+
+    # ---- 写入 ----
+
+    def flush(self, keys=None):
+        """把内存中的变化追加到数据库并提交，keys 为空时写入全部草稿，返回写入的记录数"""
+        # 在写锁内取出这批变化：交卷时的 discard 也持有写锁，不会在取出之后、写入之前删除草稿，
+        # 已交卷的草稿不会被这批变化重新写回
+        with self._write_lock:
+            with self._lock:
+                if keys is None:
+                    batch, self._pending = self._pending, {}
+                else:
+                    batch = {key: self._pending.pop(key) for key in keys if key in self._pending}
+            if not batch:
+                return 0
+            try:
+                draft_ids = self._resolve_ids(batch)
+                rows = []
+                for key, draft in batch.items():
+                    for problem_id, answer in draft['answers'].items():
+                        rows.append({
+                            'draft_id': draft_ids[key],
+                            'problem_id': int(problem_id),
+                            'answer': json.dumps(answer, ensure_ascii=False) if answer is not None else None,
+                            'elapsed': draft['elapsed']
+                        })
+                if rows:
+                    db.session.execute(TestDraftEntry.__table__.insert(), rows)
+                timings = [{'draft': draft_ids[key], 'timing': json.dumps(draft['time_spent'])}
+                           for key, draft in batch.items() if draft.get('time_spent') is not None]
+                if timings:
+                    table = TestDraft.__table__
+                    db.session.execute(
+                        table.update().where(table.c.id == bindparam('draft'))
+                        .values(time_spent=bindparam('timing')),
+                        timings
+                    )
+                self._compact(draft_ids, batch)
+                db.session.commit()
+            except Exception:
+                # 放回内存，下次再写；期间新上报的答案优先
+                db.session.rollback()
+                self._restore(batch)
+                self._draft_ids.clear()
+                raise
+        return len(rows)
+
+    def _restore(self, batch):
+        with self._lock:
+            for key, draft in batch.items():
+                newer = self._pending.get(key)
+                if newer is not None:
+                    draft['answers'].update(newer['answers'])
+                    draft['elapsed'] = max(draft['elapsed'] or 0, newer['elapsed'] or 0) or None
+                    if newer.get('time_spent') is not None:
+                        draft['time_spent'] = newer['time_spent']
+                self._pending[key] = draft
+
+    def _resolve_ids(self, batch):
+        """草稿ID，没有的草稿批量创建"""
+        missing = [key for key in batch if key not in self._draft_ids]
+        if missing:
+            table = TestDraft.__table__
+            stmt = dialect_insert(table).values([
+                {'test_id': test_id, 'user_id': user_id, 'paper_version': batch[(test_id, user_id)]['version']}
+                for test_id, user_id in missing
+            ]).on_conflict_do_nothing(index_elements=[table.c.test_id, table.c.user_id])
+            db.session.execute(stmt)
+            rows = db.session.query(TestDraft.test_id, TestDraft.user_id, TestDraft.id) \
+                .filter(tuple_(TestDraft.test_id, TestDraft.user_id).in_(missing))
+            for test_id, user_id, draft_id in rows:
+                self._draft_ids[(test_id, user_id)] = draft_id
+        return {key: self._draft_ids[key] for key in batch}
+
+    def _compact(self, draft_ids, batch):
+        """删除追加记录较多的草稿中被覆盖的记录"""
+        for key, draft_id in draft_ids.items():
+            count = self._appended.get(draft_id, 0) + len(batch[key]['answers'])
+            if count < COMPACT_THRESHOLD:
+                self._appended[draft_id] = count
+                continue
+            latest = select(func.max(TestDraftEntry.id)) \
+                .where(TestDraftEntry.draft_id == draft_id).group_by(TestDraftEntry.problem_id)
+            db.session.query(TestDraftEntry).filter(
+                TestDraftEntry.draft_id == draft_id, TestDraftEntry.id.notin_(latest)
+            ).delete(synchronize_session=False)
+            self._appended[draft_id] = 0
+
+    # ---- 后台写入 ----
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self.app.app_context():
+                try:
+                    count = self.flush()
+                    if count:
+                        print(f"作答草稿: 写入 {count} 条变化")
+                except Exception:
+                    traceback.print_exc()
+                finally:
+                    db.session.remove()
+
+    def _flush_on_exit(self):
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            traceback.print_exc()
+
+
+draft_store = DraftStore()
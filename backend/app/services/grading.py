@@ -0,0 +1,343 @@
+"""
+答案规范化与判分
+- 把答案转换成规范形式（答案键），答案键相同即判为正确：
+  * 全角/半角、空格、上标（x² -> x^2）、×÷ 等写法差异统一
+  * 数值按值比较："1/4" 与 "0.25"、"30°" 与 "30"、"√3/3" 与 "1/√3" 相同；长度单位换算后比较："1.5cm" 与 "15mm" 相同
+  * 含字母的代数式在固定的几组取值下求值比较："2x" 与 "x*2"、"x^2+2x+1" 与 "(x+1)^2" 相同；
+    方程两边相减后按比例归一："y=e^x" 与 "e^x=y" 相同
+  * 坐标/区间 (1,0) 按顺序逐项比较，集合 {-2,2} 不计顺序
+  * 无法解析的答案（文字、LaTeX 以外的特殊记号）以及过长、嵌套过深的答案退回规范化后的字符串比较
+- 题目的答案键在写入时生成并保存（Problem.answer_key），判分时只需规范化学生答案
+- 学生答案的规范形式有进程内缓存，常见答案（"0"、"1"、"√3"）不会重复解析
+"""
+from functools import lru_cache
+import math
+import re
+import unicodedata
+
+CACHE_SIZE = 65536
+
+# 数值比较保留的有效数字位数
+SIGNIFICANT_DIGITS = 10
+
+# 超过这个长度或括号嵌套层数的答案不按算式解析，直接按文本比较（避免递归过深）
+MAX_EXPRESSION_LENGTH = 200
+MAX_NESTING = 50
+
+# 代数式求值时变量的取值（避开 0、1 等特殊值，减少不同式子碰巧相等的可能）
+SAMPLE_POINTS = (0.5813, 1.3172, 2.0489)
+
+_SUPERSCRIPTS = str.maketrans('⁰¹²³⁴⁵⁶⁷⁸⁹⁻', '0123456789-')
+_SUPERSCRIPT_RUN = re.compile('[⁰¹²³⁴⁵⁶⁷⁸⁹⁻]+')
+_REPLACEMENTS = (
+    ('×', '*'), ('·', '*'), ('÷', '/'), ('−', '-'), ('–', '-'),
+    ('\\cdot', '*'), ('\\times', '*'), ('\\div', '/'), ('\\pi', 'π'),
+    ('\\left', ''), ('\\right', ''), ('{', '('), ('}', ')'),
+)
+_LATEX_FRAC = re.compile(r'\\[dt]?frac\{([^{}]*)\}\{([^{}]*)\}')
+_LATEX_SQRT = re.compile(r'\\sqrt\{([^{}]*)\}')
+_UNIT_SUFFIX = re.compile(r'^([-+]?(?:\d+\.?\d*|\.\d+))(cm|mm|km|°|度|厘米|毫米|千米|米)$')
+# 长度单位换算成米，答案键中带上单位："1.5cm" 与 "15mm" 相同，与 "1.5mm"、"1.5" 不同；角度单位直接去掉
+_LENGTH_UNITS = {'mm': 0.001, '毫米': 0.001, 'cm': 0.01, '厘米': 0.01, '米': 1, 'km': 1000, '千米': 1000}
+_DEGREE = re.compile(r'(?<=[\d)])(?:°|度)')
+
+_TOKEN = re.compile(r'\s*(?:((?:\d+\.?\d*|\.\d+)(?:e\d+)?)|(ln|log|sin|cos|tan|sqrt|exp)|([a-zA-Zπ√])|([-+*/^()=]))')
+# 连续的字母只能是单个字母变量，或函数名后跟一个变量（sinx）；其余（no、abc、kg）不当作变量的乘积，按文本比较
+_LETTER_RUN = re.compile('[a-zA-Z]+')
+_IDENTIFIER = re.compile('(?:ln|log|sin|cos|tan|sqrt|exp)?[a-zA-Z]?')
+# 科学计数法 1e3，e 后面必须是数字
+_SCIENTIFIC = re.compile(r'(?<![a-zA-Z])(?:\d+\.?\d*|\.\d+)e\d+')
+_FUNCTIONS = {
+    'ln': math.log, 'log': math.log10, 'sin': math.sin, 'cos': math.cos,
+    'tan': math.tan, 'sqrt': math.sqrt, 'exp': math.exp, '√': math.sqrt
+}
+_CONSTANTS = {'π': math.pi, 'e': math.e}
+
+
+class _ParseError(ValueError):
+    pass
+
+
+def normalize_text(value):
+    """统一写法：全角转半角、上标转 ^、去掉空白，并展开简单的 LaTeX"""
+    value = _SUPERSCRIPT_RUN.sub(lambda m: '^' + m.group().translate(_SUPERSCRIPTS), value)
+    value = unicodedata.normalize('NFKC', value)
+    value = _LATEX_FRAC.sub(r'(\1)/(\2)', value)
+    value = _LATEX_SQRT.sub(r'√(\1)', value)
+    for old, new in _REPLACEMENTS:
+        value = value.replace(old, new)
+    return ''.join(value.split())
+
+
+def _tokenize(value):
+    for run in _LETTER_RUN.finditer(_SCIENTIFIC.sub('0', value)):
+        if not _IDENTIFIER.fullmatch(run.group()):
+            raise _ParseError(run.group())
+    tokens = []
+    pos = 0
+    while pos < len(value):
+        match = _TOKEN.match(value, pos)
+        if not match:
+            raise _ParseError(value[pos:])
+        number, function, symbol, operator = match.groups()
+        if number:
+            tokens.append(('num', float(number)))
+        elif function:
+            tokens.append(('fn', function))
+        elif symbol == '√':
+            tokens.append(('fn', '√'))
+        elif symbol in _CONSTANTS:
+            tokens.append(('const', symbol))
+        elif symbol:
+            tokens.append(('var', symbol))
+        else:
+            tokens.append(('op', operator))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    递归下降解析四则运算、乘方、根号和常见函数，支持省略乘号（2x、3√2、(x+1)(x-1)）
+    结果是嵌套元组形式的表达式树
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.variables = set()
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, op):
+        if self.take() != ('op', op):
+            raise _ParseError(op)
+
+    def parse(self):
+        node = self.expr()
+        if self.peek() == ('op', '='):
+            self.take()
+            node = ('eq', node, self.expr())
+        if self.pos != len(self.tokens):
+            raise _ParseError('trailing')
+        return node
+
+    def expr(self):
+        node = self.term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            op = self.take()[1]
+            node = (op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind == 'op' and value in '*/':
+                self.take()
+                node = (value, node, self.unary())
+            elif kind in ('num', 'fn', 'const', 'var') or (kind, value) == ('op', '('):
+                node = ('*', node, self.power())
+            else:
+                return node
+
+    def unary(self):
+        if self.peek() == ('op', '-'):
+            self.take()
+            return ('neg', self.unary())
+        if self.peek() == ('op', '+'):
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        node = self.primary()
+        if self.peek() == ('op', '^'):
+            self.take()
+            node = ('^', node, self.unary())
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == 'num':
+            return ('num', value)
+        if kind == 'const':
+            return ('num', _CONSTANTS[value])
+        if kind == 'var':
+            self.variables.add(value)
+            return ('var', value)
+        if kind == 'fn':
+            return ('fn', value, self.power())
+        if (kind, value) == ('op', '('):
+            node = self.expr()
+            self.expect(')')
+            return node
+        raise _ParseError(str(value))
+
+
+def _evaluate(node, env):
+    kind = node[0]
+    if kind == 'num':
+        return node[1]
+    if kind == 'var':
+        return env[node[1]]
+    if kind == 'neg':
+        return -_evaluate(node[1], env)
+    if kind == 'fn':
+        return _FUNCTIONS[node[1]](_evaluate(node[2], env))
+    left = _evaluate(node[1], env)
+    right = _evaluate(node[2], env)
+    if kind == '+':
+        return left + right
+    if kind == '-' or kind == 'eq':
+        return left - right
+    if kind == '*':
+        return left * right
+    if kind == '/':
+        return left / right
+    return left ** right
+
+
+def _format(value):
+    if isinstance(value, complex) or math.isnan(value) or math.isinf(value):
+        raise _ParseError('value')
+    text = '%.*g' % (SIGNIFICANT_DIGITS, value)
+    return '0' if text == '-0' else text
+
+
+def _nesting(value):
+    """括号的最大嵌套层数"""
+    depth = deepest = 0
+    for ch in value:
+        if ch in '([':
+            depth += 1
+            deepest = max(deepest, depth)
+        elif ch in ')]':
+            depth -= 1
+    return deepest
+
+
+def _expression_key(value):
+    """数值或代数式的答案键，无法解析时返回 None"""
+    if len(value) > MAX_EXPRESSION_LENGTH or _nesting(value) > MAX_NESTING:
+        return None
+    match = _UNIT_SUFFIX.match(value)
+    if match:
+        number, unit = match.groups()
+        if unit in _LENGTH_UNITS:
+            return 'v:%s|m' % _format(float(number) * _LENGTH_UNITS[unit])
+        value = number
+    value = _DEGREE.sub('', value)
+    try:
+        parser = _Parser(_tokenize(value))
+        tree = parser.parse()
+        if not parser.variables:
+            result = _evaluate(tree, {})
+            return ('eq:' if tree[0] == 'eq' else 'v:') + _format(result)
+
+        names = sorted(parser.variables)
+        samples = []
+        for i in range(len(SAMPLE_POINTS)):
+            # 每个变量取不同的值，避免 x-y 之类的式子恒为 0
+            env = {name: SAMPLE_POINTS[(i + j) % len(SAMPLE_POINTS)] + j * 0.1 for j, name in enumerate(names)}
+            samples.append(_evaluate(tree, env))
+        if tree[0] == 'eq':
+            # 方程两边同乘一个数仍是同一个方程，用第一个非零值归一
+            scale = next((s for s in samples if abs(s) > 1e-12), 1.0)
+            samples = [s / scale for s in samples]
+        return ('eq:' if tree[0] == 'eq' else 'f:') + ','.join(names) + ':' + ','.join(_format(s) for s in samples)
+    except (_ParseError, ArithmeticError, ValueError, TypeError, RecursionError):
+        return None
+
+
+def _split_top_level(value):
+    """按不在括号内的逗号切分"""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(value):
+        if ch in '([':
+            depth += 1
+        elif ch in ')]':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(value[start:i])
+            start = i + 1
+    parts.append(value[start:])
+    return parts
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonicalize(answer):
+    """返回答案的规范形式（答案键）"""
+    if answer is None:
+        return ''
+    raw = str(answer)
+    # 集合：大括号在统一写法时会变成小括号，先记下来
+    stripped = unicodedata.normalize('NFKC', raw).strip()
+    is_set = stripped.startswith('{') and stripped.endswith('}')
+    value = normalize_text(raw)
+    if not value:
+        return ''
+
+    if 2 < len(value) <= MAX_EXPRESSION_LENGTH and value[0] in '([' and value[-1] in ')]':
+        parts = _split_top_level(value[1:-1])
+        if len(parts) > 1:
+            keys = [canonicalize(part) for part in parts]
+            if is_set:
+                return 'set:{%s}' % '|'.join(sorted(set(keys)))
+            return 'tuple:%s%s%s' % (value[0], '|'.join(keys), value[-1])
+
+    key = _expression_key(value)
+    if key is not None:
+        return key
+    return 'text:' + value.lower()
+
+
+def answer_key(correct_answer):
+    """题目标准答案的答案键，写入题目时调用"""
+    return canonicalize(correct_answer) if correct_answer is not None else None
+
+
+def is_correct(answer, key):
+    """判断学生答案是否与答案键一致，空答案一律判错"""
+    if answer is None or key is None:
+        return False
+    answer = str(answer)
+    if not answer.strip():
+        return False
+    return canonicalize(answer) == key
+
+
+def grade_answer(problem, answer):
+    """判一道题，题目没有预先生成答案键时（旧数据）现场计算"""
+    key = problem.answer_key or answer_key(problem.correct_answer)
+    return is_correct(answer, key)
+
+
+def grade_test(problems, answers):
+    """
+    判整份测试
+    - problems: 题目对象列表（需要 id、answer_key、correct_answer）
+    - answers: {题目ID字符串: 学生答案}
+    返回 {'results': {题目ID: 是否正确}, 'correct_count', 'total_questions', 'score'}
+    """
+    results = {}
+    for problem in problems:
+        results[problem.id] = grade_answer(problem, answers.get(str(problem.id)))
+    correct_count = sum(results.values())
+    total = len(results)
+    return {
+        'results': results,
+        'correct_count': correct_count,
+        'total_questions': total,
+        'score': round(correct_count / total * 100, 1) if total else 0
+    }
+
+
+def cache_info():
+    return canonicalize.cache_info()
@@ -0,0 +1,181 @@
+"""
+测试的经典项目分析（CTT）
+- 样本：每个学生在该测试最近作答的试卷版本上的最后一次提交，按 学生 × 题目 组成答对矩阵（答对为 1）
+- 每道题：难度（答对比例）、区分度（按答对题数排序后高分组与低分组各 27% 的答对比例之差）、
+  校正后的点二列相关（该题与其余题目答对数的相关系数）
+- 整体：Cronbach's alpha 信度、得分分位数
+- 矩阵一次构建成 numpy 数组，按列向量化计算
+- 结果写入 question_stats / test_results 的分析字段，在全量重算统计时执行
+"""
+from app import db
+from app.models.test import TestSubmission, SubmissionAnswer, TestResult, QuestionStat
+from app.models.data_version import dialect_group_concat
+from sqlalchemy import and_, bindparam, func, select
+from datetime import datetime
+import math
+import numpy as np
+
+# 高分组/低分组所占比例
+GROUP_RATIO = 0.27
+# 得分分位数
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+def _sample_ids(test_ids):
+    """
+    分析样本的子查询：每个学生在该测试最近作答的试卷版本上最后一次提交的ID
+    最近作答的版本取该测试最后一条提交的版本
+    """
+    last = select(TestSubmission.test_id, func.max(TestSubmission.id).label('last_id')) \
+        .where(TestSubmission.test_id.in_(test_ids)).group_by(TestSubmission.test_id).subquery()
+    versions = select(TestSubmission.test_id, TestSubmission.paper_version) \
+        .join(last, TestSubmission.id == last.c.last_id).subquery()
+    return select(func.max(TestSubmission.id)).join(versions, and_(
+        TestSubmission.test_id == versions.c.test_id,
+        TestSubmission.paper_version.is_not_distinct_from(versions.c.paper_version)
+    )).group_by(TestSubmission.test_id, TestSubmission.user_id)
+
+
+def load_matrices(test_ids):
+    """
+    批量构建多份测试的答对矩阵，返回 {测试ID: (提交ID列表, 得分列表, 题目ID列表, 矩阵)}，没有提交的测试不在结果中
+    每份提交答对的题目在数据库中拼接成一个字符串，避免逐条作答构造结果行；矩阵为 n×k 的数组
+    """
+    sample = _sample_ids(test_ids)
+    submissions = {}  # 测试ID -> [(提交ID, 得分)]
+    test_of = {}  # 提交ID -> 测试ID
+    rows = db.session.execute(
+        select(TestSubmission.id, TestSubmission.test_id, TestSubmission.score)
+        .where(TestSubmission.id.in_(sample)).order_by(TestSubmission.id)
+    )
+    for submission_id, test_id, score in rows:
+        submissions.setdefault(test_id, []).append((submission_id, score or 0))
+        test_of[submission_id] = test_id
+
+    answered = SubmissionAnswer.submission_id.in_(sample)
+    questions = {}  # 测试ID -> [题目ID]
+    rows = db.session.execute(
+        select(TestSubmission.test_id, SubmissionAnswer.problem_id).distinct()
+        .join(TestSubmission, TestSubmission.id == SubmissionAnswer.submission_id)
+        .where(answered).order_by(TestSubmission.test_id, SubmissionAnswer.problem_id)
+    )
+    for test_id, problem_id in rows:
+        questions.setdefault(test_id, []).append(problem_id)
+    correct = {}  # 测试ID -> [(提交ID, 答对的题目ID字符串)]
+    rows = db.session.execute(
+        select(SubmissionAnswer.submission_id, dialect_group_concat(SubmissionAnswer.problem_id))
+        .where(answered, SubmissionAnswer.is_correct == True)  # noqa: E712
+        .group_by(SubmissionAnswer.submission_id)
+    )
+    for submission_id, problem_ids in rows:
+        correct.setdefault(test_of[submission_id], []).append((submission_id, problem_ids))
+
+    result = {}
+    for test_id, items in submissions.items():
+        submission_ids = [sid for sid, _ in items]
+        question_ids = questions.get(test_id, [])
+        row_index = {sid: i for i, sid in enumerate(submission_ids)}
+        col_index = {qid: j for j, qid in enumerate(question_ids)}
+        matrix = np.zeros((len(submission_ids), len(question_ids)), dtype=np.float64)
+        rows, cols = [], []
+        for sid, problem_ids in correct.get(test_id, []):
+            columns = [col_index[int(qid)] for qid in problem_ids.split(',')]
+            rows.extend([row_index[sid]] * len(columns))
+            cols.extend(columns)
+        matrix[rows, cols] = 1.0
+        result[test_id] = (submission_ids, [score for _, score in items], question_ids, matrix)
+    return result
+
+
+def load_matrix(test_id):
+    """构建一份测试的答对矩阵，没有提交时返回 None"""
+    return load_matrices([test_id]).get(test_id)
+
+
+def _group_size(n):
+    return max(1, int(round(n * GROUP_RATIO)))
+
+
+def _finite(value, digits):
+    return round(float(value), digits) if value is not None and math.isfinite(value) else None
+
+
+def analyze_matrix(matrix, scores):
+    """计算项目分析指标，返回 {'difficulty', 'discrimination', 'point_biserial'(按题目的列表), 'reliability', 'quantiles'}"""
+    n, k = matrix.shape
+    totals = matrix.sum(axis=1)
+    difficulty = matrix.mean(axis=0)
+
+    # 按答对题数排序（相同时按提交顺序），取两端各 27%
+    order = np.argsort(totals, kind='stable')
+    g = _group_size(n)
+    discrimination = matrix[order[-g:]].mean(axis=0) - matrix[order[:g]].mean(axis=0)
+
+    # 总方差使用总体方差；题目与其余题目的协方差 = cov(x, T) - var(x)
+    item_var = difficulty * (1 - difficulty)
+    total_var = totals.var()
+    cov = (matrix - difficulty).T @ (totals - totals.mean()) / n
+    rest_cov = cov - item_var
+    rest_var = total_var - 2 * cov + item_var
+    with np.errstate(divide='ignore', invalid='ignore'):
+        point_biserial = rest_cov / np.sqrt(item_var * rest_var)
+    alpha = k / (k - 1) * (1 - item_var.sum() / total_var) if k > 1 and total_var > 0 else None
+
+    quantiles = np.quantile(np.asarray(scores, dtype=np.float64), QUANTILES)
+    return {
+        'difficulty': difficulty.tolist(),
+        'discrimination': discrimination.tolist(),
+        'point_biserial': point_biserial.tolist(),
+        'reliability': alpha,
+        'quantiles': quantiles.tolist()
+    }
+
+
+def summarize(loaded, now=None):
+    """
+    对 load_matrices 的一项做项目分析，返回 (整体分析字段, [每道题的分析字段])，没有题目时返回 None
+    每道题的字段以 qid 标识题目
+    """
+    submission_ids, scores, question_ids, matrix = loaded
+    if not question_ids:
+        return None
+    result = analyze_matrix(matrix, scores)
+    items = [{
+        'qid': question_id,
+        'difficulty': _finite(result['difficulty'][j], 4),
+        'discrimination': _finite(result['discrimination'][j], 4),
+        'point_biserial': _finite(result['point_biserial'][j], 4)
+    } for j, question_id in enumerate(question_ids)]
+    summary = {
+        'examinee_count': len(submission_ids),
+        'reliability': _finite(result['reliability'], 4),
+        'score_quantiles': {str(q): round(float(v), 1) for q, v in zip(QUANTILES, result['quantiles'])},
+        'analyzed_at': now or datetime.utcnow()
+    }
+    return summary, items
+
+
+def analyze_test(test_id):
+    """
+    对测试做项目分析并写入统计表（不提交），返回分析结果，没有提交时返回 None
+    统计表中不在本次样本里的题目清空分析字段
+    """
+    loaded = load_matrix(test_id)
+    analysis = summarize(loaded) if loaded is not None else None
+    if analysis is None:
+        return None
+    summary, items = analysis
+    question_ids = [item['qid'] for item in items]
+
+    table = QuestionStat.__table__
+    db.session.execute(
+        table.update().where(table.c.test_id == test_id).where(table.c.question_id.notin_(question_ids))
+        .values(difficulty=None, discrimination=None, point_biserial=None)
+    )
+    db.session.execute(
+        table.update().where(table.c.test_id == test_id).where(table.c.question_id == bindparam('qid')),
+        items
+    )
+    table = TestResult.__table__
+    db.session.execute(table.update().where(table.c.test_id == test_id).values(**summary))
+    return {**summary, 'items': items}
@@ -0,0 +1,162 @@
+"""
+练习提交
+- 做题状态和每日计数都用单条 INSERT ... ON CONFLICT DO UPDATE 写入（SQLite / PostgreSQL），
+  依赖 (user_id, problem_id) 和 (user_id, submission_date) 唯一约束，不需要先查询，并发提交也不会重复插入或丢失计数
+- 做题状态以作答时间最新的一次为准（离线同步的旧作答不会覆盖更新的状态），每日计数在数据库端累加
+- 批量提交：一次请求判分并保存多道题的作答，整批只查一次题目，在一个事务中提交
+- 保存作答后同步更新该用户的推荐队列
+"""
+from app import db
+from app.models.problem import Problem, UserProblemStatus, DailyUserSubmission
+from app.models.data_version import dialect_insert, bump_version
+from app.services.grading import grade_answer
+from app.services.recommender import refresh_after_submit
+from sqlalchemy import func, or_
+from datetime import datetime, timezone, timedelta
+
+MAX_BATCH_SIZE = 100
+
+# 允许客户端时钟比服务器快的范围，超出时按服务器当前时间记录
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def status_label(is_correct):
+    return '正确' if is_correct else '错误'
+
+
+def upsert_problem_statuses(rows):
+    """
+    写入做题状态（不提交）
+    rows: [{'user_id', 'problem_id', 'status', 'submitted_at'}]
+    已有记录只在新作答时间不早于原记录时更新
+    """
+    if not rows:
+        return
+    table = UserProblemStatus.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.problem_id],
+        set_={'status': stmt.excluded.status, 'submitted_at': stmt.excluded.submitted_at},
+        where=or_(table.c.submitted_at.is_(None), table.c.submitted_at <= stmt.excluded.submitted_at)
+    )
+    db.session.execute(stmt, rows)
+
+
+def increment_daily_submissions(user_id, counts):
+    """
+    累加每日提交数（不提交）
+    counts: {日期: 新增数量}
+    """
+    if not counts:
+        return
+    table = DailyUserSubmission.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.submission_date],
+        set_={'count': func.coalesce(table.c['count'], 0) + stmt.excluded['count']}
+    )
+    db.session.execute(stmt, [
+        {'user_id': user_id, 'submission_date': day, 'count': count}
+        for day, count in sorted(counts.items())
+    ])
+
+
+def record_answer(user_id, problem_id, is_correct):
+    """保存一次即时作答（不提交）"""
+    upsert_problem_statuses([{
+        'user_id': user_id,
+        'problem_id': problem_id,
+        'status': status_label(is_correct),
+        'submitted_at': datetime.utcnow()
+    }])
+    increment_daily_submissions(user_id, {datetime.now().date(): 1})
+    refresh_after_submit(user_id, [problem_id])
+    bump_version(f'user:{user_id}')
+
+
+def parse_answered_at(value, now):
+    """
+    解析作答时间，返回 (UTC 时间, 本地日期)
+    不带时区的时间按 UTC 处理，与 submitted_at 的存储方式一致
+    """
+    if not value:
+        moment = now
+    else:
+        moment = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        if moment > now + CLOCK_SKEW:
+            moment = now
+    return moment.astimezone(timezone.utc).replace(tzinfo=None), moment.astimezone().date()
+
+
+def _validate_items(items, now):
+    """校验提交项，返回 (有效项列表, 结果列表)，无效项的结果中带 error"""
+    valid = []
+    results = []
+    for index, item in enumerate(items):
+        result = {'index': index, 'problem_id': item.get('problem_id') if isinstance(item, dict) else None}
+        results.append(result)
+        if not isinstance(item, dict):
+            result['error'] = 'Invalid item'
+            continue
+        try:
+            problem_id = int(item.get('problem_id'))
+        except (TypeError, ValueError):
+            result['error'] = 'Invalid problem_id'
+            continue
+        answer = item.get('answer')
+        if answer is None:
+            result['error'] = 'No answer provided'
+            continue
+        try:
+            submitted_at, day = parse_answered_at(item.get('answered_at'), now)
+        except ValueError:
+            result['error'] = 'Invalid answered_at'
+            continue
+        result['problem_id'] = problem_id
+        valid.append((result, problem_id, answer, submitted_at, day))
+    return valid, results
+
+
+def submit_batch(user_id, items):
+    """
+    批量判分并保存作答，返回每一项的结果（顺序与提交顺序一致）
+    调用方负责提交事务
+    """
+    now = datetime.now(timezone.utc)
+    valid, results = _validate_items(items, now)
+
+    problem_ids = {problem_id for _, problem_id, _, _, _ in valid}
+    problems = {p.id: p for p in Problem.query.filter(Problem.id.in_(problem_ids))} if problem_ids else {}
+
+    status_rows = {}  # 同一道题只保留最后一次作答，同一条语句中不能两次更新同一行
+    daily_counts = {}
+    # 按作答时间顺序写入，同一道题多次作答时最后一次决定状态
+    for result, problem_id, answer, submitted_at, day in sorted(valid, key=lambda v: v[3]):
+        problem = problems.get(problem_id)
+        if problem is None:
+            result['error'] = 'Problem not found'
+            continue
+
+        is_correct = grade_answer(problem, answer)
+        result.update({
+            'correct': is_correct,
+            'correct_answer': problem.correct_answer,
+            'explanation': problem.explanation
+        })
+        status_rows[problem_id] = {
+            'user_id': user_id,
+            'problem_id': problem_id,
+            'status': status_label(is_correct),
+            'submitted_at': submitted_at
+        }
+        daily_counts[day] = daily_counts.get(day, 0) + 1
+
+    if status_rows:
+        upsert_problem_statuses(list(status_rows.values()))
+        increment_daily_submissions(user_id, daily_counts)
+        refresh_after_submit(user_id, list(status_rows))
+        bump_version(f'user:{user_id}')
+
+    return results
@@ -0,0 +1,191 @@
+from app import db
+from app.models.problem import Problem
+from app.models.study_record import KnowledgePoint, problem_topics
+from app.services.search_service import match_subquery, highlight, highlight_snippet
+from sqlalchemy import func, select, or_, and_
+from datetime import datetime
+import base64
+import json
+
+# 列表接口允许的排序字段，'-' 前缀表示降序
+SORT_FIELDS = {
+    'id': Problem.id,
+    'difficulty': Problem.difficulty,
+    'created_at': Problem.created_at
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_sort(sort):
+    """解析排序参数，返回 (字段名, 是否降序)，非法值回退到按ID升序"""
+    sort = (sort or 'id').strip()
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        return 'id', False
+    return field, descending
+
+
+def encode_cursor(field, problem):
+    """把当前页最后一条记录的排序键编码成游标"""
+    value = getattr(problem, field)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, problem.id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(field, cursor):
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('游标格式错误')
+    if field == 'created_at' and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, int(last_id)
+
+
+def apply_filters(query, filters, exclude=None):
+    """
+    在查询上叠加筛选条件
+    - filters: {'type', 'difficulty', 'topic', 'q'}，值为空表示不筛选
+    - exclude: 计算某个维度的分面计数时跳过该维度自身的筛选
+    """
+    if filters.get('type') and exclude != 'type':
+        query = query.filter(Problem.type == filters['type'])
+    if filters.get('difficulty') and exclude != 'difficulty':
+        query = query.filter(Problem.difficulty == filters['difficulty'])
+    if filters.get('topic') and exclude != 'topic':
+        # 通过知识点关联表筛选，走 (knowledge_id, problem_id) 索引
+        topic_problem_ids = select(problem_topics.c.problem_id).join(
+            KnowledgePoint, KnowledgePoint.id == problem_topics.c.knowledge_id
+        ).where(KnowledgePoint.name == filters['topic'])
+        query = query.filter(Problem.id.in_(topic_problem_ids))
+    if filters.get('q'):
+        keyword = filters['q']
+        matched = match_subquery(keyword)
+        if matched is not None:
+            # 全文索引匹配标题、题干、解析和知识点
+            query = query.filter(Problem.id.in_(select(matched.c.problem_id)))
+        else:
+            query = query.filter(or_(
+                Problem.title.contains(keyword, autoescape=True),
+                Problem.content.contains(keyword, autoescape=True),
+                Problem.topics.contains(keyword, autoescape=True)
+            ))
+    return query
+
+
+def _keyset_condition(column, descending, value, last_id):
+    """游标翻页条件：(排序值, id) 严格位于上一页最后一条之后"""
+    if descending:
+        return or_(column < value, and_(column == value, Problem.id < last_id))
+    return or_(column > value, and_(column == value, Problem.id > last_id))
+
+
+def _topic_facets(filters):
+    """统计每个知识点下的题目数，关联表上按知识点分组计数"""
+    query = db.session.query(KnowledgePoint.name, func.count(problem_topics.c.problem_id)) \
+        .join(problem_topics, problem_topics.c.knowledge_id == KnowledgePoint.id) \
+        .join(Problem, Problem.id == problem_topics.c.problem_id)
+    query = apply_filters(query, filters, exclude='topic').group_by(KnowledgePoint.name)
+    return {name: count for name, count in query}
+
+
+def _column_facets(column, filters, exclude):
+    query = apply_filters(
+        db.session.query(column, func.count(Problem.id)),
+        filters,
+        exclude=exclude
+    ).group_by(column)
+    return {value: count for value, count in query}
+
+
+def get_problem_facets(filters):
+    """计算题型、难度、知识点三个维度的分面计数，每个维度不受自身筛选条件影响"""
+    return {
+        'type': _column_facets(Problem.type, filters, 'type'),
+        'difficulty': _column_facets(Problem.difficulty, filters, 'difficulty'),
+        'topic': _topic_facets(filters)
+    }
+
+
+def list_problems(filters, sort=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    分页获取题目列表
+    - 筛选、排序、分页和分面计数都在数据库中完成
+    - 使用 (排序字段, id) 作为游标，翻页代价与页码无关
+    - 返回 {'problems', 'next_cursor', 'total', 'facets'}
+    """
+    field, descending = parse_sort(sort)
+    column = SORT_FIELDS[field]
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+    query = apply_filters(Problem.query, filters)
+    total = query.order_by(None).count()
+
+    if cursor:
+        value, last_id = decode_cursor(field, cursor)
+        query = query.filter(_keyset_condition(column, descending, value, last_id))
+
+    if descending:
+        query = query.order_by(column.desc(), Problem.id.desc())
+    else:
+        query = query.order_by(column.asc(), Problem.id.asc())
+
+    # 多取一条用来判断是否还有下一页
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'problems': [{
+            'id': problem.id,
+            'title': problem.title,
+            'type': problem.type,
+            'difficulty': problem.difficulty,
+            'topics': problem.topics.split(',') if problem.topics else []
+        } for problem in rows],
+        'next_cursor': encode_cursor(field, rows[-1]) if has_more else None,
+        'total': total,
+        'facets': get_problem_facets(filters)
+    }
+
+
+def search_problems(keywords, filters=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+    """
+    全文检索题目，按相关度排序
+    - filters 同 list_problems（不含 q），用于在检索结果中再按题型/难度/知识点筛选
+    - 返回 {'problems', 'total'}，每道题附带高亮后的标题和题干片段
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    offset = max(0, int(offset or 0))
+    filters = {k: v for k, v in (filters or {}).items() if k != 'q'}
+
+    matched = match_subquery(keywords)
+    if matched is None:
+        return {'problems': [], 'total': 0}
+
+    query = apply_filters(
+        db.session.query(Problem, matched.c.rank).join(matched, matched.c.problem_id == Problem.id),
+        filters
+    )
+    total = query.order_by(None).count()
+    rows = query.order_by(matched.c.rank, Problem.id).offset(offset).limit(limit).all()
+
+    return {
+        'problems': [{
+            'id': problem.id,
+            'title': problem.title,
+            'type': problem.type,
+            'difficulty': problem.difficulty,
+            'topics': problem.topics.split(',') if problem.topics else [],
+            'title_highlight': highlight(problem.title, keywords),
+            'snippet': highlight_snippet(problem, keywords),
+            'score': round(-rank, 4)
+        } for problem, rank in rows],
+        'total': total
+    }
@@ -0,0 +1,274 @@
+"""
+练习推荐
+- 推荐分数 = 知识点薄弱程度 * 0.6 + 难度合适程度 * 0.4，之前做错的题目额外加分，做对的题目不再推荐
+  * 知识点薄弱程度：1 - 该知识点的平滑正确率 (正确数 + 1) / (作答数 + 2)，题目有多个知识点时取平均
+  * 难度合适程度：按知识点正确率推算目标难度（正确率越高目标难度越高），题目难度越接近目标越合适
+- 每个用户有一个预先算好的候选队列（user_problem_queue），取推荐时直接按分数读取，不扫描题库；
+  只有第一次取推荐（队列还不存在）时按整个题库生成
+- 提交答案后只重新计算所提交题目的知识点下的题目分数；做对的题目移出队列，
+  队列少于 REFILL_THRESHOLD 道且题库中还有未进入队列的题目时，按缺少的数量从题库补充
+- 题库版本变化（新增、导入题目）后，下次取推荐时只计算上次之后新增的题目并并入队列；
+  已有题目的难度、知识点修改后，分数在相关知识点下一次提交答案时更新
+- exclude 只影响本次返回的题目，不会因此补充队列
+"""
+from app import db
+from app.models.problem import Problem, UserProblemStatus
+from app.models.study_record import problem_topics
+from app.models.recommendation import UserProblemQueue, RecommendationState
+from app.models.data_version import dialect_insert, get_versions
+from sqlalchemy import case, func, select
+from collections import defaultdict
+from datetime import datetime
+
+QUEUE_SIZE = 200
+# 队列少于这个数量时从题库补充到 QUEUE_SIZE
+REFILL_THRESHOLD = QUEUE_SIZE // 2
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 20
+
+WEIGHT_WEAKNESS = 0.6
+WEIGHT_DIFFICULTY = 0.4
+RETRY_BONUS = 0.1
+
+# 没有知识点的题目按中等薄弱程度计算
+DEFAULT_WEAKNESS = 0.5
+
+
+def _topic_stats(user_id, topic_ids=None):
+    """{知识点ID: (做对题数, 作答题数)}"""
+    correct = func.sum(case((UserProblemStatus.status == '正确', 1), else_=0))
+    query = db.session.query(problem_topics.c.knowledge_id, correct, func.count()) \
+        .join(UserProblemStatus, UserProblemStatus.problem_id == problem_topics.c.problem_id) \
+        .filter(UserProblemStatus.user_id == user_id)
+    if topic_ids is not None:
+        query = query.filter(problem_topics.c.knowledge_id.in_(topic_ids))
+    return {kid: (int(right or 0), total) for kid, right, total in query.group_by(problem_topics.c.knowledge_id)}
+
+
+def _problem_topics(problem_ids=None, topic_ids=None):
+    """{题目ID: [知识点ID]}"""
+    query = select(problem_topics.c.problem_id, problem_topics.c.knowledge_id)
+    if problem_ids is not None:
+        query = query.where(problem_topics.c.problem_id.in_(problem_ids))
+    if topic_ids is not None:
+        query = query.where(problem_topics.c.problem_id.in_(
+            select(problem_topics.c.problem_id).where(problem_topics.c.knowledge_id.in_(topic_ids))
+        ))
+    topics = defaultdict(list)
+    for problem_id, knowledge_id in db.session.execute(query):
+        topics[problem_id].append(knowledge_id)
+    return topics
+
+
+def _statuses(user_id, problem_ids=None):
+    query = db.session.query(UserProblemStatus.problem_id, UserProblemStatus.status) \
+        .filter(UserProblemStatus.user_id == user_id)
+    if problem_ids is not None:
+        query = query.filter(UserProblemStatus.problem_id.in_(problem_ids))
+    return dict(query)
+
+
+def score_problem(difficulty, topic_ids, stats, status):
+    """计算一道题对该用户的推荐分数，做对的题目返回 None"""
+    if status == '正确':
+        return None
+    if topic_ids:
+        accuracies = [(stats.get(kid, (0, 0))[0] + 1) / (stats.get(kid, (0, 0))[1] + 2) for kid in topic_ids]
+        accuracy = sum(accuracies) / len(accuracies)
+        weakness = 1 - accuracy
+    else:
+        accuracy = 1 - DEFAULT_WEAKNESS
+        weakness = DEFAULT_WEAKNESS
+    target = 1 + 4 * accuracy
+    suitability = 1 - min(abs((difficulty or 3) - target), 4) / 4
+    score = WEIGHT_WEAKNESS * weakness + WEIGHT_DIFFICULTY * suitability
+    if status == '错误':
+        score += RETRY_BONUS
+    return round(score, 6)
+
+
+def _upsert_queue(user_id, scores):
+    """写入或更新队列中的分数（不提交）"""
+    if not scores:
+        return
+    table = UserProblemQueue.__table__
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.problem_id],
+        set_={'score': stmt.excluded.score}
+    )
+    db.session.execute(stmt, [
+        {'user_id': user_id, 'problem_id': pid, 'score': score} for pid, score in scores.items()
+    ])
+
+
+def _trim_queue(user_id):
+    """只保留分数最高的 QUEUE_SIZE 道题"""
+    keep = select(UserProblemQueue.problem_id).where(UserProblemQueue.user_id == user_id) \
+        .order_by(UserProblemQueue.score.desc(), UserProblemQueue.problem_id).limit(QUEUE_SIZE)
+    UserProblemQueue.query.filter(
+        UserProblemQueue.user_id == user_id,
+        UserProblemQueue.problem_id.notin_(keep.scalar_subquery())
+    ).delete(synchronize_session=False)
+
+
+def _queue_size(user_id):
+    return db.session.query(func.count()).select_from(UserProblemQueue).filter(UserProblemQueue.user_id == user_id).scalar()
+
+
+def _best(scores, count):
+    return dict(sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max(count, 0)])
+
+
+def _save_state(user_id, problems_version, max_problem_id, exhausted):
+    table = RecommendationState.__table__
+    values = {'problems_version': problems_version, 'max_problem_id': max_problem_id,
+              'exhausted': exhausted, 'updated_at': datetime.utcnow()}
+    stmt = dialect_insert(table).values(user_id=user_id, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={column: stmt.excluded[column] for column in values}
+    )
+    db.session.execute(stmt)
+
+
+def _score_bank(user_id, skip=()):
+    """按整个题库计算未做对题目的推荐分数 {题目ID: 分数}，跳过 skip 中的题目；同时返回最大题目ID"""
+    stats = _topic_stats(user_id)
+    statuses = _statuses(user_id)
+    topics = _problem_topics()
+    scores = {}
+    max_problem_id = 0
+    for problem_id, difficulty in db.session.query(Problem.id, Problem.difficulty).yield_per(1000):
+        max_problem_id = max(max_problem_id, problem_id)
+        if problem_id in skip:
+            continue
+        score = score_problem(difficulty, topics.get(problem_id), stats, statuses.get(problem_id))
+        if score is not None:
+            scores[problem_id] = score
+    return scores, max_problem_id
+
+
+def rebuild_queue(user_id):
+    """按整个题库重建用户的候选队列（不提交）"""
+    user_id = int(user_id)
+    version = get_versions(['problems'])[0]
+    scores, max_problem_id = _score_bank(user_id)
+    UserProblemQueue.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    _upsert_queue(user_id, _best(scores, QUEUE_SIZE))
+    _save_state(user_id, version, max_problem_id, len(scores) <= QUEUE_SIZE)
+
+
+def _top_up(user_id, state):
+    """从题库中补充队列缺少的题目（不提交），已在队列中的题目不重新计算"""
+    queued = {pid for (pid,) in db.session.query(UserProblemQueue.problem_id).filter(UserProblemQueue.user_id == user_id)}
+    missing = QUEUE_SIZE - len(queued)
+    scores, _ = _score_bank(user_id, skip=queued)
+    _upsert_queue(user_id, _best(scores, missing))
+    state.exhausted = len(scores) <= missing
+
+
+def _catch_up(user_id, state, version):
+    """题库版本变化后只计算新增的题目并并入队列（不提交）"""
+    rows = db.session.query(Problem.id, Problem.difficulty).filter(Problem.id > state.max_problem_id).all()
+    max_problem_id = max([state.max_problem_id] + [problem_id for problem_id, _ in rows])
+    scores = {}
+    if rows:
+        new_ids = [problem_id for problem_id, _ in rows]
+        topics = _problem_topics(problem_ids=new_ids)
+        topic_ids = {kid for kids in topics.values() for kid in kids}
+        stats = _topic_stats(user_id, topic_ids) if topic_ids else {}
+        statuses = _statuses(user_id, new_ids)
+        for problem_id, difficulty in rows:
+            score = score_problem(difficulty, topics.get(problem_id), stats, statuses.get(problem_id))
+            if score is not None:
+                scores[problem_id] = score
+    exhausted = state.exhausted
+    if scores:
+        # 队列原本包含全部未做对的题目时，新题目全部放得下才仍然算包含全部
+        exhausted = exhausted and _queue_size(user_id) + len(scores) <= QUEUE_SIZE
+        _upsert_queue(user_id, scores)
+        _trim_queue(user_id)
+    _save_state(user_id, version, max_problem_id, exhausted)
+
+
+def refresh_after_submit(user_id, problem_ids):
+    """
+    提交答案后增量更新队列（不提交）
+    只重新计算与所提交题目共享知识点的题目；队列尚未生成时跳过，下次取推荐时再整队生成
+    """
+    user_id = int(user_id)
+    state = db.session.get(RecommendationState, user_id)
+    if not problem_ids or state is None:
+        return
+    submitted_topics = _problem_topics(problem_ids=problem_ids)
+    topic_ids = {kid for kids in submitted_topics.values() for kid in kids}
+    affected = _problem_topics(topic_ids=topic_ids) if topic_ids else {}
+    for problem_id in problem_ids:
+        affected.setdefault(problem_id, submitted_topics.get(problem_id, []))
+
+    # 受影响的题目可能还有其他知识点，这些知识点的正确率也要一起读出
+    all_topic_ids = {kid for kids in affected.values() for kid in kids}
+    stats = _topic_stats(user_id, all_topic_ids) if all_topic_ids else {}
+    statuses = _statuses(user_id, list(affected))
+    difficulties = dict(db.session.query(Problem.id, Problem.difficulty).filter(Problem.id.in_(list(affected))))
+
+    scores = {}
+    solved = []
+    for problem_id, kids in affected.items():
+        if problem_id not in difficulties:
+            continue
+        score = score_problem(difficulties[problem_id], kids, stats, statuses.get(problem_id))
+        if score is None:
+            solved.append(problem_id)
+        else:
+            scores[problem_id] = score
+
+    if solved:
+        UserProblemQueue.query.filter(
+            UserProblemQueue.user_id == user_id,
+            UserProblemQueue.problem_id.in_(solved)
+        ).delete(synchronize_session=False)
+    _upsert_queue(user_id, scores)
+    _trim_queue(user_id)
+    # 做对的题目移出队列后，队列太短时从题库补充
+    if not state.exhausted and _queue_size(user_id) < REFILL_THRESHOLD:
+        _top_up(user_id, state)
+
+
+def next_problems(user_id, limit=DEFAULT_LIMIT, exclude=()):
+    """
+    取推荐题目：队列不存在时按整个题库生成，题库版本变化后只并入新增的题目
+    exclude: 当前页面上已经展示过、不希望重复推荐的题目ID，只影响本次返回的题目
+    """
+    user_id = int(user_id)
+    state = db.session.get(RecommendationState, user_id)
+    version = get_versions(['problems'])[0]
+    if state is None or state.max_problem_id is None:
+        rebuild_queue(user_id)
+        db.session.commit()
+    elif state.problems_version != version:
+        _catch_up(user_id, state, version)
+        db.session.commit()
+    return _read_queue(user_id, limit, exclude)
+
+
+def _read_queue(user_id, limit, exclude):
+    query = db.session.query(
+        Problem.id, Problem.title, Problem.type, Problem.difficulty, Problem.topics, UserProblemQueue.score
+    ).join(UserProblemQueue, UserProblemQueue.problem_id == Problem.id) \
+        .filter(UserProblemQueue.user_id == user_id)
+    if exclude:
+        query = query.filter(UserProblemQueue.problem_id.notin_(exclude))
+    rows = query.order_by(UserProblemQueue.score.desc(), UserProblemQueue.problem_id).limit(limit)
+    return [
+        {
+            'id': row.id,
+            'title': row.title,
+            'type': row.type,
+            'difficulty': row.difficulty,
+            'topics': row.topics.split(',') if row.topics else [],
+            'score': row.score
+        }
+        for row in rows
+    ]
@@ -0,0 +1,190 @@
+"""
+测试结果
+- 提交时判分一次，把结果页需要的全部内容（每道题的对错、知识点统计、薄弱知识点、题目详情）序列化后存入 test_submissions.result_json
+- 作答提交后不会再变化，结果接口只需读出最近一次提交的 result_json，查询次数与题目数量无关
+- 每道题的作答同时写入 submission_answers（一次批量插入），统计直接在数据库中按题目分组聚合
+- 为兼容迁移，这里读取测试和提交记录时只查询需要的列
+"""
+from app import db
+from app.models.test import Test, TestSubmission, SubmissionAnswer, load_question_ids
+from app.models.problem import Problem
+from app.services.grading import grade_test
+from app.services.snapshot_service import load_snapshot
+from app.utils.json_codec import join_array, with_raw_field
+import json
+
+# 知识点正确率低于这个值视为薄弱知识点
+WEAK_TOPIC_ACCURACY = 0.6
+
+
+def load_test_info(test_id):
+    """测试基本信息（与 Test.to_dict() 一致），测试不存在时返回 None"""
+    test = db.session.query(
+        Test.id, Test.title, Test.description, Test.type, Test.total_questions, Test.estimated_time,
+        Test.topics, Test.difficulty, Test.created_at, Test.deadline, Test.created_by
+    ).filter(Test.id == test_id).first()
+    if test is None:
+        return None
+    return {
+        'id': test.id,
+        'title': test.title,
+        'description': test.description,
+        'type': test.type,
+        'total_questions': test.total_questions,
+        'estimated_time': test.estimated_time,
+        'topics': test.topics.split(',') if test.topics else [],
+        'difficulty': test.difficulty,
+        'problem_ids': load_question_ids([test.id]).get(test.id, []),
+        'created_at': test.created_at.isoformat() if test.created_at else None,
+        'deadline': test.deadline.isoformat() if test.deadline else None,
+        'created_by': test.created_by
+    }
+
+
+def paper_problem_ids(test_info, paper_version):
+    """学生作答的题目列表：有试卷版本时以快照为准，否则使用测试当前的题目列表"""
+    if paper_version:
+        return list(load_snapshot(test_info['id'], paper_version)[3])
+    return test_info['problem_ids']
+
+
+def grade_submission(problem_ids, answers):
+    """
+    判分并生成结果页的各部分
+    返回 {'results'({题目ID: 是否正确}), 'score', 'correct_count', 'total_questions', 'topic_analysis', 'problems'(JSON片段列表)}
+    """
+    problems_dict = {p.id: p for p in Problem.query.filter(Problem.id.in_(problem_ids))}
+    problems = [problems_dict[pid] for pid in problem_ids if pid in problems_dict]
+    grading = grade_test(problems, answers)
+    results = grading['results']
+
+    problems_details = []
+    topic_stats = {}
+    for problem in problems:
+        is_correct = results[problem.id]
+        if problem.topics:
+            for topic in problem.topics.split(','):
+                stats = topic_stats.setdefault(topic, {'correct': 0, 'total': 0})
+                stats['total'] += 1
+                if is_correct:
+                    stats['correct'] += 1
+        problems_details.append(problem.public_fragment({
+            'user_answer': answers.get(str(problem.id)),
+            'correct_answer': problem.correct_answer,
+            'explanation': problem.explanation,
+            'is_correct': is_correct
+        }))
+
+    # 计算知识点掌握度
+    topic_mastery = {}
+    weak_topics = []
+    for topic, stats in topic_stats.items():
+        accuracy = stats['correct'] / stats['total']
+        topic_mastery[topic] = round(accuracy * 100, 2)
+        if accuracy < WEAK_TOPIC_ACCURACY:
+            weak_topics.append({'topic': topic, 'accuracy': accuracy * 100})
+
+    return {
+        'results': results,
+        'score': grading['score'],
+        'correct_count': grading['correct_count'],
+        'total_questions': grading['total_questions'],
+        'topic_analysis': {
+            'topic_mastery': topic_mastery,
+            'topic_counts': topic_stats,
+            'weak_topics': sorted(weak_topics, key=lambda x: x['accuracy'])
+        },
+        'problems': problems_details
+    }
+
+
+def result_payload(test_info, submission, report):
+    """序列化结果页，submission 需要 score、submit_time、duration"""
+    return with_raw_field({
+        'test_info': test_info,
+        'submission_info': {
+            'score': submission.score,
+            'submit_time': submission.submit_time.isoformat(),
+            'duration': submission.duration,
+            'correct_count': report['correct_count'],
+            'total_count': len(report['problems'])
+        },
+        'topic_analysis': report['topic_analysis']
+    }, 'problems', join_array(report['problems']))
+
+
+def _answer_text(answer):
+    if answer is None or isinstance(answer, str):
+        return answer
+    return json.dumps(answer, ensure_ascii=False)
+
+
+def save_submission_answers(submission_id, answers, results, time_spent=None):
+    """
+    把每道题的作答写入 submission_answers（不提交），一条批量 INSERT
+    results: {题目ID: 是否正确}，即试卷中的全部题目；time_spent: {题目ID字符串: 秒}
+    返回写入的行
+    """
+    time_spent = time_spent or {}
+    rows = []
+    for problem_id, is_correct in results.items():
+        seconds = time_spent.get(str(problem_id))
+        rows.append({
+            'submission_id': submission_id,
+            'problem_id': problem_id,
+            'answer': _answer_text(answers.get(str(problem_id))),
+            'is_correct': bool(is_correct),
+            'time_spent': int(seconds) if isinstance(seconds, (int, float)) else None
+        })
+    if rows:
+        db.session.execute(SubmissionAnswer.__table__.insert(), rows)
+    return rows
+
+
+def backfill_submission_answers(submission_id):
+    """从提交记录的 answers JSON 重新判分并写入 submission_answers（不提交）"""
+    submission = db.session.query(
+        TestSubmission.id, TestSubmission.test_id, TestSubmission.answers, TestSubmission.paper_version
+    ).filter(TestSubmission.id == submission_id).one()
+    test_info = load_test_info(submission.test_id)
+    if test_info is None:
+        return
+    problem_ids = paper_problem_ids(test_info, submission.paper_version)
+    problems = Problem.query.filter(Problem.id.in_(problem_ids)).all()
+    answers = json.loads(submission.answers)
+    save_submission_answers(submission_id, answers, grade_test(problems, answers)['results'])
+
+
+def rebuild_result(submission_id):
+    """重新判分并保存一条提交的结果（不提交），返回序列化后的结果"""
+    submission = db.session.query(
+        TestSubmission.id, TestSubmission.test_id, TestSubmission.answers, TestSubmission.score,
+        TestSubmission.submit_time, TestSubmission.duration, TestSubmission.paper_version
+    ).filter(TestSubmission.id == submission_id).one()
+    test_info = load_test_info(submission.test_id)
+    if test_info is None:
+        return None
+    report = grade_submission(paper_problem_ids(test_info, submission.paper_version), json.loads(submission.answers))
+    payload = result_payload(test_info, submission, report)
+    db.session.execute(
+        TestSubmission.__table__.update()
+        .where(TestSubmission.__table__.c.id == submission_id)
+        .values(result_json=payload.decode('utf-8'))
+    )
+    return payload
+
+
+def load_latest_result(test_id, user_id):
+    """读取用户在该测试上最近一次提交的结果，没有提交时返回 None"""
+    row = db.session.query(TestSubmission.id, TestSubmission.result_json).filter(
+        TestSubmission.test_id == test_id,
+        TestSubmission.user_id == user_id
+    ).order_by(TestSubmission.submit_time.desc(), TestSubmission.id.desc()).first()
+    if row is None:
+        return None
+    if row.result_json is not None:
+        return row.result_json.encode('utf-8')
+    # 旧版本写入、尚未生成结果的提交
+    payload = rebuild_result(row.id)
+    db.session.commit()
+    return payload
@@ -0,0 +1,199 @@
+"""
+题目全文检索
+- 基于 SQLite FTS5，索引题目的标题、题干、解析和知识点
+- 中文没有空格分词，写入索引前把连续的汉字切成重叠的二元组（"调和级数" -> "调和 和级 级数"），
+  查询词按同样方式切分后做短语匹配，相当于子串匹配，两个字的词也能命中
+- 单个汉字按前缀匹配二元组，连续汉字的最后一个字不是任何二元组的开头，
+  所以另有一列 chars 存放题目中出现过的单字（"数" 能命中 "调和级数"）
+- 索引表以题目ID作为 rowid，题目写入时同步更新
+"""
+from app import db
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.exc import OperationalError
+import html
+import re
+
+FTS_TABLE = 'problem_fts'
+
+# 标题、题干、解析、知识点、单字各列的 bm25 权重
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 5.0, 1.0)
+
+SNIPPET_WIDTH = 40
+
+_CJK_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_TOKEN = re.compile(r'\w+')
+
+_fts_available = None
+
+
+def segment(value):
+    """把文本中的连续汉字切成以空格分隔的二元组，其余部分交给 FTS 的 unicode61 分词器处理"""
+    if not value:
+        return ''
+    parts = []
+    pos = 0
+    for match in _CJK_RUN.finditer(value):
+        run = match.group()
+        grams = [run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)]
+        parts.append(value[pos:match.start()])
+        parts.append(' %s ' % ' '.join(grams))
+        pos = match.end()
+    parts.append(value[pos:])
+    return ''.join(parts)
+
+
+def cjk_chars(*values):
+    """文本中出现过的汉字（去重，以空格分隔）"""
+    chars = dict.fromkeys(ch for value in values if value for run in _CJK_RUN.findall(value) for ch in run)
+    return ' '.join(chars)
+
+
+def build_match_query(keywords):
+    """
+    把用户输入转换成 FTS5 MATCH 表达式
+    - 空格分隔的多个词之间是“与”的关系
+    - 每个词切分后作为短语匹配；单个汉字用前缀匹配（二元组的第一个字或 chars 列中的单字）
+    - 只保留字母数字，避免用户输入破坏 MATCH 语法
+    """
+    clauses = []
+    for term in (keywords or '').split():
+        tokens = [token.lower() for token in _TOKEN.findall(segment(term))]
+        if not tokens:
+            continue
+        if len(tokens) == 1 and len(tokens[0]) == 1 and _CJK_RUN.match(tokens[0]):
+            clauses.append('"%s"*' % tokens[0])
+        else:
+            clauses.append('"%s"' % ' '.join(tokens))
+    return ' '.join(clauses) or None
+
+
+def fts_available():
+    """当前数据库是否支持 FTS5（编译时未启用时退回到 LIKE 查询）"""
+    global _fts_available
+    if _fts_available is None:
+        try:
+            ensure_search_index()
+            _fts_available = True
+        except OperationalError:
+            db.session.rollback()
+            _fts_available = False
+    return _fts_available
+
+
+def ensure_search_index():
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+        f"USING fts5(title, content, explanation, topics, chars, tokenize='unicode61')"
+    ))
+
+
+def _index_row(problem_id, title, content, explanation, topics):
+    return {
+        'id': problem_id,
+        'title': segment(title),
+        'content': segment(content),
+        'explanation': segment(explanation),
+        'topics': segment((topics or '').replace(',', ' ')),
+        'chars': cjk_chars(title, content, explanation, topics)
+    }
+
+
+_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, title, content, explanation, topics, chars) "
+    f"VALUES (:id, :title, :content, :explanation, :topics, :chars)"
+)
+
+
+def index_problems(problems):
+    """写入或更新若干题目的索引（不提交，跟随调用方的事务），题目需要 id、title、content、explanation、topics"""
+    if not fts_available():
+        return
+    rows = [_index_row(p.id, p.title, p.content, p.explanation, p.topics) for p in problems]
+    if not rows:
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{'id': r['id']} for r in rows])
+    db.session.execute(text(_INSERT), rows)
+
+
+def index_problem(problem):
+    index_problems([problem])
+
+
+def rebuild_search_index(batch_size=1000):
+    """清空并按题目表重建全文索引"""
+    from app.models.problem import Problem
+
+    if not fts_available():
+        return 0
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    count = 0
+    query = db.session.query(Problem.id, Problem.title, Problem.content, Problem.explanation, Problem.topics) \
+        .order_by(Problem.id).yield_per(batch_size)
+    batch = []
+    for row in query:
+        batch.append(_index_row(*row))
+        if len(batch) >= batch_size:
+            count += _insert_batch(batch)
+            batch = []
+    count += _insert_batch(batch)
+    return count
+
+
+def _insert_batch(rows):
+    if rows:
+        db.session.execute(text(_INSERT), rows)
+    return len(rows)
+
+
+def match_subquery(keywords):
+    """
+    返回匹配关键词的 (problem_id, rank) 子查询，rank 越小越相关
+    关键词无有效内容时返回 None
+    """
+    match = build_match_query(keywords)
+    if not match or not fts_available():
+        return None
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    return text(
+        f"SELECT rowid AS problem_id, bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(problem_id=Integer, rank=Float).subquery('fts')
+
+
+def highlight(value, keywords, width=None):
+    """
+    在原文中标出关键词（<mark>），width 不为空时只截取第一个命中位置附近的片段
+    原文先做 HTML 转义，前端可以直接作为 HTML 渲染
+    """
+    if not value:
+        return ''
+    terms = [t for t in (keywords or '').split() if t]
+    lowered = value.lower()
+    positions = [lowered.find(t.lower()) for t in terms]
+    positions = [p for p in positions if p >= 0]
+
+    if width is not None:
+        if positions:
+            start = max(0, min(positions) - width // 2)
+        else:
+            start = 0
+        end = min(len(value), start + width)
+        fragment = value[start:end]
+        prefix = '…' if start > 0 else ''
+        suffix = '…' if end < len(value) else ''
+    else:
+        fragment, prefix, suffix = value, '', ''
+
+    escaped = html.escape(fragment)
+    if terms:
+        pattern = re.compile('|'.join(re.escape(html.escape(t)) for t in sorted(terms, key=len, reverse=True)), re.I)
+        escaped = pattern.sub(lambda m: f'<mark>{m.group()}</mark>', escaped)
+    return prefix + escaped + suffix
+
+
+def highlight_snippet(problem, keywords, width=SNIPPET_WIDTH):
+    """优先从题干中截取命中片段，题干没有命中时再看解析"""
+    for value in (problem.content, problem.explanation):
+        if value and any(t.lower() in value.lower() for t in keywords.split()):
+            return highlight(value, keywords, width)
+    return highlight(problem.content, keywords, width)
@@ -0,0 +1,339 @@
+"""
+相似题目索引
+- 两道题的相似度由三部分加权组成：知识点重合度（Jaccard）、题目文本相似度（汉字二元组/词的 TF-IDF 余弦）、难度接近程度
+- 文本向量和知识点都用倒排表存储，一道题的候选邻居只来自与它共享词项或知识点的题目，不需要和整个题库逐一比较；
+  倒排表转换成 numpy 数组累加得分，候选题目的加权相似度按数组计算
+- 每道题的前 K 个邻居写入 Problem.related_problems，接口直接读取
+- 新增题目时只计算这道题的邻居，并把它插入到受影响题目的邻居列表中；
+  IDF 在增量更新时不重新计算，题库变化较大后可用 flask problems related 全量重建
+"""
+from app import db
+from app.models.problem import Problem
+from app.models.study_record import problem_topics
+from app.models.data_version import get_versions, bump_version
+from app.services.search_service import segment
+from collections import Counter, defaultdict
+from sqlalchemy import bindparam, select
+import heapq
+import math
+import re
+import numpy as np
+
+TOP_K = 10
+
+WEIGHT_TOPIC = 0.5
+WEIGHT_TEXT = 0.35
+WEIGHT_DIFFICULTY = 0.15
+
+# 每道题只保留权重最高的若干个词项，出现在过半题目中的词项视为停用词
+MAX_TERMS = 64
+MAX_DF_RATIO = 0.5
+MIN_DOCS_FOR_DF_CUTOFF = 20
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(*values):
+    tokens = []
+    for value in values:
+        tokens.extend(token.lower() for token in _TOKEN.findall(segment(value or '')))
+    return tokens
+
+
+class SimilarityIndex:
+    """
+    内存中的倒排索引，题目按加入顺序编号（位置），倒排表中存放位置
+    计算一道题的候选邻居时，把它的词项和知识点的倒排表拼接成数组，用 bincount 一次累加出与每个位置的
+    文本相似度和共享知识点数，再对候选位置按数组计算加权相似度
+    """
+
+    def __init__(self):
+        self.vectors = {}  # 题目ID -> {词项: 权重}（已归一化）
+        self.topics = {}  # 题目ID -> frozenset(知识点ID)
+        self.difficulty = {}
+        self.position = {}  # 题目ID -> 位置
+        self.ids = np.empty(0, dtype=np.int64)  # 位置 -> 题目ID，已删除的位置为 -1
+        self.difficulties = np.empty(0)
+        self.topic_counts = np.empty(0)
+        self.term_postings = defaultdict(dict)  # 词项 -> {位置: 权重}
+        self.topic_postings = defaultdict(set)  # 知识点ID -> {位置}
+        self._arrays = {}  # 倒排表转换成的数组，倒排表变化时丢弃
+        self.df = Counter()
+        self.stop_terms = set()
+        self.related = {}  # 题目ID -> [(相似度, 邻居ID)]，相似度为 None 表示从数据库读出、尚未计算
+        self.version = None
+
+    @classmethod
+    def build(cls, rows, related=None):
+        """rows: [(题目ID, 标题, 题干, 难度, 知识点ID集合)]"""
+        index = cls()
+        term_counts = {}
+        for problem_id, title, content, difficulty, topic_ids in rows:
+            counts = Counter(tokenize(title, content))
+            term_counts[problem_id] = counts
+            index.df.update(counts.keys())
+            index.topics[problem_id] = frozenset(topic_ids)
+            index.difficulty[problem_id] = difficulty or 0
+        if len(term_counts) >= MIN_DOCS_FOR_DF_CUTOFF:
+            limit = MAX_DF_RATIO * len(term_counts)
+            index.stop_terms = {term for term, df in index.df.items() if df > limit}
+        index._place(list(term_counts))
+        for problem_id, counts in term_counts.items():
+            index._store_vector(problem_id, counts)
+        for problem_id, ids in (related or {}).items():
+            index.related[problem_id] = [(None, rid) for rid in ids]
+        return index
+
+    def _place(self, problem_ids):
+        """给题目分配位置（追加在末尾），记录知识点倒排表和按位置的难度、知识点数"""
+        start = len(self.ids)
+        for offset, problem_id in enumerate(problem_ids):
+            pos = start + offset
+            self.position[problem_id] = pos
+            for topic_id in self.topics[problem_id]:
+                self.topic_postings[topic_id].add(pos)
+                self._arrays.pop(('topic', topic_id), None)
+        self.ids = np.concatenate([self.ids, np.array(problem_ids, dtype=np.int64)])
+        self.difficulties = np.concatenate([
+            self.difficulties, np.array([self.difficulty[pid] for pid in problem_ids], dtype=np.float64)
+        ])
+        self.topic_counts = np.concatenate([
+            self.topic_counts, np.array([len(self.topics[pid]) for pid in problem_ids], dtype=np.float64)
+        ])
+
+    def _store_vector(self, problem_id, counts):
+        total = len(self.topics) or 1
+        weights = {
+            term: (1 + math.log(count)) * math.log((1 + total) / (1 + self.df[term]))
+            for term, count in counts.items()
+            if term not in self.stop_terms
+        }
+        top = heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1])
+        norm = math.sqrt(sum(w * w for _, w in top)) or 1.0
+        vector = {term: w / norm for term, w in top if w > 0}
+        self.vectors[problem_id] = vector
+        pos = self.position[problem_id]
+        for term, weight in vector.items():
+            self.term_postings[term][pos] = weight
+            self._arrays.pop(('term', term), None)
+
+    def add(self, problem_id, title, content, difficulty, topic_ids):
+        """加入（或替换）一道题"""
+        self.remove(problem_id)
+        counts = Counter(tokenize(title, content))
+        self.df.update(counts.keys())
+        self.topics[problem_id] = frozenset(topic_ids)
+        self.difficulty[problem_id] = difficulty or 0
+        self._place([problem_id])
+        self._store_vector(problem_id, counts)
+
+    def remove(self, problem_id):
+        pos = self.position.pop(problem_id, None)
+        if pos is not None:
+            self.ids[pos] = -1
+        for term in self.vectors.pop(problem_id, {}):
+            self.term_postings[term].pop(pos, None)
+            self._arrays.pop(('term', term), None)
+        for topic_id in self.topics.pop(problem_id, ()):
+            self.topic_postings[topic_id].discard(pos)
+            self._arrays.pop(('topic', topic_id), None)
+        self.difficulty.pop(problem_id, None)
+        self.related.pop(problem_id, None)
+
+    def _term_array(self, term):
+        """词项的倒排表 (位置数组, 权重数组)"""
+        key = ('term', term)
+        if key not in self._arrays:
+            postings = self.term_postings[term]
+            self._arrays[key] = (np.fromiter(postings.keys(), np.int64, len(postings)),
+                                 np.fromiter(postings.values(), np.float64, len(postings)))
+        return self._arrays[key]
+
+    def _topic_array(self, topic_id):
+        key = ('topic', topic_id)
+        if key not in self._arrays:
+            postings = self.topic_postings[topic_id]
+            self._arrays[key] = np.fromiter(postings, np.int64, len(postings))
+        return self._arrays[key]
+
+    def score(self, a, b):
+        """两道题的相似度"""
+        va, vb = self.vectors.get(a), self.vectors.get(b)
+        if va is None or vb is None:
+            return 0.0
+        if len(va) > len(vb):
+            va, vb = vb, va
+        text_score = sum(w * vb.get(term, 0.0) for term, w in va.items())
+        topics_a, topics_b = self.topics[a], self.topics[b]
+        shared = len(topics_a & topics_b)
+        union = len(topics_a) + len(topics_b) - shared
+        topic_score = shared / union if union else 0.0
+        difficulty_score = 1 - min(abs(self.difficulty[a] - self.difficulty[b]), 4) / 4
+        return WEIGHT_TOPIC * topic_score + WEIGHT_TEXT * text_score + WEIGHT_DIFFICULTY * difficulty_score
+
+    def candidates(self, problem_id):
+        """与这道题共享词项或知识点的所有题目及相似度，返回 (题目ID数组, 相似度数组)"""
+        pos = self.position.get(problem_id)
+        if pos is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        n = len(self.ids)
+        vector = self.vectors[problem_id]
+        text = np.zeros(n)
+        if vector:
+            arrays = [self._term_array(term) for term in vector]
+            text = np.bincount(np.concatenate([positions for positions, _ in arrays]),
+                               weights=np.concatenate([weights * vector[term]
+                                                       for term, (_, weights) in zip(vector, arrays)]),
+                               minlength=n)
+        shared = np.zeros(n)
+        if self.topics[problem_id]:
+            shared = np.bincount(np.concatenate([self._topic_array(kid) for kid in self.topics[problem_id]]),
+                                 minlength=n).astype(np.float64)
+        mask = (text > 0) | (shared > 0)
+        mask[pos] = False
+        found = np.flatnonzero(mask)
+
+        # 与 score 相同的计算，按候选位置向量化
+        common = shared[found]
+        union = self.topic_counts[pos] + self.topic_counts[found] - common
+        topic_score = np.divide(common, union, out=np.zeros_like(common), where=union > 0)
+        difficulty_score = 1 - np.minimum(np.abs(self.difficulties[pos] - self.difficulties[found]), 4) / 4
+        scores = WEIGHT_TOPIC * topic_score + WEIGHT_TEXT * text[found] + WEIGHT_DIFFICULTY * difficulty_score
+        return self.ids[found], scores
+
+    def neighbours(self, problem_id, k=TOP_K, candidates=None):
+        ids, scores = self.candidates(problem_id) if candidates is None else candidates
+        if len(scores) > k:
+            # 先取出不低于第 k 大相似度的候选，再排序
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = scores >= kth
+            ids, scores = ids[keep], scores[keep]
+        # 相似度相同时优先较小的ID，保证结果稳定
+        order = np.lexsort((ids, -scores))[:k]
+        return list(zip(scores[order].tolist(), ids[order].tolist()))
+
+    def scored_related(self, problem_id):
+        """读取已存邻居列表，补齐尚未计算的相似度"""
+        related = self.related.get(problem_id, [])
+        if any(s is None for s, _ in related):
+            related = [(self.score(problem_id, rid) if s is None else s, rid) for s, rid in related if rid in self.vectors]
+            related.sort(key=lambda item: (-item[0], item[1]))
+            self.related[problem_id] = related
+        return related
+
+
+_index = None
+
+
+def _load_rows():
+    topic_map = defaultdict(set)
+    for problem_id, knowledge_id in db.session.execute(select(problem_topics.c.problem_id, problem_topics.c.knowledge_id)):
+        topic_map[problem_id].add(knowledge_id)
+    rows = []
+    related = {}
+    query = db.session.query(Problem.id, Problem.title, Problem.content, Problem.difficulty, Problem.related_problems) \
+        .order_by(Problem.id).yield_per(1000)
+    for problem_id, title, content, difficulty, related_problems in query:
+        rows.append((problem_id, title, content, difficulty, topic_map.get(problem_id, ())))
+        if related_problems:
+            related[problem_id] = [int(rid) for rid in related_problems.split(',') if rid]
+    return rows, related
+
+
+def get_index(pending_bumps=0):
+    """
+    返回当前进程的索引，题库版本号变化（其他进程写入）后重新加载
+    pending_bumps: 当前事务中已经加过的版本号次数，这部分变化由调用方自己同步到索引
+    索引包含整个题库，每道题最多 MAX_TERMS 个词项，3000 道题约占 13MB，随题目数线性增长；
+    只有新增、修改题目时才会加载，读取相似题目（load_related）直接读数据库，不使用索引
+    """
+    global _index
+    version = get_versions(['problems'])[0]
+    if _index is None or _index.version != version - pending_bumps:
+        rows, related = _load_rows()
+        _index = SimilarityIndex.build(rows, related)
+        _index.version = version
+    return _index
+
+
+def _write_related(related):
+    """related: {题目ID: [邻居ID]}，不提交"""
+    if not related:
+        return
+    table = Problem.__table__
+    db.session.execute(
+        table.update().where(table.c.id == bindparam('pid')).values(related_problems=bindparam('related')),
+        [{'pid': pid, 'related': ','.join(map(str, ids))} for pid, ids in related.items()]
+    )
+
+
+def rebuild_related(k=TOP_K):
+    """全量重建所有题目的相似题目（不提交），返回邻居列表发生变化的题目ID"""
+    global _index
+    rows, stored = _load_rows()
+    index = SimilarityIndex.build(rows)
+    changed = {}
+    for problem_id, *_ in rows:
+        neighbours = index.neighbours(problem_id, k)
+        index.related[problem_id] = neighbours
+        ids = [other for _, other in neighbours]
+        if ids != stored.get(problem_id, []):
+            changed[problem_id] = ids
+    _write_related(changed)
+    if changed:
+        bump_version('problems')
+    index.version = get_versions(['problems'])[0]
+    _index = index
+    return list(changed)
+
+
+def update_related_for(problem, k=TOP_K):
+    """
+    新增或修改题目后增量更新（不提交，需在题目 flush 和 bump_version 之后调用）
+    返回邻居列表发生变化的题目ID
+    """
+    index = get_index(pending_bumps=1)
+    topic_ids = [kp.id for kp in problem.knowledge_points]
+    index.add(problem.id, problem.title, problem.content, problem.difficulty, topic_ids)
+
+    candidates = index.candidates(problem.id)
+    neighbours = index.neighbours(problem.id, k, candidates)
+    index.related[problem.id] = neighbours
+    changed = {problem.id: [other for _, other in neighbours]}
+
+    # 新题目可能挤进候选题目的前 K 个邻居
+    ids, scores = candidates
+    for other, score in zip(ids.tolist(), scores.tolist()):
+        current = [(s, rid) for s, rid in index.scored_related(other) if rid != problem.id]
+        if len(current) >= k and score <= current[-1][0]:
+            continue
+        merged = sorted(current + [(score, problem.id)], key=lambda item: (-item[0], item[1]))[:k]
+        index.related[other] = merged
+        changed[other] = [rid for _, rid in merged]
+
+    _write_related(changed)
+    index.version = get_versions(['problems'])[0]
+    return list(changed)
+
+
+def load_related(problem_id):
+    """读取一道题的相似题目摘要，按相似度顺序"""
+    related_problems = db.session.query(Problem.related_problems).filter(Problem.id == problem_id).scalar()
+    ids = [int(rid) for rid in related_problems.split(',') if rid] if related_problems else []
+    if not ids:
+        return []
+    rows = {
+        row.id: row for row in db.session.query(
+            Problem.id, Problem.title, Problem.type, Problem.difficulty, Problem.topics
+        ).filter(Problem.id.in_(ids))
+    }
+    return [
+        {
+            'id': rid,
+            'title': rows[rid].title,
+            'type': rows[rid].type,
+            'difficulty': rows[rid].difficulty,
+            'topics': rows[rid].topics.split(',') if rows[rid].topics else []
+        }
+        for rid in ids if rid in rows
+    ]
@@ -0,0 +1,91 @@
+"""
+试卷快照
+- 教师发布测试时把学生看到的试卷（测试信息 + 按顺序排列的题目）序列化成一份 JSON，连同 gzip 压缩版本存入 test_snapshots
+- 快照生成后不再修改：之后修改题目不会影响已发布的试卷，教师重新发布时生成新版本
+- 试卷接口先读出当前版本号，再按 (测试ID, 版本号) 取快照；快照不可变，进程内可以一直缓存
+- 尚未发布过的测试（初始化数据、导入的测试）在第一次打开时自动发布
+"""
+from app import db
+from app.models.test import Test, TestSnapshot
+from app.models.problem import Problem
+from app.utils.json_codec import join_array, with_raw_field
+from sqlalchemy.exc import IntegrityError
+from functools import lru_cache
+import gzip
+import hashlib
+
+# 小于这个大小的试卷不压缩
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+def build_paper(test, version, problem_ids):
+    """序列化学生试卷，题目部分直接拼接预先生成的JSON片段"""
+    problems = {p.id: p for p in Problem.query.filter(Problem.id.in_(problem_ids))}
+    ordered_problems = [problems[pid] for pid in problem_ids if pid in problems]
+    return with_raw_field({
+        'test_info': {
+            'id': test.id,
+            'title': test.title,
+            'description': test.description,
+            'type': test.type,
+            'total_questions': test.total_questions,
+            'estimated_time': test.estimated_time,
+            'topics': test.topics.split(',') if test.topics else [],
+            'difficulty': test.difficulty,
+            'created_at': test.created_at.isoformat() if test.created_at else None,
+            'deadline': test.deadline.isoformat() if test.deadline else None,
+            'version': version
+        }
+    }, 'problems', join_array([p.public_fragment() for p in ordered_problems]))
+
+
+def publish_test(test):
+    """生成新版本的试卷快照并设为当前版本（不提交），返回快照"""
+    version = (test.published_version or 0) + 1
+    problem_ids = test.question_ids()
+    payload = build_paper(test, version, problem_ids)
+    snapshot = TestSnapshot(
+        test_id=test.id,
+        version=version,
+        problem_ids=','.join(map(str, problem_ids)),
+        payload=payload,
+        payload_gzip=gzip.compress(payload, GZIP_LEVEL) if len(payload) >= MIN_COMPRESS_SIZE else None,
+        etag=f'{test.id}-{version}-{hashlib.sha1(payload).hexdigest()[:16]}'
+    )
+    db.session.add(snapshot)
+    test.published_version = version
+    return snapshot
+
+
+def current_version(test_id):
+    """
+    当前发布的版本号，测试不存在时返回 None
+    尚未发布的测试在这里发布并提交
+    """
+    row = db.session.query(Test.published_version).filter(Test.id == test_id).first()
+    if row is None:
+        return None
+    if row.published_version is not None:
+        return row.published_version
+    try:
+        snapshot = publish_test(Test.query.get(test_id))
+        db.session.commit()
+        return snapshot.version
+    except IntegrityError:
+        # 其他请求同时发布了同一版本
+        db.session.rollback()
+        return db.session.query(Test.published_version).filter(Test.id == test_id).scalar()
+
+
+@lru_cache(maxsize=256)
+def load_snapshot(test_id, version):
+    """
+    读取快照，返回 (etag, 试卷JSON, gzip压缩后的试卷或 None, 题目ID列表)
+    快照不可变，按 (测试ID, 版本号) 缓存
+    """
+    snapshot = TestSnapshot.query.filter_by(test_id=test_id, version=version).first()
+    if snapshot is None:
+        raise LookupError(f'测试 {test_id} 没有版本 {version} 的试卷')
+    problem_ids = tuple(int(pid) for pid in snapshot.problem_ids.split(',') if pid)
+    return snapshot.etag, snapshot.payload, snapshot.payload_gzip, problem_ids
@@ -0,0 +1,307 @@
+"""
+测试统计的批量重算（POST /api/tests/statistics/refresh-all、flask tests refresh-stats）
+- 测试按ID分块，每块的累计值、每道题的作答和答对矩阵都用按测试分组的少量查询读取，不按测试逐个查询
+- 读取和计算（重算累计值、项目分析）交给进程池并行执行；写入只在主进程中进行，
+  每块一个事务：批量 upsert 整体统计，删除后批量插入每道题的统计
+- 计算期间又有新提交的测试跳过写入（新提交已累加到统计中，下次重算再校验）；
+  先取得写锁再判断，判断与写入在同一个写事务中，之间不会再有提交插进来
+- 接口触发的任务在后台线程中执行，按任务ID查询进度；同一时间只运行一个任务
+- 进程池以 spawn 方式启动：任务可能由 Web 服务的后台线程触发，fork 时其他线程（请求、提交队列、草稿写入）
+  持有的锁会被子进程继承而死锁；子进程只初始化数据库（见 _init_worker），不启动这些后台线程
+- STATS_REFRESH_WORKERS 为 0 或 1 时在当前进程中逐块计算
+"""
+from app import db
+from app.cache import cache
+from app.models.test import Test, TestSubmission, TestResult, QuestionStat
+from app.models.user import User
+from app.models.data_version import dialect_insert
+from app.services.test_service import (
+    recompute_counters, diff_counters, statistic_rows, COUNTER_COLUMNS, QUESTION_COUNTERS
+)
+from app.services.item_analysis import load_matrices, summarize
+from flask import Flask
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from sqlalchemy import func, select
+import multiprocessing
+import os
+import threading
+import traceback
+import uuid
+
+DEFAULT_CHUNK_SIZE = 50
+# 最多保留多少个任务的进度
+JOB_LIMIT = 20
+
+TEST_ANALYSIS_FIELDS = ('examinee_count', 'reliability', 'score_quantiles', 'analyzed_at')
+QUESTION_ANALYSIS_FIELDS = ('difficulty', 'discrimination', 'point_biserial')
+
+
+def _default_workers():
+    return min(4, os.cpu_count() or 1)
+
+
+def _last_submission_ids(test_ids):
+    """每份测试最后一条提交的ID"""
+    return dict(db.session.query(TestSubmission.test_id, func.max(TestSubmission.id))
+                .filter(TestSubmission.test_id.in_(test_ids)).group_by(TestSubmission.test_id))
+
+
+def _lock_results(test_ids):
+    """
+    对这些测试的 test_results 行做一次空更新，取得写锁（不提交）
+    提交时统计从 upsert test_results 开始累加（SQLite 上写锁是整个数据库的）：已经开始的提交要等它提交后才能拿到锁，
+    之后的提交要等本事务提交，拿到锁后读取的最后一条提交ID与写入之间不会再有新提交
+    """
+    table = TestResult.__table__
+    db.session.execute(table.update().where(table.c.test_id.in_(test_ids)).values(test_id=table.c.test_id))
+
+
+def compute_chunk(test_ids):
+    """
+    重算一块测试的统计（只读），返回 {测试ID: {'counters', 'questions', 'analysis', 'last_submission_id'}}
+    没有提交记录的测试不在结果中；最后一条提交ID先于累计值读取，写入前据此判断计算期间是否有新提交
+    """
+    last_ids = _last_submission_ids(test_ids)
+    recomputed = recompute_counters(test_ids)
+    matrices = load_matrices(test_ids)
+    results = {}
+    for test_id, (counters, questions) in recomputed.items():
+        loaded = matrices.get(test_id)
+        results[test_id] = {
+            'counters': counters,
+            'questions': questions,
+            'analysis': summarize(loaded) if loaded is not None else None,
+            'last_submission_id': last_ids.get(test_id)
+        }
+    return results
+
+
+def write_chunk(results, total_students):
+    """
+    写入一块测试的统计并提交，返回 (写入的测试数, 跳过的测试数, 与累计值不一致的测试数)
+    """
+    if not results:
+        return 0, 0, 0
+    try:
+        _lock_results(list(results))
+        current = _last_submission_ids(list(results))
+        fresh = [test_id for test_id, result in results.items()
+                 if current.get(test_id) == result['last_submission_id']]
+        if not fresh:
+            db.session.rollback()
+            return 0, len(results), 0
+        repaired = _write_fresh(results, fresh, total_students)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    cache.invalidate(*[f'test-stats:{test_id}' for test_id in fresh])
+    return len(fresh), len(results) - len(fresh), repaired
+
+
+def _write_fresh(results, fresh, total_students):
+    """写入计算期间没有新提交的测试（不提交），返回与累计值不一致的测试数"""
+    # 与统计表中的累计值比对，记录不一致的测试数
+    table = TestResult.__table__
+    stored = {row.test_id: row for row in db.session.execute(
+        select(table.c.test_id, *[table.c[column] for column in COUNTER_COLUMNS]).where(table.c.test_id.in_(fresh))
+    )}
+    table = QuestionStat.__table__
+    stored_questions = {}
+    rows = db.session.execute(
+        select(table.c.test_id, table.c.question_id, *[table.c[column] for column in QUESTION_COUNTERS])
+        .where(table.c.test_id.in_(fresh))
+    )
+    for row in rows:
+        stored_questions.setdefault(row.test_id, {})[row.question_id] = row
+
+    now = datetime.utcnow()
+    repaired = 0
+    test_rows, question_rows = [], []
+    for test_id in fresh:
+        result = results[test_id]
+        if diff_counters(stored.get(test_id), stored_questions.get(test_id, {}),
+                         result['counters'], result['questions']):
+            repaired += 1
+        test_row, rows = statistic_rows(test_id, result['counters'], result['questions'], total_students, now)
+        summary, items = result['analysis'] or ({}, [])
+        test_row.update({field: summary.get(field) for field in TEST_ANALYSIS_FIELDS})
+        items = {item['qid']: item for item in items}
+        for row in rows:
+            item = items.get(row['question_id'], {})
+            row.update({field: item.get(field) for field in QUESTION_ANALYSIS_FIELDS})
+        test_rows.append(test_row)
+        question_rows.extend(rows)
+
+    table = TestResult.__table__
+    stmt = dialect_insert(table)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.test_id],
+        set_={column: stmt.excluded[column] for column in test_rows[0] if column != 'test_id'}
+    ), test_rows)
+    table = QuestionStat.__table__
+    db.session.execute(table.delete().where(table.c.test_id.in_(fresh)))
+    if question_rows:
+        db.session.execute(table.insert(), question_rows)
+    return repaired
+
+
+# ---- 进程池 ----
+
+_worker_app = None
+
+
+def _init_worker(root_path, config):
+    # 子进程只需要数据库：建一个只初始化 db 的应用（root_path 与主应用一致，相对路径的 SQLite 指向同一个文件），
+    # 不经过 create_app，不会重放提交日志或启动后台线程
+    global _worker_app
+    _worker_app = Flask(__name__, root_path=root_path)
+    _worker_app.config.update(config)
+    db.init_app(_worker_app)
+
+
+def _compute_in_worker(test_ids):
+    with _worker_app.app_context():
+        try:
+            return compute_chunk(test_ids)
+        finally:
+            db.session.remove()
+
+
+class StatsRefresher:
+
+    def __init__(self):
+        self.app = None
+        self.workers = _default_workers()
+        self.chunk_size = DEFAULT_CHUNK_SIZE
+        self._jobs = OrderedDict()  # 任务ID -> 进度
+        self._running = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('STATS_REFRESH_WORKERS', _default_workers())
+        app.config.setdefault('STATS_REFRESH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        app.extensions['stats_refresher'] = self
+        self.app = app
+        self.workers = app.config['STATS_REFRESH_WORKERS']
+        self.chunk_size = app.config['STATS_REFRESH_CHUNK_SIZE']
+
+    # ---- 任务 ----
+
+    def start(self):
+        """在后台线程中启动重算任务，返回 (任务进度, 是否新建)；已有任务在运行时返回该任务"""
+        with self._lock:
+            if self._running is not None:
+                return dict(self._jobs[self._running]), False
+            job = self._new_job()
+            self._running = job['id']
+        thread = threading.Thread(target=self._run_job, args=(job,), name='stats-refresh', daemon=True)
+        thread.start()
+        return dict(job), True
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job, errors=list(job['errors'])) if job is not None else None
+
+    def _new_job(self):
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'running',
+            'total': 0,  # 测试数
+            'processed': 0,
+            'written': 0,
+            'skipped': 0,  # 计算期间有新提交，留到下次
+            'repaired': 0,  # 累计值与提交记录不一致、已修复的测试数
+            'failed': 0,
+            'errors': [],
+            'started_at': datetime.utcnow().isoformat(),
+            'finished_at': None
+        }
+        self._jobs[job['id']] = job
+        while len(self._jobs) > JOB_LIMIT:
+            self._jobs.popitem(last=False)
+        return job
+
+    def _run_job(self, job):
+        with self.app.app_context():
+            try:
+                self.run(job)
+            except Exception as e:
+                traceback.print_exc()
+                with self._lock:
+                    job.update(status='failed', finished_at=datetime.utcnow().isoformat())
+                    job['errors'].append(str(e))
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._running = None
+
+    # ---- 执行 ----
+
+    @staticmethod
+    def _pool_result(future, chunk):
+        """子进程的计算结果；进程池无法启动子进程（BrokenProcessPool）时改在当前进程中计算"""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            return compute_chunk(chunk)
+
+    def run(self, job=None, progress=None, workers=None, chunk_size=None):
+        """
+        重算所有测试的统计（需要在应用上下文中调用），返回任务进度
+        progress: 每写完一块调用一次，参数为任务进度
+        """
+        if job is None:
+            with self._lock:
+                job = self._new_job()
+        workers = self.workers if workers is None else workers
+        chunk_size = max(1, chunk_size or self.chunk_size)
+
+        test_ids = [test_id for test_id, in db.session.query(Test.id).order_by(Test.id)]
+        chunks = [test_ids[i:i + chunk_size] for i in range(0, len(test_ids), chunk_size)]
+        total_students = User.query.filter_by(role='student').count()
+        with self._lock:
+            job['total'] = len(test_ids)
+
+        def finish(chunk, compute):
+            try:
+                written, skipped, repaired = write_chunk(compute(), total_students)
+                counts = {'written': written, 'skipped': skipped, 'repaired': repaired}
+            except Exception as e:
+                db.session.rollback()
+                traceback.print_exc()
+                counts = {'failed': len(chunk)}
+                with self._lock:
+                    job['errors'].append(f'测试 {chunk[0]}-{chunk[-1]}: {e}')
+            with self._lock:
+                job['processed'] += len(chunk)
+                for key, value in counts.items():
+                    job[key] += value
+            if progress:
+                progress(dict(job))
+
+        if workers > 1 and len(chunks) > 1:
+            config = {key: value for key, value in self.app.config.items() if key.startswith('SQLALCHEMY_')}
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=_init_worker, initargs=(self.app.root_path, config)) as pool:
+                futures = {pool.submit(_compute_in_worker, chunk): chunk for chunk in chunks}
+                for future in as_completed(futures):
+                    finish(futures[future], lambda: self._pool_result(future, futures[future]))
+        else:
+            for chunk in chunks:
+                finish(chunk, lambda: compute_chunk(chunk))
+
+        with self._lock:
+            job['status'] = 'done'
+            job['finished_at'] = datetime.utcnow().isoformat()
+        print(f"测试统计重算完成: 写入 {job['written']}，跳过 {job['skipped']}，"
+              f"修复 {job['repaired']}，失败 {job['failed']}")
+        return dict(job)
+
+
+stats_refresher = StatsRefresher()
@@ -0,0 +1,225 @@
+"""
+测试提交写后队列（SUBMISSION_MODE = 'queue' 时启用）
+- 考试截止前大量学生同时提交，每个请求都同步判分、提交事务会在 SQLite 写锁上排队
+- 队列模式下提交接口只做校验，把提交追加写入本地日志（fsync 后才返回），立即返回回执号（202）
+- 后台线程按批取出提交，判分并在一个事务中写入；同一回执只保存一次，前端凭回执号轮询处理状态
+- 待处理的提交超过 SUBMISSION_QUEUE_MAX 时拒绝新的提交（503 + Retry-After），由客户端稍后重试
+- 启动时重放日志中尚未入库的提交；队列清空后截断日志
+- 日志按进程独占，适用于单进程部署（python run.py）
+"""
+from app import db
+from app.cache import cache
+from app.services.submission_service import save_submission, find_by_receipts
+from sqlalchemy.exc import OperationalError
+from collections import OrderedDict, deque
+from datetime import datetime
+import json
+import os
+import threading
+import traceback
+import uuid
+
+DEFAULT_QUEUE_MAX = 1000
+DEFAULT_BATCH_SIZE = 50
+
+# 最多保留多少条处理状态（已处理完的回执之后可从数据库查到）
+STATUS_LIMIT = 10000
+
+
+class QueueFull(Exception):
+    """待处理的提交太多"""
+
+
+class SubmissionQueue:
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.log_path = None
+        self.max_pending = DEFAULT_QUEUE_MAX
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self._items = deque()
+        self._pending = 0  # 已写入日志、尚未入库的提交数（包括正在处理的批次）
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._status = OrderedDict()  # 回执号 -> {'status', 'user_id', ...}
+        self._worker = None
+
+    def init_app(self, app):
+        app.config.setdefault('SUBMISSION_MODE', 'sync')
+        app.config.setdefault('SUBMISSION_LOG_PATH', os.path.join(app.instance_path, 'submissions.log'))
+        app.config.setdefault('SUBMISSION_QUEUE_MAX', DEFAULT_QUEUE_MAX)
+        app.config.setdefault('SUBMISSION_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        app.extensions['submission_queue'] = self
+        if app.config['SUBMISSION_MODE'] != 'queue':
+            return
+
+        self.app = app
+        self.enabled = True
+        self.log_path = app.config['SUBMISSION_LOG_PATH']
+        self.max_pending = app.config['SUBMISSION_QUEUE_MAX']
+        self.batch_size = app.config['SUBMISSION_BATCH_SIZE']
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with app.app_context():
+            self._replay()
+        self._worker = threading.Thread(target=self._run, name='submission-queue', daemon=True)
+        self._worker.start()
+
+    # ---- 入队 ----
+
+    def enqueue(self, item):
+        """写入日志并入队，返回回执号；队列已满时抛出 QueueFull"""
+        item = dict(item, receipt=uuid.uuid4().hex, submit_time=datetime.utcnow().isoformat())
+        line = json.dumps(item, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull()
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending += 1
+            self._items.append(item)
+            self._set_status(item['receipt'], {'status': 'queued', 'user_id': item['user_id'], 'test_id': item['test_id']})
+            self._ready.notify()
+        return item['receipt']
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def status(self, receipt, user_id):
+        """
+        查询回执的处理状态，不是该用户的回执或回执不存在时返回 None
+        状态: queued（排队中）/ done（已入库，附带得分）/ failed（附带错误信息）
+        """
+        with self._lock:
+            status = self._status.get(receipt)
+        if status is None:
+            status = find_by_receipts([receipt]).get(receipt)
+            if status is not None:
+                status = dict(status, status='done')
+        if status is None or str(status['user_id']) != str(user_id):
+            return None
+        return {k: v for k, v in status.items() if k != 'user_id'}
+
+    def _set_status(self, receipt, status):
+        self._status[receipt] = status
+        self._status.move_to_end(receipt)
+        while len(self._status) > STATUS_LIMIT:
+            self._status.popitem(last=False)
+
+    # ---- 后台处理 ----
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._items:
+                    self._ready.wait()
+                batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+            with self.app.app_context():
+                try:
+                    self._process(batch)
+                except OperationalError:
+                    # 数据库暂时不可用（锁超时、连接断开）：放回队列稍后重试，日志中的记录保留
+                    traceback.print_exc()
+                    db.session.rollback()
+                    with self._lock:
+                        self._items.extendleft(reversed(batch))
+                        self._ready.wait(1)
+                    continue
+                except Exception as e:
+                    # 整批提交出错（不是某一条提交的问题）：标记为失败，不再重试，避免阻塞后面的提交
+                    traceback.print_exc()
+                    db.session.rollback()
+                    self._fail(batch, e)
+                finally:
+                    db.session.remove()
+            self._finish(len(batch))
+
+    def _process(self, batch):
+        """
+        整批在一个事务中写入，每条提交在各自的保存点中保存：某条提交无法保存（测试或试卷版本不存在、数据格式不对等）时
+        只回滚这一条并标记为失败，其余照常入库；数据库不可用（OperationalError）时抛出，由 _run 整批放回队列重试
+        """
+        done = find_by_receipts([item['receipt'] for item in batch])
+        todo = [item for item in batch if item['receipt'] not in done]
+        results = {receipt: dict(status, status='done') for receipt, status in done.items()}
+        tags = set()
+        for item in todo:
+            item_tags = set()
+            try:
+                with db.session.begin_nested():
+                    self._save(item, results, item_tags)
+            except OperationalError:
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                results[item['receipt']] = {'status': 'failed', 'error': str(e),
+                                            'user_id': item['user_id'], 'test_id': item['test_id']}
+                continue
+            tags.update(item_tags)
+        db.session.commit()
+        cache.invalidate(*tags)
+        with self._lock:
+            for receipt, status in results.items():
+                self._set_status(receipt, status)
+        print(f"写后队列: 已处理 {len(batch)} 条提交")
+
+    def _fail(self, batch, error):
+        try:
+            done = find_by_receipts([item['receipt'] for item in batch])
+        except Exception:
+            done = {}
+        with self._lock:
+            for item in batch:
+                if item['receipt'] in done:
+                    self._set_status(item['receipt'], dict(done[item['receipt']], status='done'))
+                else:
+                    self._set_status(item['receipt'], {'status': 'failed', 'error': str(error),
+                                                       'user_id': item['user_id'], 'test_id': item['test_id']})
+
+    @staticmethod
+    def _save(item, results, tags):
+        summary, item_tags = save_submission(dict(item, submit_time=datetime.fromisoformat(item['submit_time'])))
+        results[item['receipt']] = dict(summary, status='done', user_id=item['user_id'], test_id=item['test_id'])
+        tags.update(item_tags)
+
+    def _finish(self, count):
+        with self._lock:
+            self._pending -= count
+            if self._pending == 0:
+                # 日志中的提交都已入库
+                open(self.log_path, 'w').close()
+
+    # ---- 崩溃恢复 ----
+
+    def _replay(self):
+        """重放日志中尚未入库的提交"""
+        if not os.path.exists(self.log_path):
+            return
+        items = OrderedDict()
+        with open(self.log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue  # 崩溃时写了一半的最后一行
+                items[item['receipt']] = item
+        done = set()
+        receipts = list(items)
+        for start in range(0, len(receipts), 500):
+            done.update(find_by_receipts(receipts[start:start + 500]))
+        replay = [item for receipt, item in items.items() if receipt not in done]
+        with self._lock:
+            self._items.extend(replay)
+            self._pending += len(replay)
+            for item in replay:
+                self._set_status(item['receipt'], {'status': 'queued', 'user_id': item['user_id'], 'test_id': item['test_id']})
+            if not replay:
+                open(self.log_path, 'w').close()
+        if replay:
+            print(f"写后队列: 从日志恢复 {len(replay)} 条未入库的提交")
+
+
+submission_queue = SubmissionQueue()
@@ -0,0 +1,89 @@
+"""
+测试提交的保存
+- 同步提交和写后队列（submission_queue）共用：按作答的试卷版本判分，保存提交记录、结果页和每道题的作答
+- 测试统计的累计值随提交在同一事务中更新
+- 每条提交可以带回执号（receipt），同一回执只会保存一次，队列重放日志时据此去重
+"""
+from app import db
+from app.models.test import TestSubmission
+from app.models.data_version import bump_version
+from app.services.snapshot_service import current_version, load_snapshot
+from app.services.result_service import load_test_info, grade_submission, result_payload, save_submission_answers
+from app.services.test_service import record_submission_stats
+from datetime import datetime
+import json
+
+
+def resolve_paper(test_id, version=None):
+    """
+    确定作答的试卷版本，未指定时使用当前发布的版本，返回 (版本号, 题目ID元组)
+    测试不存在时抛出 LookupError，版本不存在时抛出 ValueError
+    """
+    version = version or current_version(test_id)
+    if version is None:
+        raise LookupError('测试不存在')
+    try:
+        return int(version), load_snapshot(test_id, int(version))[3]
+    except (LookupError, ValueError):
+        raise ValueError('试卷版本不存在')
+
+
+def save_submission(item):
+    """
+    判分并保存一条提交（不提交事务）
+    item: {'test_id', 'user_id', 'answers', 'duration', 'version', 'time_spent', 'receipt', 'submit_time'}
+    返回 (提交摘要, 需要失效的缓存标签)
+    """
+    test_id = item['test_id']
+    user_id = item['user_id']
+    answers = item['answers']
+    version, problem_ids = resolve_paper(test_id, item.get('version'))
+    test_info = load_test_info(test_id)
+
+    # 判分一次，结果页内容随提交记录一起保存
+    report = grade_submission(list(problem_ids), answers)
+    submission = TestSubmission(
+        test_id=test_id,
+        user_id=user_id,
+        score=report['score'],  # 四舍五入到一位小数
+        answers=json.dumps(answers),
+        duration=item.get('duration') or 0,
+        paper_version=version,
+        submit_time=item.get('submit_time') or datetime.utcnow(),
+        receipt=item.get('receipt')
+    )
+    submission.result_json = result_payload(test_info, submission, report).decode('utf-8')
+    db.session.add(submission)
+    db.session.flush()
+    rows = save_submission_answers(submission.id, answers, report['results'], item.get('time_spent'))
+    record_submission_stats(test_id, report['score'], submission.duration, rows)
+    bump_version(f'user:{user_id}')
+
+    summary = {
+        'submission_id': submission.id,
+        'score': report['score'],
+        'correct_count': report['correct_count'],
+        'total_questions': report['total_questions'],
+        'duration': submission.duration
+    }
+    return summary, [f'test-stats:{test_id}', f'user-tests:{user_id}']
+
+
+def find_by_receipts(receipts):
+    """已保存的回执 {回执号: {提交ID、用户ID、测试ID、得分、用时}}"""
+    if not receipts:
+        return {}
+    rows = db.session.query(
+        TestSubmission.receipt, TestSubmission.id, TestSubmission.user_id, TestSubmission.test_id,
+        TestSubmission.score, TestSubmission.duration
+    ).filter(TestSubmission.receipt.in_(list(receipts)))
+    return {
+        row.receipt: {
+            'submission_id': row.id,
+            'user_id': row.user_id,
+            'test_id': row.test_id,
+            'score': row.score,
+            'duration': row.duration
+        }
+        for row in rows
+    }
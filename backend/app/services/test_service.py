@@ -1,122 +1,465 @@
 from app import db
-from app.models.test import Test, TestSubmission, TestResult, QuestionStat
+from app.models.test import (
+    Test, TestSubmission, TestResult, QuestionStat, SubmissionAnswer, SCORE_BUCKETS, PASS_SCORE, score_bucket
+)
+from app.models.data_version import dialect_insert
+from app.services.item_analysis import analyze_test
+from app.services.answer_stats import record_answer_stats, load_answer_stats, summarize_answers
 from app.models.user import User
+from app.models.problem import Problem
+from app.models.study_record import KnowledgePoint, problem_topics
+from app.cache import cache
+from sqlalchemy import and_, case, func, or_, select
 from datetime import datetime
+import base64
 import json
 
-def calculate_test_statistics(test_id):
-    """计算测试的统计数据"""
-    # 获取测试信息
-    test = Test.query.get(test_id)
-    if not test:
-        return None
-        
-    # 获取所有学生提交记录
-    submissions = TestSubmission.query.filter_by(test_id=test_id).all()
-    if not submissions:
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# 没有创建时间的测试排在同一完成状态的最后
+_NO_CREATED_AT = datetime(1970, 1, 1)
+
+# 每道题统计中随提交累加的计数列
+QUESTION_COUNTERS = ['answer_count', 'correct_count', 'time_sum', 'timed_count']
+
+# 浮点累计值（得分之和）比对时允许的误差
+_TOLERANCE = 1e-6
+
+def record_submission_stats(test_id, score, duration, answer_rows):
+    """
+    把一次提交累加到测试统计（不提交，与提交记录在同一事务中写入）
+    - 整体统计和每道题的统计各一条 upsert，代价与已有提交数无关
+    - 答案分布（选择题的选项、填空题的常见错误）随后更新，见 answer_stats
+    - answer_rows: save_submission_answers 写入的每道题作答
+    """
+    now = datetime.utcnow()
+    bucket = score_bucket(score)
+    table = TestResult.__table__
+    stmt = dialect_insert(table).values(
+        test_id=test_id,
+        completed_count=1,
+        score_sum=score,
+        duration_sum=duration or 0,
+        passed_count=1 if score >= PASS_SCORE else 0,
+        last_updated=now,
+        **{bucket: 1}
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.test_id],
+        set_={
+            'completed_count': table.c.completed_count + 1,
+            'score_sum': table.c.score_sum + score,
+            'duration_sum': table.c.duration_sum + (duration or 0),
+            'passed_count': table.c.passed_count + (1 if score >= PASS_SCORE else 0),
+            bucket: table.c[bucket] + 1,
+            'last_updated': now
+        }
+    ))
+
+    if not answer_rows:
+        return
+    table = QuestionStat.__table__
+    stmt = dialect_insert(table).values([{
+        'test_id': test_id,
+        'question_id': row['problem_id'],
+        'answer_count': 1,
+        'correct_count': 1 if row['is_correct'] else 0,
+        'time_sum': row['time_spent'] or 0,
+        'timed_count': 0 if row['time_spent'] is None else 1,
+        'last_updated': now
+    } for row in answer_rows])
+    set_ = {column: table.c[column] + stmt.excluded[column] for column in QUESTION_COUNTERS}
+    set_['last_updated'] = stmt.excluded.last_updated
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.test_id, table.c.question_id],
+        set_=set_
+    ))
+    record_answer_stats(test_id, answer_rows)
+
+# 整体统计中随提交累加的计数列
+COUNTER_COLUMNS = ['completed_count', 'score_sum', 'duration_sum', 'passed_count'] + \
+    [column for _, column, _ in SCORE_BUCKETS]
+
+def recompute_counters(test_ids):
+    """
+    在提交记录上全量重算多份测试的累计值，整体和每道题各一条按测试分组的查询
+    返回 {测试ID: (整体计数, {题目ID: 每道题计数})}，没有提交记录的测试不在结果中
+    """
+    score = TestSubmission.score
+    summary = db.session.query(
+        TestSubmission.test_id,
+        func.count(TestSubmission.id),
+        func.coalesce(func.sum(score), 0),
+        func.coalesce(func.sum(func.coalesce(TestSubmission.duration, 0)), 0),
+        *[func.coalesce(func.sum(case((condition, 1), else_=0)), 0) for condition in (
+            score >= PASS_SCORE,
+            score >= 90,
+            and_(score >= 80, score < 90),
+            and_(score >= 60, score < 80),
+            score < 60
+        )]
+    ).filter(TestSubmission.test_id.in_(test_ids)).group_by(TestSubmission.test_id)
+    result = {row[0]: (dict(zip(COUNTER_COLUMNS, row[1:])), {}) for row in summary}
+
+    # 按测试和题目分组统计作答数、答对数和用时
+    per_question = db.session.query(
+        TestSubmission.test_id,
+        SubmissionAnswer.problem_id,
+        func.count(SubmissionAnswer.id),
+        func.sum(case((SubmissionAnswer.is_correct, 1), else_=0)),
+        func.coalesce(func.sum(SubmissionAnswer.time_spent), 0),
+        func.count(SubmissionAnswer.time_spent)
+    ).join(TestSubmission, TestSubmission.id == SubmissionAnswer.submission_id) \
+        .filter(TestSubmission.test_id.in_(test_ids)) \
+        .group_by(TestSubmission.test_id, SubmissionAnswer.problem_id)
+    for test_id, problem_id, *values in per_question:
+        if test_id in result:
+            result[test_id][1][problem_id] = dict(zip(QUESTION_COUNTERS, values))
+    return result
+
+def _differs(stored, expected):
+    if isinstance(expected, float) or isinstance(stored, float):
+        return abs((stored or 0) - (expected or 0)) > _TOLERANCE
+    return (stored or 0) != (expected or 0)
+
+def diff_counters(stored, stored_questions, counters, questions):
+    """
+    比对统计表中的累计值与重算值，返回不一致的项 [{'question_id', 'field', 'stored', 'expected'}]
+    stored: 整体统计行（模型或查询结果行，没有时为 None）；stored_questions: {题目ID: 每道题的统计行}
+    """
+    differences = []
+    for field, expected in counters.items():
+        value = getattr(stored, field) if stored is not None else None
+        if _differs(value, expected):
+            differences.append({'question_id': None, 'field': field, 'stored': value, 'expected': expected})
+    for question_id in sorted(set(stored_questions) | set(questions)):
+        stat = stored_questions.get(question_id)
+        expected = questions.get(question_id, {})
+        for field in QUESTION_COUNTERS:
+            value = getattr(stat, field) if stat is not None else None
+            if _differs(value, expected.get(field)):
+                differences.append({
+                    'question_id': question_id, 'field': field,
+                    'stored': value, 'expected': expected.get(field)
+                })
+    return differences
+
+def statistic_rows(test_id, counters, questions, total_students, now):
+    """由重算的累计值生成整体统计行和每道题的统计行（包括旧版存储的派生字段），用于批量写入"""
+    derived = TestResult(**counters).to_dict(total_students)
+    test_row = dict(counters, test_id=test_id, last_updated=now, **{
+        field: derived[field] for field in (
+            'total_students', 'average_score', 'average_time', 'completion_rate', 'pass_rate', 'score_distribution'
+        )
+    })
+    question_rows = []
+    for question_id, values in questions.items():
+        derived = QuestionStat(**values).to_dict()
+        question_rows.append(dict(
+            values, test_id=test_id, question_id=question_id, last_updated=now,
+            correct_rate=derived['correct_rate'], average_time=derived['average_time']
+        ))
+    return test_row, question_rows
+
+def check_test_statistics(test_id, repair=False):
+    """
+    一致性校验：在提交记录上全量重算累计值并与统计表比对
+    - 返回不一致的项 [{'question_id', 'field', 'stored', 'expected'}]，question_id 为空表示整体统计
+    - 没有提交记录时不校验（初始化数据中的示例统计没有对应的提交记录），返回 None
+    - repair 为 True 时用重算结果覆盖统计表（不提交）
+    """
+    recomputed = recompute_counters([test_id]).get(test_id)
+    if recomputed is None:
         return None
-        
-    # 计算基本统计数据
-    total_students = User.query.filter_by(role='student').count()
-    completed_count = len(submissions)
-    total_score = sum(sub.score for sub in submissions)
-    total_time = sum(sub.duration for sub in submissions)
-    
-    # 计算平均分和平均用时
-    average_score = round(total_score / completed_count, 1) if completed_count > 0 else 0
-    average_time = round(total_time / completed_count / 60) if completed_count > 0 else 0  # 转换为分钟
-    
-    # 计算完成率和及格率
-    completion_rate = round(completed_count / total_students * 100, 1) if total_students > 0 else 0
-    passed_count = sum(1 for sub in submissions if sub.score >= 60)
-    pass_rate = round(passed_count / completed_count * 100, 1) if completed_count > 0 else 0
-    
-    # 计算分数分布
-    score_distribution = {
-        '90-100': sum(1 for sub in submissions if sub.score >= 90),
-        '80-89': sum(1 for sub in submissions if 80 <= sub.score < 90),
-        '60-79': sum(1 for sub in submissions if 60 <= sub.score < 80),
-        '0-59': sum(1 for sub in submissions if sub.score < 60)
-    }
-    
-    # 更新或创建测试结果记录
+    counters, questions = recomputed
+
+    test_result = TestResult.query.filter_by(test_id=test_id).first()
+    stats = {stat.question_id: stat for stat in QuestionStat.query.filter_by(test_id=test_id)}
+    differences = diff_counters(test_result, stats, counters, questions)
+
+    if repair and differences:
+        now = datetime.utcnow()
+        if not test_result:
+            test_result = TestResult(test_id=test_id)
+            db.session.add(test_result)
+        for field, value in counters.items():
+            setattr(test_result, field, value)
+        # 旧版存储的派生字段同步更新
+        total_students = User.query.filter_by(role='student').count()
+        derived = test_result.to_dict(total_students)
+        for field in ('total_students', 'average_score', 'average_time', 'completion_rate', 'pass_rate',
+                      'score_distribution'):
+            setattr(test_result, field, derived[field])
+        test_result.last_updated = now
+
+        for question_id, stat in stats.items():
+            if question_id not in questions:
+                db.session.delete(stat)
+        for question_id, values in questions.items():
+            stat = stats.get(question_id)
+            if not stat:
+                stat = QuestionStat(test_id=test_id, question_id=question_id)
+                db.session.add(stat)
+            for field, value in values.items():
+                setattr(stat, field, value)
+            derived = stat.to_dict()
+            stat.correct_rate = derived['correct_rate']
+            stat.average_time = derived['average_time']
+            stat.last_updated = now
+        db.session.flush()
+    return differences
+
+def _load_statistics(test_id):
+    """读取测试的统计行和每道题的统计，没有统计时返回 None"""
     test_result = TestResult.query.filter_by(test_id=test_id).first()
     if not test_result:
-        test_result = TestResult(test_id=test_id)
-        
-    test_result.total_students = total_students
-    test_result.completed_count = completed_count
-    test_result.average_score = average_score
-    test_result.average_time = average_time
-    test_result.completion_rate = completion_rate
-    test_result.pass_rate = pass_rate
-    test_result.score_distribution = score_distribution
-    test_result.last_updated = datetime.utcnow()
-    
-    db.session.add(test_result)
-    
-    # 计算每道题的统计数据
-    problem_ids = [int(pid) for pid in test.problem_ids.split(',')]
-    for problem_id in problem_ids:
-        # 获取该题目的所有答案
-        answers = [json.loads(sub.answers).get(str(problem_id)) for sub in submissions]
-        correct_count = sum(1 for ans in answers if ans.get('is_correct', False))
-        total_time = sum(ans.get('time_spent', 0) for ans in answers if ans.get('time_spent'))
-        
-        # 计算正确率和平均用时
-        correct_rate = round(correct_count / len(answers), 2) if answers else 0
-        avg_time = round(total_time / len(answers) / 60, 1) if answers else 0  # 转换为分钟
-        
-        # 更新或创建题目统计记录
-        question_stat = QuestionStat.query.filter_by(
-            test_id=test_id,
-            question_id=problem_id
-        ).first()
-        
-        if not question_stat:
-            question_stat = QuestionStat(
-                test_id=test_id,
-                question_id=problem_id
-            )
-            
-        question_stat.correct_rate = correct_rate
-        question_stat.average_time = avg_time
-        question_stat.last_updated = datetime.utcnow()
-        
-        db.session.add(question_stat)
-    
+        return None
+    # 学生总数取最近一次全量校验时记录的值，还没有校验过时实时统计
+    total_students = test_result.total_students or User.query.filter_by(role='student').count()
+    question_stats = QuestionStat.query.filter_by(test_id=test_id).order_by(QuestionStat.question_id).all()
+    return {
+        **test_result.to_dict(total_students),
+        'question_stats': [stat.to_dict() for stat in question_stats]
+    }
+
+def calculate_test_statistics(test_id):
+    """
+    全量重算测试的统计数据：校验累计值并修复不一致的部分，并重新做项目分析
+    日常读取不需要调用，统计随每次提交更新；测试不存在或没有提交记录时返回 None
+    """
+    if not db.session.query(Test.id).filter(Test.id == test_id).first():
+        return None
     try:
+        differences = check_test_statistics(test_id, repair=True)
+        if differences is None:
+            return None
+        if differences:
+            print(f"测试 {test_id} 的统计与提交记录不一致，已按提交记录修复 {len(differences)} 项")
+        analyze_test(test_id)
         db.session.commit()
-        return test_result.to_dict()
     except Exception as e:
         db.session.rollback()
         raise e
+    cache.invalidate(f'test-stats:{test_id}')
+    return _load_statistics(test_id)
 
 def get_test_statistics(test_id):
-    """获取测试的统计数据"""
-    # 获取基本统计数据
-    test_result = TestResult.query.filter_by(test_id=test_id).first()
-    if not test_result:
-        # 如果没有统计数据，重新计算
-        return calculate_test_statistics(test_id)
-        
-    # 获取题目统计数据
-    question_stats = QuestionStat.query.filter_by(test_id=test_id).all()
-    
+    """获取测试的统计数据（读取累计值，有缓存，提交测试或重新计算统计后失效），没有提交记录时返回 None"""
+    return cache.memoize(f'test-stats:{test_id}', [f'test-stats:{test_id}', f'test:{test_id}'],
+                         lambda: _load_statistics(test_id))
+
+def update_all_test_statistics():
+    """校验并修复所有测试的统计数据（分块批量重算，见 stats_refresh），返回任务进度"""
+    from app.services.stats_refresh import stats_refresher
+    return stats_refresher.run()
+
+
+# 教师端测试分析的分数段：(标签, 下限)，按下限从低到高，最后一段包含满分
+DASHBOARD_RANGES = [('0-60', 0), ('60-70', 60), ('70-80', 70), ('80-90', 80), ('90-100', 90)]
+
+
+def _latest_submission_ids(test_id):
+    """每个学生在该测试上最后一次提交的ID（子查询）"""
+    return select(func.max(TestSubmission.id)).where(TestSubmission.test_id == test_id) \
+        .group_by(TestSubmission.user_id)
+
+
+def build_test_dashboard(test):
+    """
+    教师端测试分析数据，按每个学生最后一次提交统计，全部在数据库中聚合
+    - 分数分布和整体统计：按分数段 CASE 分组，一条查询
+    - 每道题的正确率、平均用时：submission_answers 按题目分组，一条查询
+    - 知识点掌握度：每道题的聚合结果关联题目知识点（problem_topics）后按知识点累加
+    - 选项分布和常见错误读取随提交更新的 answer_stats（包括全部提交，见 answer_stats 模块）
+    """
+    latest = _latest_submission_ids(test.id)
+    score = TestSubmission.score
+    bucket = case(
+        *[(score < upper, label) for (label, _), (_, upper) in zip(DASHBOARD_RANGES, DASHBOARD_RANGES[1:])],
+        else_=DASHBOARD_RANGES[-1][0]
+    )
+    rows = db.session.query(
+        bucket,
+        func.count(TestSubmission.id),
+        func.sum(score),
+        func.sum(func.coalesce(TestSubmission.duration, 0)),
+        func.sum(case((score >= PASS_SCORE, 1), else_=0))
+    ).filter(TestSubmission.id.in_(latest)).group_by(bucket).all()
+    buckets = {label: count for label, count, _, _, _ in rows}
+    completed_count = sum(count for _, count, _, _, _ in rows)
+    score_sum = sum(total or 0 for _, _, total, _, _ in rows)
+    duration_sum = sum(total or 0 for _, _, _, total, _ in rows)
+    passed_count = sum(passed or 0 for _, _, _, _, passed in rows)
+    total_students = User.query.filter_by(role='student').count()
+
+    answered = SubmissionAnswer.submission_id.in_(latest)
+    per_question = {row[0]: row[1:] for row in db.session.query(
+        SubmissionAnswer.problem_id,
+        func.count(SubmissionAnswer.id),
+        func.sum(case((SubmissionAnswer.is_correct, 1), else_=0)),
+        func.avg(SubmissionAnswer.time_spent)
+    ).filter(answered).group_by(SubmissionAnswer.problem_id)}
+
+    # 题目按当前试卷顺序排列，只在旧版本试卷中出现的题目排在最后
+    question_ids = list(test.question_ids())
+    question_ids += sorted(set(per_question) - set(question_ids))
+    problems = {p.id: p for p in db.session.query(
+        Problem.id, Problem.title, Problem.difficulty, Problem.topics,
+        Problem.type, Problem.options, Problem.answer_key, Problem.correct_answer
+    ).filter(Problem.id.in_(question_ids))}
+    answer_stats = load_answer_stats(test.id)
+    # 知识点的作答数、答对数由每道题的聚合结果按题目知识点累加，不必再扫描一遍作答明细
+    mastery = {}
+    for name, problem_id in db.session.query(KnowledgePoint.name, problem_topics.c.problem_id) \
+            .join(problem_topics, problem_topics.c.knowledge_id == KnowledgePoint.id) \
+            .filter(problem_topics.c.problem_id.in_(list(per_question))):
+        answer_count, correct_count, _ = per_question[problem_id]
+        counts = mastery.setdefault(name, [0, 0])
+        counts[0] += answer_count
+        counts[1] += correct_count or 0
+    question_stats = []
+    for index, problem_id in enumerate(question_ids):
+        problem = problems.get(problem_id)
+        answer_count, correct_count, avg_seconds = per_question.get(problem_id, (0, 0, None))
+        option_counts, common_mistakes = summarize_answers(problem, answer_stats.get(problem_id, []))
+        question_stats.append({
+            'question_id': problem_id,
+            'title': problem.title if problem and problem.title else f'第{index + 1}题',
+            'topics': problem.topics.split(',') if problem and problem.topics else [],
+            'difficulty': problem.difficulty if problem else None,
+            'answer_count': answer_count,
+            'correct_rate': round(correct_count / answer_count * 100) if answer_count else 0,  # 百分比
+            'average_time': round(avg_seconds / 60, 1) if avg_seconds else 0,  # 分钟
+            'option_counts': option_counts,
+            'common_mistakes': common_mistakes
+        })
+
     return {
-        **test_result.to_dict(),
-        'question_stats': [stat.to_dict() for stat in question_stats]
+        'title': test.title,
+        'deadline': test.deadline.isoformat() if test.deadline else None,
+        'difficulty': test.difficulty,
+        'estimated_time': test.estimated_time,
+        'total_students': total_students,
+        'completed_count': completed_count,
+        'completion_rate': round(completed_count / total_students * 100, 1) if total_students else 0,
+        'average_score': round(score_sum / completed_count, 1) if completed_count else 0,
+        'average_time': round(duration_sum / completed_count / 60, 1) if completed_count else 0,  # 分钟
+        'pass_rate': round(passed_count / completed_count * 100, 1) if completed_count else 0,
+        'score_distribution': [{'range': label, 'count': buckets.get(label, 0)} for label, _ in DASHBOARD_RANGES],
+        'topic_mastery': [{'topic': name, 'value': round(correct / count * 100) if count else 0}
+                          for name, (count, correct) in sorted(mastery.items())],
+        'question_stats': question_stats
     }
 
-def update_all_test_statistics():
-    """更新所有测试的统计数据"""
-    tests = Test.query.all()
-    results = []
-    for test in tests:
-        try:
-            result = calculate_test_statistics(test.id)
-            if result:
-                results.append(result)
-        except Exception as e:
-            print(f"更新测试 {test.id} 的统计数据时出错: {str(e)}")
-    return results 
\ No newline at end of file
+
+def _completed_subquery(user_id):
+    """该用户提交过的测试（同一测试多次提交只算一次）"""
+    return select(TestSubmission.test_id).where(TestSubmission.user_id == user_id) \
+        .group_by(TestSubmission.test_id).subquery()
+
+
+def _encode_test_cursor(completed, created_at, test_id):
+    raw = json.dumps([completed, created_at.isoformat(), test_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def _decode_test_cursor(cursor):
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        completed, created_at, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(completed), datetime.fromisoformat(created_at), int(last_id)
+    except Exception:
+        raise ValueError('游标格式错误')
+
+
+def _apply_test_filters(query, filters):
+    """
+    在查询上叠加筛选条件
+    - filters: {'type', 'deadline_from', 'deadline_to'}，值为空表示不筛选
+    - 截止时间区间只匹配设置了截止时间的测试
+    """
+    if filters.get('type'):
+        query = query.filter(Test.type == filters['type'])
+    if filters.get('deadline_from'):
+        query = query.filter(Test.deadline >= filters['deadline_from'])
+    if filters.get('deadline_to'):
+        query = query.filter(Test.deadline <= filters['deadline_to'])
+    return query
+
+
+def list_student_tests(user_id, filters, status=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    分页获取学生的测试列表
+    - 完成状态通过外连接该用户的提交记录得到，排序（未完成在前、新发布在前）、筛选和分页都在一条 SQL 中完成
+    - status: 'pending'（未完成）/ 'completed'（已完成），为空表示全部
+    - 使用 (是否完成, 创建时间, id) 作为游标，翻页代价与页码无关
+    - 返回 {'tests', 'next_cursor', 'total', 'counts'}，counts 为各状态标签页的数量（不受 status 筛选影响）
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    done = _completed_subquery(user_id)
+    completed = case((done.c.test_id.isnot(None), 1), else_=0)
+    created_at = func.coalesce(Test.created_at, _NO_CREATED_AT)
+
+    count_query = _apply_test_filters(
+        db.session.query(func.count(Test.id), func.coalesce(func.sum(completed), 0))
+        .outerjoin(done, done.c.test_id == Test.id),
+        filters
+    )
+    total_all, total_completed = count_query.one()
+    counts = {
+        'all': total_all,
+        'pending': total_all - int(total_completed),
+        'completed': int(total_completed)
+    }
+
+    query = _apply_test_filters(
+        db.session.query(Test, completed.label('is_completed'), created_at.label('sort_created_at'))
+        .outerjoin(done, done.c.test_id == Test.id),
+        filters
+    )
+    if status == 'pending':
+        query = query.filter(done.c.test_id.is_(None))
+    elif status == 'completed':
+        query = query.filter(done.c.test_id.isnot(None))
+
+    if cursor:
+        last_completed, last_created_at, last_id = _decode_test_cursor(cursor)
+        query = query.filter(or_(
+            completed > last_completed,
+            and_(completed == last_completed, or_(
+                created_at < last_created_at,
+                and_(created_at == last_created_at, Test.id < last_id)
+            ))
+        ))
+
+    # 多取一条用来判断是否还有下一页
+    rows = query.order_by(completed.asc(), created_at.desc(), Test.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if has_more:
+        last_test, last_completed, last_created_at = rows[-1]
+        next_cursor = _encode_test_cursor(last_completed, last_created_at, last_test.id)
+    else:
+        next_cursor = None
+
+    return {
+        'tests': [{
+            'id': test.id,
+            'title': test.title,
+            'description': test.description,
+            'type': test.type,
+            'total_questions': test.total_questions,
+            'estimated_time': test.estimated_time,
+            'topics': test.topics.split(',') if test.topics else [],
+            'difficulty': test.difficulty,
+            'created_at': test.created_at.isoformat() if test.created_at else None,
+            'deadline': test.deadline.isoformat() if test.deadline else None,
+            'created_by': test.created_by,
+            'is_completed': bool(is_completed)
+        } for test, is_completed, _ in rows],
+        'next_cursor': next_cursor,
+        'total': counts[status] if status in counts else total_all,
+        'counts': counts
+    }
@@ -0,0 +1,60 @@
+"""
+读接口的条件请求（ETag / If-None-Match）支持
+- ETag 由请求路径、查询参数和相关数据的版本号计算得出，只需一次版本号查询
+- 客户端带回的 ETag 与当前一致时直接返回 304，不查询数据也不序列化
+- 响应带 Cache-Control: no-cache，浏览器每次都会自动带上 If-None-Match 重新验证
+"""
+from flask import request, make_response
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from datetime import date
+import hashlib
+
+from app.models.data_version import get_versions
+
+
+def _resolve_scopes(scopes):
+    """替换作用域中的占位符：{user} 为当前用户ID"""
+    user_id = get_jwt_identity() if any('{user}' in scope for scope in scopes) else None
+    return [scope.format(user=user_id) for scope in scopes]
+
+
+def compute_etag(scopes, extra=''):
+    names = _resolve_scopes(scopes)
+    versions = get_versions(names)
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    raw = '|'.join([
+        request.path,
+        args,
+        ','.join(f'{name}={version}' for name, version in zip(names, versions)),
+        extra
+    ])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_get(*scopes, daily=False):
+    """
+    给 GET 接口加上 ETag 支持
+    - scopes: 接口数据依赖的版本号名称，例如 'problems'、'user:{user}'
+    - daily: 数据依赖当天日期（例如按日期范围统计）时为 True，跨天后 ETag 自动变化
+    需要放在 @jwt_required() 之后使用
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapped(*args, **kwargs):
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            etag = compute_etag(scopes, date.today().isoformat() if daily else '')
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Authorization')
+            return response
+        return wrapped
+    return decorator
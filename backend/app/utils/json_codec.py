@@ -0,0 +1,68 @@
+"""
+JSON 序列化
+- 安装了 orjson 时使用 orjson 编码，否则退回标准库 json，两者输出的数据一致
+- FastJSONEncoder 通过 app.json_encoder 接入 Flask，jsonify 和 flask.json.dumps 都会走快速路径
+- 提供把预先序列化好的 JSON 片段直接拼接成数组/对象的工具，避免反复解析和编码
+"""
+from flask.json import JSONEncoder
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson 是可选依赖
+    orjson = None
+
+
+def dumps_bytes(obj):
+    """把数据编码成紧凑的 UTF-8 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONEncoder(JSONEncoder):
+    """
+    使用 orjson 的 Flask JSON 编码器
+    - 日期时间等特殊类型仍交给 Flask 默认的 default() 处理，输出格式与原来一致
+    - orjson 无法处理的数据（如超过64位的整数）退回标准库编码
+    """
+
+    def encode(self, o):
+        if orjson is None:
+            return super().encode(o)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default, option=option).decode('utf-8')
+        except (orjson.JSONEncodeError, TypeError):
+            return super().encode(o)
+
+
+def join_array(fragments):
+    """把若干 JSON 字节片段拼成一个 JSON 数组"""
+    return b'[' + b','.join(fragments) + b']'
+
+
+def merge_object(fragment, extra):
+    """
+    给一个 JSON 对象片段追加字段，不解析原片段
+    fragment 必须是以 '{' 开头、'}' 结尾的对象；extra 是待追加字段的字典
+    """
+    if not extra:
+        return fragment
+    extra_bytes = dumps_bytes(extra)
+    if fragment == b'{}':
+        return extra_bytes
+    return fragment[:-1] + b',' + extra_bytes[1:]
+
+
+def with_raw_field(obj, key, raw):
+    """把已序列化的 JSON 片段作为字段 key 的值放进对象 obj 中，返回整个对象的字节串"""
+    head = dumps_bytes(obj)
+    field = dumps_bytes(key) + b':' + raw
+    if head == b'{}':
+        return b'{' + field + b'}'
+    return head[:-1] + b',' + field + b'}'
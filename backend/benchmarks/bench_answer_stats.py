@@ -0,0 +1,108 @@
+"""
+答案分布（常见错误）基准测试
+一份测试 20 道填空题 + 10 道选择题，逐条模拟提交（默认 3000 次）：填空题的错误答案按 Zipf 分布从 1000 种写法中抽取，测量：
+- 每次提交更新答案分布的耗时（record_answer_stats）
+- 每道填空题保留的答案行数，Space-Saving 给出的前 5 个常见错误中有几个属于精确计数的前 5 个
+- 选择题的选项计数是否精确
+
+运行: cd backend && python benchmarks/bench_answer_stats.py [提交数]
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+import statistics
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, TestSubmission, AnswerStat, save_questions
+from app.services.answer_stats import record_answer_stats, load_answer_stats, SKETCH_SIZE, MISTAKE_LIMIT
+from app.services.grading import answer_key
+
+FILL_QUESTIONS = 20
+CHOICE_QUESTIONS = 10
+DISTINCT_MISTAKES = 1000
+OPTIONS = ['A1', 'B2', 'C3', 'D4']
+
+
+def setup():
+    db.session.add(User(username='student', email='student@test.com', role='student'))
+    problems = [Problem(title=f'填空{i}', content=f'填空{i}=?', type='填空题', difficulty=1, correct_answer='0')
+                for i in range(FILL_QUESTIONS)]
+    problems += [Problem(title=f'选择{i}', content=f'选择{i}=?', type='选择题', difficulty=1, correct_answer=OPTIONS[0],
+                         options=json.dumps(OPTIONS)) for i in range(CHOICE_QUESTIONS)]
+    for problem in problems:
+        problem.answer_key = answer_key(problem.correct_answer)
+    db.session.add_all(problems)
+    test = Test(title='常见错误测试', type='周测', total_questions=len(problems), estimated_time=60, difficulty=1)
+    db.session.add(test)
+    db.session.flush()
+    save_questions(test.id, [p.id for p in problems])
+    db.session.commit()
+    return test.id, [p.id for p in problems[:FILL_QUESTIONS]], [p.id for p in problems[FILL_QUESTIONS:]]
+
+
+def main():
+    submissions = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    path = os.path.join(tempfile.mkdtemp(), 'bench_answer_stats.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+    rng = random.Random(11)
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(DISTINCT_MISTAKES)]
+    mistakes = [str(value) for value in range(1, DISTINCT_MISTAKES + 1)]
+
+    with app.app_context():
+        test_id, fill_ids, choice_ids = setup()
+        exact = {qid: Counter() for qid in fill_ids + choice_ids}
+        samples = []
+        for i in range(submissions):
+            rows = []
+            for qid in fill_ids:
+                correct = rng.random() < 0.5
+                answer = '0' if correct else rng.choices(mistakes, weights)[0]
+                rows.append({'problem_id': qid, 'answer': answer, 'is_correct': correct})
+                if not correct:
+                    exact[qid][answer] += 1
+            for qid in choice_ids:
+                answer = rng.choices(OPTIONS, [5, 2, 2, 1])[0]
+                rows.append({'problem_id': qid, 'answer': answer, 'is_correct': answer == OPTIONS[0]})
+                exact[qid][answer] += 1
+            db.session.add(TestSubmission(test_id=test_id, user_id=1, answers='{}', score=0, duration=0))
+            db.session.flush()
+            start = time.perf_counter()
+            record_answer_stats(test_id, rows)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.session.commit()
+
+        samples.sort()
+        print(f"{submissions} 次提交 × {FILL_QUESTIONS} 道填空题 + {CHOICE_QUESTIONS} 道选择题")
+        print(f"record_answer_stats 中位数 {statistics.median(samples):.2f}ms，"
+              f"P95 {samples[int(len(samples) * 0.95) - 1]:.2f}ms")
+
+        stats = load_answer_stats(test_id)
+        rows = db.session.query(AnswerStat).filter_by(test_id=test_id).count()
+        distinct = statistics.mean(len(exact[qid]) for qid in fill_ids)
+        print(f"答案分布共 {rows} 行（每道填空题最多 {SKETCH_SIZE} 行，平均实际出现 {distinct:.0f} 种错误答案）")
+        matched = 0
+        bounded = True
+        for qid in fill_ids:
+            top = [answer for answer, _ in exact[qid].most_common(MISTAKE_LIMIT)]
+            kept = stats.get(qid, [])
+            matched += len(set(top) & {answer for _, answer, _, _ in kept[:MISTAKE_LIMIT]})
+            bounded &= all(count - error <= exact[qid][answer] <= count for _, answer, count, error in kept)
+        print(f"前 {MISTAKE_LIMIT} 个常见错误的召回率 {matched / (MISTAKE_LIMIT * FILL_QUESTIONS):.0%}，"
+              f"计数上下界{'全部' if bounded else '未能'}包含精确次数")
+        choice_exact = all({answer: count for _, answer, count, _ in stats.get(qid, [])} == dict(exact[qid])
+                           for qid in choice_ids)
+        print(f"选择题选项计数{'精确' if choice_exact else '不一致'}")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+自动组卷基准测试
+- 用 data/problems 中的种子题目随机拼接生成不同规模的题库（默认 1千、1万、10万道），写入临时数据库
+- 分别测量组卷索引的构建耗时，以及几组常见组卷条件的求解耗时和约束满足情况
+
+运行: cd backend && python benchmarks/bench_assembly.py [题目数量 ...]
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.problem import Problem
+from app.models.study_record import KnowledgePoint, problem_topics, normalize_topics
+from app.models.data_version import bump_version
+from app.services.assembly_service import parse_spec, assemble_test, get_index
+from collections import Counter
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'problems')
+BANK_SIZES = [1000, 10000, 100000]
+REPEAT = 20
+
+
+def load_seed_problems():
+    seeds = []
+    for name in ('multiple_choice', 'fill_blank', 'solution'):
+        with open(os.path.join(DATA_DIR, f'{name}.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        seeds.extend(data['problems'] if isinstance(data, dict) else data)
+    return seeds
+
+
+def add_problems(start, count, seeds):
+    """追加题目及知识点关联，题目ID从 start + 1 开始连续编号，返回按题目数从多到少排列的知识点"""
+    rng = random.Random(start)
+    rows, topics = [], []
+    for i in range(start, start + count):
+        seed = rng.choice(seeds)
+        rows.append({
+            'title': f"{seed['title']}{i}",
+            'content': f"{seed['content']} ({i})",
+            'type': seed['type'],
+            'difficulty': min(max(seed['difficulty'] + rng.choice((-1, 0, 0, 1)), 1), 5),
+            'topics': ','.join(normalize_topics(seed['topics'])),
+            'correct_answer': seed['correct_answer']
+        })
+        topics.append(normalize_topics(seed['topics']))
+    for offset in range(0, count, 5000):
+        db.session.execute(Problem.__table__.insert(), rows[offset:offset + 5000])
+
+    ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+    missing = sorted({name for names in topics for name in names} - set(ids))
+    if missing:
+        db.session.execute(KnowledgePoint.__table__.insert(), [{'name': name} for name in missing])
+        ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+    links = [{'problem_id': start + i + 1, 'knowledge_id': ids[name]}
+             for i, names in enumerate(topics) for name in names]
+    for offset in range(0, len(links), 5000):
+        db.session.execute(problem_topics.insert(), links[offset:offset + 5000])
+    # 题库版本变化，组卷索引随之重建
+    bump_version('problems')
+    db.session.commit()
+    sizes = Counter(name for names in topics for name in names)
+    return [name for name, _ in sizes.most_common()]
+
+
+def specs(topics, count):
+    rng = random.Random(7)
+    return {
+        '20题 不限条件': {'count': 20},
+        '30题 题型+难度': {
+            'count': 30, 'type_counts': {'选择题': 15, '填空题': 10, '解答题': 5},
+            'difficulty': {'mean': 3.2, 'min': 2, 'max': 5}
+        },
+        '30题 全部条件': {
+            'count': 30, 'type_counts': {'选择题': 12, '填空题': 10, '解答题': 4},
+            'topics': {topics[0]: 4, topics[1]: 3, topics[2]: 3, topics[3]: 2},
+            'difficulty': {'mean': 3.2, 'min': 2, 'max': 5}, 'time_budget': 105,
+            # 模拟之前布置过的题目
+            'exclude': rng.sample(range(1, count + 1), min(2000, count // 5))
+        }
+    }
+
+
+def timed(func):
+    samples = []
+    for i in range(REPEAT):
+        start = time.perf_counter()
+        result = func(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return result, statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    sizes = sorted(int(arg) for arg in sys.argv[1:]) or BANK_SIZES
+    seeds = load_seed_problems()
+    path = os.path.join(tempfile.mkdtemp(), 'bench_assembly.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+
+    with app.app_context():
+        # 同一个数据库中逐步扩充题库
+        loaded = 0
+        for count in sizes:
+            topics = add_problems(loaded, count - loaded, seeds)
+            loaded = count
+
+            start = time.perf_counter()
+            get_index()
+            print(f"\n题库 {count} 道: 构建组卷索引 {(time.perf_counter() - start) * 1000:.0f}ms")
+
+            print(f"{'条件':<16}{'中位数(ms)':>12}{'P95(ms)':>10}  结果")
+            for name, data in specs(topics, count).items():
+                spec = parse_spec(data)
+                payload, median, p95 = timed(lambda i: assemble_test(spec, seed=i))
+                summary = json.loads(payload)['summary']
+                outcome = '全部满足' if not summary['unmet'] else '; '.join(summary['unmet'])
+                print(f"{name:<16}{median:>12.1f}{p95:>10.1f}  平均难度 {summary['difficulty_mean']}, "
+                      f"预计 {summary['estimated_time']} 分钟, {outcome}")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
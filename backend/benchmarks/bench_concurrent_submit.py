@@ -0,0 +1,98 @@
+"""
+并发练习提交基准测试
+多个线程同时向同一用户提交答案（单题提交与批量提交混合），结束后检查：
+- 每日提交计数等于实际提交次数（没有丢失的累加）
+- 每道题只有一条做题状态记录（没有重复插入）
+
+运行: cd backend && python benchmarks/bench_concurrent_submit.py [线程数] [每线程提交次数]
+"""
+import sys
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem, UserProblemStatus, DailyUserSubmission
+from flask_jwt_extended import create_access_token
+
+PROBLEM_COUNT = 20
+BATCH_SIZE = 5
+
+
+def setup(app):
+    with app.app_context():
+        user = User(username='bench', email='bench@test.com', role='student')
+        user.set_password('password123')
+        db.session.add(user)
+        for i in range(PROBLEM_COUNT):
+            db.session.add(Problem(
+                title=f'题目{i}', content=f'{i}+1=?', type='填空题',
+                difficulty=1, topics='基础题', correct_answer=str(i + 1)
+            ))
+        db.session.commit()
+        return user.id, create_access_token(identity=str(user.id))
+
+
+def worker(app, token, submits, seed, errors):
+    rng = random.Random(seed)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    sent = 0
+    while sent < submits:
+        if rng.random() < 0.5:
+            pid = rng.randint(1, PROBLEM_COUNT)
+            response = client.post(f'/api/problems/{pid}/submit', json={'answer': str(pid)}, headers=headers)
+            sent += 1
+        else:
+            size = min(BATCH_SIZE, submits - sent)
+            items = [{'problem_id': rng.randint(1, PROBLEM_COUNT), 'answer': '0'} for _ in range(size)]
+            response = client.post('/api/problems/submit-batch', json={'items': items}, headers=headers)
+            sent += size
+        if response.status_code != 200:
+            errors.append(response.get_json())
+
+
+def main():
+    threads_count = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    submits = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    path = os.path.join(tempfile.mkdtemp(), 'bench_submit.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+    user_id, token = setup(app)
+
+    errors = []
+    threads = [
+        threading.Thread(target=worker, args=(app, token, submits, seed, errors))
+        for seed in range(threads_count)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    expected = threads_count * submits
+    with app.app_context():
+        daily = DailyUserSubmission.query.filter_by(user_id=user_id, submission_date=date.today()).all()
+        statuses = UserProblemStatus.query.filter_by(user_id=user_id).count()
+        distinct = db.session.query(UserProblemStatus.problem_id).filter_by(user_id=user_id).distinct().count()
+
+    counted = sum(d.count for d in daily)
+    print(f"{threads_count} 个线程 x {submits} 次提交，耗时 {seconds:.2f}s，{expected / seconds:.0f} 次/秒，失败请求 {len(errors)}")
+    if errors:
+        print(f"失败示例: {errors[0]}")
+    print(f"每日计数: {counted} / {expected}（{len(daily)} 行）")
+    print(f"做题状态: {statuses} 行，{distinct} 道不同的题")
+    ok = not errors and counted == expected and len(daily) == 1 and statuses == distinct
+    print('通过' if ok else '失败')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
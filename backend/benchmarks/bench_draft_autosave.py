@@ -0,0 +1,134 @@
+"""
+作答草稿自动保存基准测试
+模拟大量学生同时作答，每轮每人上报一次变化的答案（相当于每 10 秒自动保存一次），比较：
+- 直接写入（DRAFT_FLUSH_INTERVAL = 0）：每次上报都写数据库
+- 合并写入：上报只进内存，每轮结束时统一写入一次
+统计上报接口耗时、写入数据库的 SQL 条数，以及草稿记录表最终的行数（压缩效果）
+
+运行: cd backend && python benchmarks/bench_draft_autosave.py [学生数] [轮数]
+"""
+import sys
+import os
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, TestDraftEntry, save_questions
+from app.services.draft_service import draft_store
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+QUESTION_COUNT = 20
+
+
+def setup(app, students):
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'username': f'student{i}', 'email': f'student{i}@test.com', 'role': 'student'}
+            for i in range(students)
+        ])
+        db.session.execute(Problem.__table__.insert(), [
+            {'title': f'题目{i}', 'content': f'{i}+1=?', 'type': '填空题', 'difficulty': 1,
+             'correct_answer': str(i + 1)}
+            for i in range(QUESTION_COUNT)
+        ])
+        test = Test(title='自动保存测试', type='周测', total_questions=QUESTION_COUNT, estimated_time=60, difficulty=1)
+        db.session.add(test)
+        db.session.flush()
+        save_questions(test.id, list(range(1, QUESTION_COUNT + 1)))
+        db.session.commit()
+        tokens = [create_access_token(identity=str(user_id)) for user_id, in db.session.query(User.id)]
+        return test.id, tokens
+
+
+class StatementCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.writes = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith('SELECT'):
+            self.writes += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, 'before_cursor_execute', self)
+
+
+def run(app, test_id, tokens, rounds, flush_interval):
+    """每轮每个学生改 1-3 道题的答案；合并写入时每轮结束统一写入一次"""
+    client = app.test_client()
+    rng = random.Random(flush_interval)
+    draft_store.flush_interval = flush_interval
+    with app.app_context():
+        engine = db.engine
+    samples = []
+    flush_ms = []
+    with StatementCounter(engine) as counter:
+        for r in range(rounds):
+            for token in tokens:
+                answers = {str(rng.randint(1, QUESTION_COUNT)): f'答案{rng.randint(1, 9)}' for _ in range(rng.randint(1, 3))}
+                start = time.perf_counter()
+                response = client.put(f'/api/tests/{test_id}/draft', json={'answers': answers, 'elapsed': r * 10},
+                                      headers={'Authorization': f'Bearer {token}'})
+                samples.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.get_json()
+            if flush_interval:
+                with app.app_context():
+                    start = time.perf_counter()
+                    draft_store.flush()
+                    flush_ms.append((time.perf_counter() - start) * 1000)
+                    db.session.remove()
+    samples.sort()
+    with app.app_context():
+        rows = db.session.query(TestDraftEntry).count()
+    return {
+        'median': statistics.median(samples),
+        'p95': samples[int(len(samples) * 0.95) - 1],
+        'writes': counter.writes,
+        'flush': statistics.median(flush_ms) if flush_ms else None,
+        'rows': rows
+    }
+
+
+def reset(app):
+    with app.app_context():
+        db.session.execute('DELETE FROM test_draft_entries')
+        db.session.execute('DELETE FROM test_drafts')
+        db.session.commit()
+    draft_store._draft_ids.clear()
+    draft_store._appended.clear()
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    path = os.path.join(tempfile.mkdtemp(), 'bench_draft.db')
+    # 后台线程的刷新间隔设得足够长，由基准测试在每轮结束时手动写入
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none',
+                      'DRAFT_FLUSH_INTERVAL': 3600})
+    test_id, tokens = setup(app, students)
+    print(f"{students} 名学生，{rounds} 轮自动保存（共 {students * rounds} 次上报）")
+
+    print(f"{'模式':<10}{'上报中位数(ms)':>14}{'P95(ms)':>10}{'写SQL条数':>10}{'每轮写入(ms)':>14}{'草稿记录行数':>12}")
+    for name, interval in (('直接写入', 0), ('合并写入', 3600)):
+        reset(app)
+        result = run(app, test_id, tokens, rounds, interval)
+        flush = f"{result['flush']:.1f}" if result['flush'] is not None else '-'
+        print(f"{name:<10}{result['median']:>14.2f}{result['p95']:>10.2f}{result['writes']:>10}{flush:>14}{result['rows']:>12}")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+判分基准测试
+用种子题目生成若干份 20 题的答卷（学生答案混合了原样答案、等价写法和错误答案），对比：
+1. 原方式：str(answer) == str(correct_answer)
+2. 每次判分时把标准答案和学生答案都重新规范化（无预生成答案键、无缓存）
+3. 预生成答案键 + 学生答案规范化缓存（grade_test）
+
+运行: cd backend && python benchmarks/bench_grading.py [答卷数量]
+"""
+import sys
+import os
+import json
+import random
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.grading import canonicalize, answer_key, grade_test, cache_info
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'problems')
+
+QUESTIONS_PER_TEST = 20
+
+# 把标准答案改写成等价写法
+REWRITES = [
+    lambda a: a.replace('°', ''),
+    lambda a: a.replace('²', '^2'),
+    lambda a: ' '.join(a),
+    lambda a: a.replace('/', '／').replace('1', '１'),
+    lambda a: str(eval(a)) if a.count('/') == 1 and a.replace('/', '').replace('-', '').isdigit() else a,
+]
+
+
+def load_problems():
+    problems = []
+    for name in ('multiple_choice', 'fill_blank', 'solution'):
+        with open(os.path.join(DATA_DIR, f'{name}.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        for seed in data['problems'] if isinstance(data, dict) else data:
+            problems.append(SimpleNamespace(
+                id=len(problems) + 1,
+                correct_answer=seed['correct_answer'],
+                answer_key=answer_key(seed['correct_answer'])
+            ))
+    return problems
+
+
+def make_submissions(problems, count):
+    rng = random.Random(42)
+    submissions = []
+    for _ in range(count):
+        paper = rng.sample(problems, QUESTIONS_PER_TEST)
+        answers = {}
+        for problem in paper:
+            roll = rng.random()
+            if roll < 0.5:
+                answers[str(problem.id)] = problem.correct_answer
+            elif roll < 0.8:
+                answers[str(problem.id)] = rng.choice(REWRITES)(problem.correct_answer)
+            else:
+                answers[str(problem.id)] = str(rng.randint(-10, 100))
+        submissions.append((paper, answers))
+    return submissions
+
+
+def exact_match(submissions):
+    correct = 0
+    for paper, answers in submissions:
+        for problem in paper:
+            correct += str(answers.get(str(problem.id))) == str(problem.correct_answer)
+    return correct
+
+
+def canonicalize_each_time(submissions):
+    raw = canonicalize.__wrapped__
+    correct = 0
+    for paper, answers in submissions:
+        for problem in paper:
+            correct += raw(answers.get(str(problem.id))) == raw(problem.correct_answer)
+    return correct
+
+
+def precomputed_keys(submissions):
+    correct = 0
+    for paper, answers in submissions:
+        correct += grade_test(paper, answers)['correct_count']
+    return correct
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    problems = load_problems()
+    submissions = make_submissions(problems, count)
+    grades = count * QUESTIONS_PER_TEST
+
+    print(f"{count} 份答卷，共 {grades} 道题")
+    print(f"{'方式':<28}{'判对':>8}{'耗时(ms)':>10}{'题/秒':>12}")
+    for name, func in [
+        ('字符串精确比较', exact_match),
+        ('每次重新规范化', canonicalize_each_time),
+        ('预生成答案键 + 缓存', precomputed_keys),
+    ]:
+        canonicalize.cache_clear()
+        start = time.perf_counter()
+        correct = func(submissions)
+        seconds = time.perf_counter() - start
+        print(f"{name:<28}{correct:>8}{seconds * 1000:>10.1f}{grades / seconds:>12.0f}")
+    print(f"规范化缓存: {cache_info()}")
+
+
+if __name__ == '__main__':
+    main()
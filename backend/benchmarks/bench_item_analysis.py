@@ -0,0 +1,104 @@
+"""
+项目分析基准测试
+生成 5000 个学生 × 100 道题的提交（学生能力与题目难度按 Rasch 模型模拟作答），测量：
+- 构建答对矩阵（读取答对的作答）
+- 向量化计算项目分析指标的耗时
+- analyze_test 整体耗时（含写回统计表）
+
+运行: cd backend && python benchmarks/bench_item_analysis.py [学生数] [题目数]
+"""
+import sys
+import os
+import math
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, TestSubmission, SubmissionAnswer, save_questions
+from app.services import item_analysis
+from app.services.test_service import check_test_statistics
+
+REPEAT = 5
+
+
+def setup(students, questions):
+    """直接批量写入提交记录和每道题的作答"""
+    rng = random.Random(3)
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'student{i}', 'email': f'student{i}@test.com', 'role': 'student'}
+        for i in range(students)
+    ])
+    db.session.execute(Problem.__table__.insert(), [
+        {'title': f'题目{i}', 'content': f'{i}+1=?', 'type': '填空题', 'difficulty': 1,
+         'correct_answer': str(i + 1)}
+        for i in range(questions)
+    ])
+    test = Test(title='项目分析测试', type='周测', total_questions=questions, estimated_time=60, difficulty=1)
+    db.session.add(test)
+    db.session.flush()
+    save_questions(test.id, list(range(1, questions + 1)))
+
+    difficulty = [rng.gauss(0, 1) for _ in range(questions)]
+    submissions, answers = [], []
+    for user_id in range(1, students + 1):
+        ability = rng.gauss(0, 1)
+        correct = [rng.random() < 1 / (1 + math.exp(difficulty[j] - ability)) for j in range(questions)]
+        submissions.append({
+            'id': user_id, 'test_id': test.id, 'user_id': user_id, 'answers': '{}',
+            'score': round(sum(correct) / questions * 100, 1), 'duration': 1800, 'paper_version': 1
+        })
+        answers.extend({'submission_id': user_id, 'problem_id': j + 1, 'answer': '1', 'is_correct': ok}
+                       for j, ok in enumerate(correct))
+    db.session.execute(TestSubmission.__table__.insert(), submissions)
+    for offset in range(0, len(answers), 20000):
+        db.session.execute(SubmissionAnswer.__table__.insert(), answers[offset:offset + 20000])
+    db.session.commit()
+    # 计数由全量校验补齐，统计行存在后分析结果才能写回
+    check_test_statistics(test.id, repair=True)
+    db.session.commit()
+    return test.id
+
+
+def timed(func):
+    samples = []
+    result = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    path = os.path.join(tempfile.mkdtemp(), 'bench_item_analysis.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+
+    with app.app_context():
+        test_id = setup(students, questions)
+        print(f"{students} 名学生 × {questions} 道题")
+
+        loaded, elapsed = timed(lambda: item_analysis.load_matrix(test_id))
+        print(f"构建答对矩阵: {elapsed:.1f}ms")
+        _, scores, _, matrix = loaded
+
+        _, elapsed = timed(lambda: item_analysis.analyze_matrix(matrix, scores))
+        print(f"计算指标: {elapsed:.1f}ms")
+
+        result, elapsed = timed(lambda: item_analysis.analyze_test(test_id))
+        db.session.commit()
+        print(f"analyze_test（含写回）: {elapsed:.1f}ms")
+        print(f"信度 {result['reliability']}, 得分分位数 {result['score_quantiles']}")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+题目全文检索基准测试
+- 用 data/problems 中的种子题目随机拼接生成大规模题库（默认10万道），写入临时数据库
+- 建立全文索引后测量常见中文关键词的检索耗时
+
+运行: cd backend && python benchmarks/bench_search.py [题目数量]
+"""
+import sys
+import os
+import json
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.problem import Problem
+from app.services.search_service import rebuild_search_index
+from app.services.problem_service import search_problems, list_problems
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'problems')
+QUERIES = ['调和级数', '韦达定理', '导数', '三角函数 周期', '数列求和', '椭圆 离心率', 'sin']
+
+
+def load_seed_problems():
+    seeds = []
+    for name in ('multiple_choice', 'fill_blank', 'solution'):
+        with open(os.path.join(DATA_DIR, f'{name}.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        seeds.extend(data['problems'] if isinstance(data, dict) else data)
+    return seeds
+
+
+def generate_rows(count, seeds):
+    rng = random.Random(42)
+    for i in range(count):
+        a, b = rng.choice(seeds), rng.choice(seeds)
+        yield {
+            'title': f"{a['title']}{i}",
+            'content': f"{a['content']} {b['content']}",
+            'type': a['type'],
+            'difficulty': a['difficulty'],
+            'topics': a['topics'] if isinstance(a['topics'], str) else ','.join(a['topics']),
+            'correct_answer': a['correct_answer'],
+            'explanation': b.get('explanation')
+        }
+
+
+def timed(func, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return result, statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = os.path.join(tempfile.mkdtemp(), 'bench_search.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+
+    with app.app_context():
+        seeds = load_seed_problems()
+        start = time.perf_counter()
+        rows = list(generate_rows(count, seeds))
+        for i in range(0, len(rows), 5000):
+            db.session.execute(Problem.__table__.insert(), rows[i:i + 5000])
+        db.session.commit()
+        print(f"写入 {count} 道题目: {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rebuild_search_index()
+        db.session.commit()
+        print(f"建立全文索引: {time.perf_counter() - start:.1f}s, 数据库大小 {os.path.getsize(path) / 1024 / 1024:.1f}MB")
+
+        print(f"{'关键词':<12}{'命中数':>8}{'中位数(ms)':>12}{'P95(ms)':>10}")
+        for keywords in QUERIES:
+            result, median, p95 = timed(lambda: search_problems(keywords, limit=20))
+            print(f"{keywords:<12}{result['total']:>8}{median:>12.1f}{p95:>10.1f}")
+
+        _, median, p95 = timed(lambda: list_problems({'q': '调和级数'}, limit=20))
+        print(f"列表接口带关键词筛选(含分面计数): 中位数 {median:.1f}ms, P95 {p95:.1f}ms")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
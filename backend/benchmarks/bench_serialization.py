@@ -0,0 +1,100 @@
+"""
+题目列表序列化基准测试
+对比一万道题的列表响应在三种方式下的编码吞吐量：
+1. 原方式：逐行构造字典、json.loads(options)，再用标准库 json 编码
+2. 逐行构造字典后改用 FastJSONEncoder（orjson）编码
+3. 直接拼接写入时生成的题目JSON片段
+
+运行: cd backend && python benchmarks/bench_serialization.py [题目数量]
+"""
+import sys
+import os
+import json
+import random
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.problem import Problem
+from app.utils.json_codec import FastJSONEncoder, join_array, orjson
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'problems')
+
+
+def make_problems(count):
+    seeds = []
+    for name in ('multiple_choice', 'fill_blank', 'solution'):
+        with open(os.path.join(DATA_DIR, f'{name}.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        seeds.extend(data['problems'] if isinstance(data, dict) else data)
+
+    rng = random.Random(42)
+    problems = []
+    for i in range(count):
+        seed = rng.choice(seeds)
+        topics = seed['topics'] if isinstance(seed['topics'], str) else ','.join(seed['topics'])
+        problem = Problem(
+            id=i + 1,
+            title=seed['title'],
+            content=seed['content'],
+            type=seed['type'],
+            difficulty=seed['difficulty'],
+            topics=topics,
+            options=json.dumps(seed['options']) if 'options' in seed else None,
+            correct_answer=seed['correct_answer'],
+            explanation=seed.get('explanation')
+        )
+        problem.public_json = problem.build_public_json()
+        problems.append(problem)
+    return problems
+
+
+def as_dict(p):
+    return {
+        'id': p.id,
+        'title': p.title,
+        'content': p.content,
+        'type': p.type,
+        'difficulty': p.difficulty,
+        'topics': p.topics.split(',') if p.topics else [],
+        'options': json.loads(p.options) if p.options else None
+    }
+
+
+def stdlib(problems):
+    return json.dumps([as_dict(p) for p in problems]).encode('utf-8')
+
+
+def fast_encoder(problems):
+    return FastJSONEncoder().encode([as_dict(p) for p in problems]).encode('utf-8')
+
+
+def fragments(problems):
+    return join_array([p.public_fragment() for p in problems])
+
+
+def measure(func, problems, repeat=10):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = func(problems)
+        best = min(best, time.perf_counter() - start)
+        size = len(payload)
+    return size, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    problems = make_problems(count)
+    assert json.loads(fragments(problems)) == json.loads(stdlib(problems))
+
+    print(f"{count} 道题目，orjson {'已安装' if orjson else '未安装'}")
+    print(f"{'方式':<24}{'字节数':>12}{'耗时(ms)':>10}{'吞吐(MB/s)':>12}")
+    for name, func in [('字典 + 标准库json', stdlib), ('字典 + FastJSONEncoder', fast_encoder), ('拼接预生成片段', fragments)]:
+        size, seconds = measure(func, problems)
+        print(f"{name:<24}{size:>12}{seconds * 1000:>10.1f}{size / seconds / 1024 / 1024:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
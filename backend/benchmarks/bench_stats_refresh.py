@@ -0,0 +1,105 @@
+"""
+测试统计批量重算基准测试
+生成若干份测试及其提交（默认 300 份测试 × 每份 100 次提交 × 20 道题），比较重算全部统计的耗时：
+- 逐个测试调用 calculate_test_statistics（每份测试各自查询、提交）
+- 分块批量重算，在当前进程中计算（workers=0）
+- 分块批量重算，进程池并行计算
+
+运行: cd backend && python benchmarks/bench_stats_refresh.py [测试数] [每份测试的提交数]
+"""
+import sys
+import os
+import random
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, TestQuestion, TestSubmission, SubmissionAnswer, TestResult, QuestionStat
+from app.services.test_service import calculate_test_statistics, check_test_statistics
+from app.services.stats_refresh import stats_refresher
+
+QUESTION_COUNT = 20
+STUDENTS = 500
+
+
+def setup(tests, submissions):
+    rng = random.Random(5)
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'student{i}', 'email': f'student{i}@test.com', 'role': 'student'}
+        for i in range(STUDENTS)
+    ])
+    db.session.execute(Problem.__table__.insert(), [
+        {'title': f'题目{i}', 'content': f'{i}+1=?', 'type': '填空题', 'difficulty': 1,
+         'correct_answer': str(i + 1)}
+        for i in range(QUESTION_COUNT * 5)
+    ])
+    db.session.execute(Test.__table__.insert(), [
+        {'title': f'测试{i}', 'type': '周测', 'total_questions': QUESTION_COUNT, 'estimated_time': 60, 'difficulty': 1}
+        for i in range(tests)
+    ])
+    links, rows, answers = [], [], []
+    submission_id = 0
+    for test_id in range(1, tests + 1):
+        problem_ids = rng.sample(range(1, QUESTION_COUNT * 5 + 1), QUESTION_COUNT)
+        links.extend({'test_id': test_id, 'problem_id': pid, 'order': order} for order, pid in enumerate(problem_ids, 1))
+        for _ in range(submissions):
+            submission_id += 1
+            correct = [rng.random() < 0.7 for _ in problem_ids]
+            rows.append({
+                'id': submission_id, 'test_id': test_id, 'user_id': rng.randint(1, STUDENTS), 'answers': '{}',
+                'score': round(sum(correct) / QUESTION_COUNT * 100, 1), 'duration': rng.randint(300, 3600),
+                'paper_version': 1
+            })
+            answers.extend({'submission_id': submission_id, 'problem_id': pid, 'answer': '1', 'is_correct': ok,
+                            'time_spent': rng.randint(10, 300)} for pid, ok in zip(problem_ids, correct))
+    db.session.execute(TestQuestion.__table__.insert(), links)
+    for offset in range(0, len(rows), 20000):
+        db.session.execute(TestSubmission.__table__.insert(), rows[offset:offset + 20000])
+    for offset in range(0, len(answers), 20000):
+        db.session.execute(SubmissionAnswer.__table__.insert(), answers[offset:offset + 20000])
+    db.session.commit()
+
+
+def reset():
+    """清空统计表，每种方式都从头写入"""
+    db.session.execute(TestResult.__table__.delete())
+    db.session.execute(QuestionStat.__table__.delete())
+    db.session.commit()
+
+
+def main():
+    tests = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    submissions = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    path = os.path.join(tempfile.mkdtemp(), 'bench_refresh.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+
+    with app.app_context():
+        setup(tests, submissions)
+        print(f"{tests} 份测试 × {submissions} 次提交 × {QUESTION_COUNT} 道题")
+
+        reset()
+        start = time.perf_counter()
+        for test_id in range(1, tests + 1):
+            calculate_test_statistics(test_id)
+        print(f"{'逐个测试':<16}{(time.perf_counter() - start) * 1000:>10.0f}ms")
+
+        workers = max(stats_refresher.workers, 2)
+        for name, workers in (('分块 当前进程', 0), (f'分块 {workers} 个进程', workers)):
+            reset()
+            start = time.perf_counter()
+            job = stats_refresher.run(workers=workers)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name:<16}{elapsed:>10.0f}ms  写入 {job['written']}，失败 {job['failed']}")
+
+        inconsistent = [test_id for test_id in range(1, tests + 1) if check_test_statistics(test_id)]
+        print('重算结果与提交记录一致' if not inconsistent else f'不一致的测试: {inconsistent[:10]}')
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
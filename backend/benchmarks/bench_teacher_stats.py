@@ -0,0 +1,94 @@
+"""
+教师端测试分析基准测试
+一份测试，默认 2000 名学生（部分学生提交多次）× 50 道题，测量 build_test_dashboard 不走缓存时的耗时
+
+运行: cd backend && python benchmarks/bench_teacher_stats.py [学生数] [题目数]
+"""
+import sys
+import os
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, TestSubmission, SubmissionAnswer, save_questions
+from app.models.study_record import KnowledgePoint, problem_topics
+from app.services.test_service import build_test_dashboard
+
+TOPICS = ['函数', '导数', '数列', '三角函数', '概率', '向量', '立体几何', '解析几何']
+REPEAT = 20
+
+
+def setup(students, questions):
+    rng = random.Random(9)
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'student{i}', 'email': f'student{i}@test.com', 'role': 'student'}
+        for i in range(students)
+    ])
+    topics = [rng.sample(TOPICS, 2) for _ in range(questions)]
+    db.session.execute(Problem.__table__.insert(), [
+        {'title': f'题目{i}', 'content': f'{i}+1=?', 'type': '填空题', 'difficulty': rng.randint(1, 5),
+         'topics': ','.join(names), 'correct_answer': str(i + 1)}
+        for i, names in enumerate(topics)
+    ])
+    db.session.execute(KnowledgePoint.__table__.insert(), [{'name': name} for name in TOPICS])
+    ids = dict(db.session.query(KnowledgePoint.name, KnowledgePoint.id))
+    db.session.execute(problem_topics.insert(), [
+        {'problem_id': i + 1, 'knowledge_id': ids[name]} for i, names in enumerate(topics) for name in names
+    ])
+    test = Test(title='教师端分析测试', type='周测', total_questions=questions, estimated_time=60, difficulty=3)
+    db.session.add(test)
+    db.session.flush()
+    save_questions(test.id, list(range(1, questions + 1)))
+
+    rows, answers = [], []
+    submission_id = 0
+    for user_id in range(1, students + 1):
+        # 约五分之一的学生提交两次，只统计最后一次
+        for _ in range(2 if rng.random() < 0.2 else 1):
+            submission_id += 1
+            correct = [rng.random() < 0.65 for _ in range(questions)]
+            rows.append({
+                'id': submission_id, 'test_id': test.id, 'user_id': user_id, 'answers': '{}',
+                'score': round(sum(correct) / questions * 100, 1), 'duration': rng.randint(600, 3600),
+                'paper_version': 1
+            })
+            answers.extend({'submission_id': submission_id, 'problem_id': j + 1, 'answer': '1', 'is_correct': ok,
+                            'time_spent': rng.randint(10, 300)} for j, ok in enumerate(correct))
+    db.session.execute(TestSubmission.__table__.insert(), rows)
+    for offset in range(0, len(answers), 20000):
+        db.session.execute(SubmissionAnswer.__table__.insert(), answers[offset:offset + 20000])
+    db.session.commit()
+    return test, len(rows), len(answers)
+
+
+def main():
+    students = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    path = os.path.join(tempfile.mkdtemp(), 'bench_teacher_stats.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+
+    with app.app_context():
+        test, submissions, answers = setup(students, questions)
+        print(f"{students} 名学生，{submissions} 次提交，{answers} 条作答")
+        samples = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            data = build_test_dashboard(test)
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(f"build_test_dashboard 中位数 {statistics.median(samples):.1f}ms，"
+              f"P95 {samples[int(len(samples) * 0.95) - 1]:.1f}ms")
+        print(f"完成 {data['completed_count']} 人，平均分 {data['average_score']}，"
+              f"分数分布 {[item['count'] for item in data['score_distribution']]}")
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
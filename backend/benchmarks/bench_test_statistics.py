@@ -0,0 +1,126 @@
+"""
+测试统计基准测试
+统计随每次提交累加后，比较不同提交规模下：
+- 读取统计（get_test_statistics，不走缓存）：读取统计行和每道题的统计
+- 全量重算（check_test_statistics，一致性校验）：在全部提交记录上聚合
+- 每次提交写统计的 SQL 条数（与已有提交数无关）
+最后确认累计值与全量重算的结果一致
+
+运行: cd backend && python benchmarks/bench_test_statistics.py [提交数 ...]
+"""
+import sys
+import os
+import random
+import tempfile
+import time
+import statistics
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test, save_questions
+from app.services.submission_service import save_submission
+from app.services.test_service import get_test_statistics, check_test_statistics
+from sqlalchemy import event
+
+QUESTION_COUNT = 20
+STUDENTS = 200
+SUBMISSION_COUNTS = [1000, 10000]
+REPEAT = 20
+
+
+def setup():
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'student{i}', 'email': f'student{i}@test.com', 'role': 'student'}
+        for i in range(STUDENTS)
+    ])
+    db.session.execute(Problem.__table__.insert(), [
+        {'title': f'题目{i}', 'content': f'{i}+1=?', 'type': '填空题', 'difficulty': 1,
+         'correct_answer': str(i + 1)}
+        for i in range(QUESTION_COUNT)
+    ])
+    test = Test(title='统计测试', type='周测', total_questions=QUESTION_COUNT, estimated_time=60, difficulty=1)
+    db.session.add(test)
+    db.session.flush()
+    save_questions(test.id, list(range(1, QUESTION_COUNT + 1)))
+    db.session.commit()
+    return test.id
+
+
+def submit(test_id, count, rng):
+    """逐条保存提交（与提交接口相同的写入路径），每 500 条提交一次事务"""
+    for i in range(count):
+        answers = {str(pid): str(pid + 1) if rng.random() < 0.7 else '0' for pid in range(1, QUESTION_COUNT + 1)}
+        save_submission({
+            'test_id': test_id,
+            'user_id': rng.randint(1, STUDENTS),
+            'answers': answers,
+            'duration': rng.randint(300, 3600),
+            'time_spent': {str(pid): rng.randint(10, 300) for pid in range(1, QUESTION_COUNT + 1)}
+        })
+        if i % 500 == 499:
+            db.session.commit()
+    db.session.commit()
+
+
+class StatementCounter:
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(self.engine, 'before_cursor_execute', self)
+
+
+def timed(func):
+    samples = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.remove()
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    counts = sorted(int(arg) for arg in sys.argv[1:]) or SUBMISSION_COUNTS
+    path = os.path.join(tempfile.mkdtemp(), 'bench_stats.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+    rng = random.Random(1)
+
+    with app.app_context():
+        test_id = setup()
+        print(f"{'提交数':>8}{'读取统计(ms)':>14}{'P95':>8}{'全量重算(ms)':>14}{'P95':>8}{'每次提交写统计SQL':>18}")
+        loaded = 0
+        for count in counts:
+            submit(test_id, count - loaded, rng)
+            loaded = count
+
+            with StatementCounter(db.engine) as counter:
+                submit(test_id, 1, rng)
+                loaded += 1
+            stat_writes = sum(1 for s in counter.statements if 'test_results' in s or 'question_stats' in s)
+
+            read = timed(lambda: get_test_statistics(test_id))
+            full = timed(lambda: check_test_statistics(test_id))
+            print(f"{loaded:>8}{read[0]:>14.2f}{read[1]:>8.2f}{full[0]:>14.2f}{full[1]:>8.2f}{stat_writes:>18}")
+
+        differences = check_test_statistics(test_id)
+        print('累计值与全量重算一致' if not differences else f'不一致: {differences[:5]}')
+
+    os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+测试结果接口查询次数检查
+分别提交题目数不同的测试，统计 GET /api/tests/<id>/result 执行的 SQL 条数，
+结果页读取提交时保存的结果，查询次数应与题目数量无关
+
+运行: cd backend && python benchmarks/check_result_queries.py
+"""
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.user import User
+from app.models.problem import Problem
+from app.models.test import Test
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+QUESTION_COUNTS = [1, 10, 100]
+MAX_QUERIES = 2
+
+
+def setup(app):
+    with app.app_context():
+        user = User(username='bench', email='bench@test.com', role='student')
+        user.set_password('password123')
+        db.session.add(user)
+        for i in range(max(QUESTION_COUNTS)):
+            db.session.add(Problem(
+                title=f'题目{i}', content=f'{i}+1=?', type='填空题',
+                difficulty=1, topics=f'知识点{i % 5}', correct_answer=str(i + 1)
+            ))
+        db.session.flush()
+        test_ids = []
+        for count in QUESTION_COUNTS:
+            test = Test(
+                title=f'{count} 题测试', type='周测', total_questions=count, estimated_time=10,
+                difficulty=1, problem_ids=','.join(str(pid) for pid in range(1, count + 1))
+            )
+            db.session.add(test)
+            db.session.flush()
+            test_ids.append(test.id)
+        db.session.commit()
+        return create_access_token(identity=str(user.id)), test_ids
+
+
+def count_queries(app, func):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = func()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return response, len(statements)
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'check_result.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'CACHE_BACKEND': 'none'})
+    token, test_ids = setup(app)
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    counts = []
+    for count, test_id in zip(QUESTION_COUNTS, test_ids):
+        answers = {str(pid): str(pid) for pid in range(1, count + 1, 2)}
+        response = client.post(f'/api/tests/{test_id}/submit', json={'answers': answers}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+
+        response, queries = count_queries(app, lambda: client.get(f'/api/tests/{test_id}/result', headers=headers))
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        assert len(data['problems']) == count
+        assert data['submission_info']['correct_count'] == len(answers)
+        counts.append(queries)
+        print(f"{count:>4} 道题: {queries} 条查询")
+
+    ok = len(set(counts)) == 1 and counts[0] <= MAX_QUERIES
+    print('通过' if ok else '失败')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
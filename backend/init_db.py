@@ -3,9 +3,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
+from app.migrations import run_migrations
+from app.services.bank_io import import_problems, iter_records
+from app.services.similarity import rebuild_related
 from app.models.user import User
 from app.models.problem import Problem, UserProblemStatus, DailyUserSubmission
-from app.models.test import Test, TestResult, QuestionStat
+from app.models.test import Test, TestResult, QuestionStat, save_questions
+from app.models.data_version import bump_version
 from datetime import datetime, timedelta
 import json
 import logging
@@ -19,6 +23,9 @@ logger = logging.getLogger(__name__)
 # 自定义连续做题天数
 STREAK_DAYS = 2
 
+# 题目数据文件（data/problems 下）
+PROBLEM_FILES = ['multiple_choice', 'fill_blank', 'solution']
+
 def init_db():
     try:
         app = create_app()
@@ -69,16 +76,23 @@ def init_db():
             db.session.commit()
             logger.info("学习统计记录创建成功")
             
-            # 导入题目数据
-            problems = load_problems()
-            for problem_data in problems:
-                # 删除id字段，让数据库自动生成
-                if 'id' in problem_data:
-                    del problem_data['id']
-                problem = Problem(**problem_data)
-                db.session.add(problem)
-            logger.info(f"已加载 {len(problems)} 道题目")
+            # 导入题目数据（流式读取，批量写入并同步知识点关联和全文索引）
+            for type_name in PROBLEM_FILES:
+                file_path = os.path.join(os.getcwd(), '..', 'data', 'problems', f'{type_name}.json')
+                logger.info(f"尝试读取文件: {file_path}")
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        report = import_problems(iter_records(f, 'json', 'problems'))
+                    logger.info(f"{type_name}: {report.summary()}")
+                except FileNotFoundError:
+                    logger.warning(f"Warning: {file_path} not found")
+            db.session.commit()
+            logger.info(f"已加载 {Problem.query.count()} 道题目")
+            
+            # 计算相似题目
+            changed = rebuild_related()
             db.session.commit()
+            logger.info(f"已为 {len(changed)} 道题目计算相似题目")
             
             # 导入测试数据
             tests = load_tests()
@@ -86,8 +100,15 @@ def init_db():
                 # 删除id字段，让数据库自动生成
                 if 'id' in test_data:
                     del test_data['id']
+                topics = test_data.pop('topics', None)
+                problem_ids = test_data.pop('problem_ids', [])
                 test = Test(**test_data)
+                test.total_questions = len(problem_ids)
+                test.content_hash = test.build_content_hash(problem_ids)
+                test.set_topics(topics)
                 db.session.add(test)
+                db.session.flush()
+                save_questions(test.id, problem_ids)
             logger.info(f"已加载 {len(tests)} 份测试")
             db.session.commit()
             
@@ -116,6 +137,7 @@ def init_db():
             if len(problem_ids) > 0:
                 # 使用字典记录每天的做题数量
                 daily_submissions = {}
+                latest_status = {}  # 题目ID -> (状态, 提交时间)
                 
                 # 生成30天内的随机做题记录
                 current_date = datetime.now().date()
@@ -142,20 +164,24 @@ def init_db():
                             datetime.min.time()
                         ) + timedelta(hours=random_hour, minutes=random_minute)
                         
-                        # 创建做题记录，80%的正确率
-                        status = UserProblemStatus(
-                            user_id=test_student.id,
-                            problem_id=problem_id,
-                            status='正确' if random.random() > 0.2 else '错误',
-                            submitted_at=submission_time
-                        )
-                        db.session.add(status)
+                        # 创建做题记录，80%的正确率；每道题只保留最近一次的状态
+                        if problem_id not in latest_status or latest_status[problem_id][1] < submission_time:
+                            latest_status[problem_id] = (
+                                '正确' if random.random() > 0.2 else '错误',
+                                submission_time
+                            )
                     
                     # 记录这一天的做题数量
                     daily_submissions[submission_date] = daily_count
-                    
-                    # 每天的记录处理完后就提交一次
-                    db.session.commit()
+                
+                for problem_id, (status, submission_time) in latest_status.items():
+                    db.session.add(UserProblemStatus(
+                        user_id=test_student.id,
+                        problem_id=problem_id,
+                        status=status,
+                        submitted_at=submission_time
+                    ))
+                db.session.commit()
                 
                 # 创建每日提交记录
                 for date, count in daily_submissions.items():
@@ -173,9 +199,16 @@ def init_db():
             test_student.streak_days = STREAK_DAYS
             db.session.commit()
             
+            # 重建后的库需要重新登记数据迁移
+            run_migrations()
+            
+            # 推进数据版本号，让重建前客户端缓存的 ETag 全部失效
+            bump_version('problems', 'tests', f'user:{test_student.id}', f'user:{test_teacher.id}')
+            db.session.commit()
+            
             logger.info("数据库初始化成功！")
             logger.info(f"- 添加了2个测试用户（学生和教师账号）")
-            logger.info(f"- 添加了 {len(problems)} 道题目")
+            logger.info(f"- 添加了 {Problem.query.count()} 道题目")
             logger.info(f"- 添加了 {len(tests)} 份测试")
             logger.info(f"- 添加了 {result_count} 份测试结果和 {stat_count} 条题目统计数据")
             logger.info(f"- 添加了活动数据和对应的做题记录")
@@ -189,45 +222,6 @@ def init_db():
             logger.error("回滚失败，但这不影响数据库的重新初始化")
         raise  # 重新抛出异常，确保错误不会被静默处理
 
-def load_problems():
-    problem_types = ['multiple_choice', 'fill_blank', 'solution']
-    problems = []
-    
-    for type_name in problem_types:
-        file_path = os.path.join('data', 'problems', f'{type_name}.json')
-        full_path = os.path.join(os.getcwd(), '..', file_path)
-        logger.info(f"尝试读取文件: {full_path}")
-        
-        try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # 确保data是一个字典，并且包含problems键
-                if isinstance(data, dict) and 'problems' in data:
-                    for problem in data['problems']:
-                        # 处理选项，确保是JSON字符串
-                        if 'options' in problem:
-                            problem['options'] = json.dumps(problem['options'])
-                        # 处理topics，确保是逗号分隔的字符串
-                        if 'topics' in problem and isinstance(problem['topics'], list):
-                            problem['topics'] = ','.join(problem['topics'])
-                        problems.append(problem)
-                elif isinstance(data, list):
-                    # 如果直接是列表，就直接处理每个题目
-                    for problem in data:
-                        if 'options' in problem:
-                            problem['options'] = json.dumps(problem['options'])
-                        if 'topics' in problem and isinstance(problem['topics'], list):
-                            problem['topics'] = ','.join(problem['topics'])
-                        problems.append(problem)
-        except FileNotFoundError:
-            logger.warning(f"Warning: {file_path} not found")
-        except json.JSONDecodeError:
-            logger.warning(f"Warning: {file_path} is not valid JSON")
-        except Exception as e:
-            logger.error(f"Error processing {file_path}: {e}")
-    
-    return problems
-
 def load_tests():
     file_path = os.path.join('data', 'tests', 'test_papers.json')
     full_path = os.path.join(os.getcwd(), '..', file_path)
@@ -257,9 +251,10 @@ def load_tests():
                 # 处理topics，确保是逗号分隔的字符串
                 if 'topics' in test_data and isinstance(test_data['topics'], list):
                     test_data['topics'] = ','.join(test_data['topics'])
-                # 处理problem_ids，确保是逗号分隔的字符串
-                if 'problem_ids' in test_data and isinstance(test_data['problem_ids'], list):
-                    test_data['problem_ids'] = ','.join(map(str, test_data['problem_ids']))
+                # 处理problem_ids，确保是整数列表
+                if isinstance(test_data.get('problem_ids'), str):
+                    test_data['problem_ids'] = test_data['problem_ids'].split(',')
+                test_data['problem_ids'] = [int(pid) for pid in test_data.get('problem_ids') or []]
                 # 处理日期字段
                 if 'created_at' in test_data:
                     test_data['created_at'] = datetime.fromisoformat(test_data['created_at'].replace('Z', '+00:00'))
@@ -1,8 +1,9 @@
 from app import create_app, db
 
-app = create_app()
-
 if __name__ == '__main__':
+    # 应用在入口判断内创建：统计重算的进程池以 spawn 方式启动，子进程会重新导入这个模块，不能在导入时创建应用
+    # （flask 命令行找不到 app 时会使用 create_app 工厂）
+    app = create_app()
     with app.app_context():
         db.create_all()
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
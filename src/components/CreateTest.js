@@ -14,7 +14,10 @@ function CreateTest() {
   const navigate = useNavigate();
   
   // 状态管理
-  const [problems, setProblems] = useState([]); // 题库中的所有题目
+  const [problems, setProblems] = useState([]); // 当前已加载的题库题目
+  const [nextCursor, setNextCursor] = useState(null); // 下一页游标
+  const [typeFacets, setTypeFacets] = useState({}); // 各题型题目数
+  const [allTopics, setAllTopics] = useState([]); // 题库中的所有知识点
   const [loading, setLoading] = useState(true); // 加载状态
   const [error, setError] = useState(null); // 错误信息
   
@@ -32,6 +35,14 @@ function CreateTest() {
   // 已选择的题目列表
   const [selectedQuestions, setSelectedQuestions] = useState([]);
   
+  // 自动组卷条件，难度、预计时间和知识点沿用测试基本信息
+  const [assembly, setAssembly] = useState({
+    count: 10, // 题目数量
+    typeCounts: { '选择题': '', '填空题': '', '解答题': '' }, // 各题型数量，留空表示不限
+    avoidSeen: true // 避开之前布置过的题目
+  });
+  const [assembling, setAssembling] = useState(false);
+
   // 题目筛选条件
   const [filters, setFilters] = useState({
     type: '全部',
@@ -39,18 +50,26 @@ function CreateTest() {
     searchText: ''
   });
 
-  // 在组件加载时获取题目数据
+  // 筛选条件变化时从后端获取第一页题目
   useEffect(() => {
     const fetchProblems = async () => {
       try {
-        const response = await api.problems.getList();
+        const response = await api.problems.getList({
+          type: filters.type,
+          difficulty: filters.difficulty,
+          q: filters.searchText.trim()
+        });
         if (response.status === 401) {
           console.log('未登录或登录已过期');
           window.location.href = '/?showLogin=true';
           return;
         }
         const data = await response.json();
-        setProblems(data);
+        setProblems(data.problems);
+        setNextCursor(data.next_cursor);
+        setTypeFacets(data.facets.type);
+        // 知识点候选项取自未筛选时的分面结果，不随题库筛选变化
+        setAllTopics(prev => prev.length ? prev : Object.keys(data.facets.topic));
         setLoading(false);
       } catch (err) {
         console.error('获取题目失败:', err);
@@ -70,12 +89,31 @@ function CreateTest() {
       return;
     }
 
-    fetchProblems();
-  }, []);
+    // 输入搜索词时稍作延迟，避免每个字符都发请求
+    const timer = setTimeout(fetchProblems, filters.searchText ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [filters]);
 
-  // 从题目数据中提取所有唯一的题型和知识点
-  const allTypes = ['全部', ...new Set(problems.map(q => q.type))];
-  const allTopics = [...new Set(problems.flatMap(q => q.topics))];
+  // 加载下一页题目
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      const response = await api.problems.getList({
+        type: filters.type,
+        difficulty: filters.difficulty,
+        q: filters.searchText.trim(),
+        cursor: nextCursor
+      });
+      const data = await response.json();
+      setProblems(prev => [...prev, ...data.problems]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error('获取更多题目失败:', err);
+    }
+  };
+
+  // 题型选项来自后端返回的分面计数
+  const allTypes = ['全部', ...Object.keys(typeFacets)];
 
   // 处理知识点选择
   const handleTopicSelect = (topic) => {
@@ -95,17 +133,6 @@ function CreateTest() {
     });
   };
 
-  // 根据筛选条件过滤题目
-  const filteredQuestions = problems.filter(question => {
-    const typeMatch = filters.type === '全部' || question.type === filters.type;
-    const difficultyMatch = filters.difficulty === '全部' || question.difficulty === Number(filters.difficulty);
-    const searchMatch = !filters.searchText || 
-      question.title.toLowerCase().includes(filters.searchText.toLowerCase()) ||
-      question.topics.some(topic => topic.toLowerCase().includes(filters.searchText.toLowerCase()));
-
-    return typeMatch && difficultyMatch && searchMatch;
-  });
-
   // 检查题目是否已被选择
   const isQuestionSelected = (questionId) => {
     return selectedQuestions.some(q => q.id === questionId);
@@ -135,6 +162,38 @@ function CreateTest() {
     setSelectedQuestions(prev => prev.filter((_, i) => i !== index));
   };
 
+  // 自动组卷：按条件生成草稿，替换已选题目，教师可继续调整
+  const handleAssemble = async () => {
+    const typeCounts = {};
+    Object.entries(assembly.typeCounts).forEach(([type, count]) => {
+      if (parseInt(count) > 0) typeCounts[type] = parseInt(count);
+    });
+    setAssembling(true);
+    try {
+      const response = await api.tests.assemble({
+        count: assembly.count,
+        type_counts: typeCounts,
+        topics: testInfo.topics,
+        difficulty: { mean: testInfo.difficulty },
+        time_budget: testInfo.estimatedTime,
+        avoid_seen: assembly.avoidSeen
+      });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.error || '组卷失败，请稍后重试');
+      }
+      setSelectedQuestions(data.problems.map((question, index) => ({ ...question, order: index + 1 })));
+      if (data.summary.unmet.length > 0) {
+        alert(`部分条件未能满足：\n${data.summary.unmet.join('\n')}`);
+      }
+    } catch (error) {
+      console.error('自动组卷失败:', error);
+      alert(error.message || '组卷失败，请稍后重试');
+    } finally {
+      setAssembling(false);
+    }
+  };
+
   // 提交测试信息到后端
   const handleSubmit = async () => {
     // 表单验证
@@ -323,6 +382,54 @@ function CreateTest() {
         </div>
       </div>
 
+      {/* 自动组卷区域 */}
+      <div className="test-setup">
+        <div className="form-row assemble-row">
+          <div className="form-group">
+            <label>题目数量</label>
+            <input
+              type="number"
+              min="1"
+              max="100"
+              value={assembly.count}
+              onChange={(e) => setAssembly({...assembly, count: parseInt(e.target.value)})}
+            />
+          </div>
+          {Object.keys(assembly.typeCounts).map(type => (
+            <div className="form-group" key={type}>
+              <label>{type}</label>
+              <input
+                type="number"
+                min="0"
+                placeholder="不限"
+                value={assembly.typeCounts[type]}
+                onChange={(e) => setAssembly({
+                  ...assembly,
+                  typeCounts: {...assembly.typeCounts, [type]: e.target.value}
+                })}
+              />
+            </div>
+          ))}
+          <div className="form-group">
+            <label>
+              <input
+                type="checkbox"
+                checked={assembly.avoidSeen}
+                onChange={(e) => setAssembly({...assembly, avoidSeen: e.target.checked})}
+              />
+              避开布置过的题目
+            </label>
+            <button
+              className="assemble-button"
+              onClick={handleAssemble}
+              disabled={assembling || !assembly.count}
+            >
+              {assembling ? '组卷中...' : '自动组卷'}
+            </button>
+          </div>
+        </div>
+      </div>
+
       {/* 题目选择区域 */}
       <div className="question-selection">
         {/* 题库区域 */}
@@ -367,7 +474,7 @@ function CreateTest() {
 
           {/* 题目列表 */}
           <div className="questions-list">
-            {filteredQuestions.map(question => (
+            {problems.map(question => (
               <div 
                 key={question.id} 
                 className={`question-item ${isQuestionSelected(question.id) ? 'selected' : ''}`}
@@ -398,6 +505,11 @@ function CreateTest() {
                 )}
               </div>
             ))}
+            {nextCursor && (
+              <button className="load-more-button" onClick={handleLoadMore}>
+                加载更多
+              </button>
+            )}
           </div>
         </div>
 
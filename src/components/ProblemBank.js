@@ -2,12 +2,16 @@ import React, { useState, useEffect } from 'react';
 import './ProblemBank.css';
 import { FaSearch, FaStar, FaRegStar } from 'react-icons/fa';
 import { useNavigate } from 'react-router-dom';
-import { fetchWithAuth } from '../utils/api';
+import { api } from '../utils/api';
 
 function ProblemBank() {
   const navigate = useNavigate();
   const [problems, setProblems] = useState([]);
+  const [facets, setFacets] = useState({ type: {}, difficulty: {}, topic: {} });
+  const [total, setTotal] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   
   const [filters, setFilters] = useState({
@@ -17,17 +21,30 @@ function ProblemBank() {
     searchText: ''
   });
 
-  // 从后端获取题目数据
+  // 筛选条件转换为接口查询参数，筛选、分页和计数都由后端完成
+  const buildParams = (cursor) => ({
+    type: filters.type,
+    difficulty: filters.difficulty,
+    topic: filters.topic,
+    q: filters.searchText.trim(),
+    cursor
+  });
+
+  // 筛选条件变化时重新获取第一页
   useEffect(() => {
     const fetchProblems = async () => {
       try {
-        const response = await fetchWithAuth('/problems');
+        const response = await api.problems.getList(buildParams());
         if (!response.ok) {
           throw new Error('获取题目失败');
         }
         const data = await response.json();
         console.log('Fetched problems:', data);
-        setProblems(data);
+        setProblems(data.problems);
+        setFacets(data.facets);
+        setTotal(data.total);
+        setNextCursor(data.next_cursor);
+        setError(null);
         setLoading(false);
       } catch (err) {
         console.error('Failed to fetch problems:', err);
@@ -36,24 +53,30 @@ function ProblemBank() {
       }
     };
 
-    fetchProblems();
-  }, []);
-
-  // 从题目数据中提取所有唯一的题型和知识点
-  const allTypes = ['全部', ...new Set(problems.map(q => q.type))];
-  const allTopics = ['全部', ...new Set(problems.flatMap(q => q.topics))];
-
-  // 根据筛选条件过滤题目
-  const filteredProblems = problems.filter(question => {
-    const typeMatch = filters.type === '全部' || question.type === filters.type;
-    const difficultyMatch = filters.difficulty === '全部' || question.difficulty === Number(filters.difficulty);
-    const topicMatch = filters.topic === '全部' || question.topics.includes(filters.topic);
-    const searchMatch = !filters.searchText || 
-      question.title.toLowerCase().includes(filters.searchText.toLowerCase()) ||
-      question.topics.some(topic => topic.toLowerCase().includes(filters.searchText.toLowerCase()));
+    // 输入搜索词时稍作延迟，避免每个字符都发请求
+    const timer = setTimeout(fetchProblems, filters.searchText ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [filters]);
+
+  // 加载下一页
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.problems.getList(buildParams(nextCursor));
+      const data = await response.json();
+      setProblems(prev => [...prev, ...data.problems]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      console.error('Failed to fetch more problems:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
-    return typeMatch && difficultyMatch && topicMatch && searchMatch;
-  });
+  // 题型和知识点来自后端返回的分面计数
+  const allTypes = ['全部', ...Object.keys(facets.type)];
+  const allTopics = ['全部', ...Object.keys(facets.topic)];
 
   const handleProblemClick = (problemId) => {
     navigate(`/problem/${problemId}`);
@@ -72,7 +95,6 @@ function ProblemBank() {
 
   if (loading) return <div className="loading">正在加载题目...</div>;
   if (error) return <div className="error">加载失败: {error}</div>;
-  if (!problems.length) return <div className="empty">暂无题目</div>;
 
   return (
     <div className="problem-bank">
@@ -86,9 +108,7 @@ function ProblemBank() {
           >
             <span>{topic}</span>
             <span className="topic-count">
-              {topic === '全部' 
-                ? problems.length 
-                : problems.filter(p => p.topics.includes(topic)).length}
+              {topic === '全部' ? total : facets.topic[topic]}
             </span>
           </div>
         ))}
@@ -156,7 +176,7 @@ function ProblemBank() {
             </tr>
           </thead>
           <tbody>
-            {filteredProblems.map(problem => (
+            {problems.map(problem => (
               <tr key={problem.id} onClick={() => handleProblemClick(problem.id)}>
                 <td>{problem.id}</td>
                 <td>{problem.title}</td>
@@ -176,6 +196,14 @@ function ProblemBank() {
             ))}
           </tbody>
         </table>
+        {!problems.length && <div className="empty">暂无题目</div>}
+        {nextCursor && (
+          <div className="load-more">
+            <button onClick={handleLoadMore} disabled={loadingMore}>
+              {loadingMore ? '加载中...' : `加载更多（已显示 ${problems.length} / ${total}）`}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
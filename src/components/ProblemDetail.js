@@ -14,6 +14,7 @@ function ProblemDetail() {
   const [showResult, setShowResult] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [relatedProblems, setRelatedProblems] = useState([]);
 
   useEffect(() => {
     const fetchProblem = async () => {
@@ -45,6 +46,26 @@ function ProblemDetail() {
     fetchProblem();
   }, [problemId]);
 
+  useEffect(() => {
+    const fetchRelated = async () => {
+      try {
+        const response = await fetch(`http://localhost:5000/api/problems/${problemId}/related`, {
+          credentials: 'include'
+        });
+        if (!response.ok) {
+          throw new Error('获取相似题目失败');
+        }
+        const data = await response.json();
+        setRelatedProblems(data.related || []);
+      } catch (err) {
+        console.error('获取相似题目失败:', err);
+        setRelatedProblems([]);
+      }
+    };
+
+    fetchRelated();
+  }, [problemId]);
+
   // 添加知识点掌握情况数据
   const knowledgePoints = [
     { name: '解析几何', mastery: 85 },
@@ -52,12 +73,8 @@ function ProblemDetail() {
     { name: '焦点', mastery: 68 }
   ];
 
-  // 添加推荐习题数据
-  const recommendedProblems = [
-    { id: 11, title: '圆的标准方程应用' },
-    { id: 19, title: '椭圆的标准方程' },
-    { id: 5, title: '函数的极值问题' }
-  ];
+  // 推荐习题：服务器预先计算的相似题目，取前3道
+  const recommendedProblems = relatedProblems.slice(0, 3);
 
   const handleSubmit = async () => {
     const token = localStorage.getItem('token');
@@ -99,7 +116,9 @@ function ProblemDetail() {
       setProblem(prev => ({
         ...prev,
         correctAnswer: data.correct_answer,
-        explanation: data.explanation
+        explanation: data.explanation,
+        // 以服务器判分为准（1/4 与 0.25 等写法差异视为正确）
+        isCorrect: data.correct
       }));
       setShowResult(true);
     } catch (err) {
@@ -189,8 +208,8 @@ function ProblemDetail() {
             </div>
           ) : (
             <div className="result-section">
-              <div className={`result ${userAnswer === problem.correctAnswer ? 'correct' : 'incorrect'}`}>
-                {userAnswer === problem.correctAnswer ? (
+              <div className={`result ${problem.isCorrect ? 'correct' : 'incorrect'}`}>
+                {problem.isCorrect ? (
                   <><FaCheck /> 回答正确！</>
                 ) : (
                   <><FaTimes /> 回答错误，正确答案是：{problem.correctAnswer}</>
@@ -232,7 +251,7 @@ function ProblemDetail() {
             <div className="recommended-problems">
               <h3>推荐习题</h3>
               <p className="recommend-tip">
-                {userAnswer === problem.correctAnswer 
+                {problem.isCorrect 
                   ? '巩固练习，建议尝试以下题目：' 
                   : '针对性练习，建议先做以下题目：'}
               </p>
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { Card, List, Tag, Space, Typography, message, Button } from 'antd';
+import { Card, List, Tag, Space, Typography, message, Button, Tabs } from 'antd';
 import { useNavigate } from 'react-router-dom';
 import { ClockCircleOutlined, StarOutlined, CheckCircleOutlined, RightOutlined } from '@ant-design/icons';
 import './TestBank.css';
@@ -26,15 +26,18 @@ const morandiColors = {
 
 const TestBank = () => {
     const [tests, setTests] = useState([]);
-    const [completedTests, setCompletedTests] = useState([]);
+    const [status, setStatus] = useState('all');
+    const [counts, setCounts] = useState({ all: 0, pending: 0, completed: 0 });
+    const [nextCursor, setNextCursor] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const navigate = useNavigate();
 
     useEffect(() => {
         fetchTests();
-        fetchCompletedTests();
-    }, []);
+    }, [status]);
 
-    const fetchTests = async () => {
+    // 分页获取测试列表，完成状态、排序和各标签页数量都由后端返回
+    const fetchTests = async (cursor = null) => {
         try {
             const token = localStorage.getItem('token');
             if (!token) {
@@ -43,7 +46,10 @@ const TestBank = () => {
                 return;
             }
 
-            const response = await fetch('http://localhost:5000/api/tests/', {
+            const params = new URLSearchParams();
+            if (status !== 'all') params.append('status', status);
+            if (cursor) params.append('cursor', cursor);
+            const response = await fetch(`http://localhost:5000/api/tests?${params.toString()}`, {
                 credentials: 'include',
                 headers: {
                     'Authorization': `Bearer ${token}`,
@@ -56,40 +62,26 @@ const TestBank = () => {
             }
 
             const data = await response.json();
-            setTests(data);
+            setTests(prev => cursor ? [...prev, ...data.tests] : data.tests);
+            setCounts(data.counts);
+            setNextCursor(data.next_cursor);
         } catch (error) {
             console.error('Error:', error);
             message.error(error.message);
         }
     };
 
-    const fetchCompletedTests = async () => {
-        try {
-            const token = localStorage.getItem('token');
-            if (!token) return;
-
-            const response = await fetch('http://localhost:5000/api/tests/completed/', {
-                credentials: 'include',
-                headers: {
-                    'Authorization': `Bearer ${token}`,
-                    'Content-Type': 'application/json'
-                }
-            });
-
-            if (!response.ok) {
-                throw new Error('获取已完成测试列表失败');
-            }
-
-            const data = await response.json();
-            setCompletedTests(data);
-        } catch (error) {
-            console.error('Error:', error);
-        }
+    // 加载下一页
+    const handleLoadMore = async () => {
+        if (!nextCursor || loadingMore) return;
+        setLoadingMore(true);
+        await fetchTests(nextCursor);
+        setLoadingMore(false);
     };
 
     const handleTestClick = (testId) => {
         // 如果测试已完成，跳转到结果页面
-        if (completedTests.includes(testId)) {
+        if (tests.find(test => test.id === testId)?.is_completed) {
             navigate(`/testresult/${testId}`);
         } else {
             navigate(`/test/${testId}`);
@@ -113,15 +105,24 @@ const TestBank = () => {
             <Title level={2} style={{ color: morandiColors.text, marginBottom: '24px', textAlign: 'center' }}>
                 小测列表
             </Title>
+            <Tabs
+                activeKey={status}
+                onChange={setStatus}
+                items={[
+                    { key: 'all', label: `全部 (${counts.all})` },
+                    { key: 'pending', label: `未完成 (${counts.pending})` },
+                    { key: 'completed', label: `已完成 (${counts.completed})` }
+                ]}
+            />
             <List
                 grid={{ gutter: 16, xs: 1, sm: 2, md: 2, lg: 3, xl: 3, xxl: 4 }}
                 dataSource={tests}
                 renderItem={test => (
                     <List.Item>
                         <Card
-                            className={completedTests.includes(test.id) ? 'completed-test' : 'test-card'}
+                            className={test.is_completed ? 'completed-test' : 'test-card'}
                             style={{
-                                background: completedTests.includes(test.id) ? morandiColors.completed : '#fff',
+                                background: test.is_completed ? morandiColors.completed : '#fff',
                                 borderColor: 'transparent',
                                 borderRadius: '12px',
                                 boxShadow: '0 4px 12px rgba(0, 0, 0, 0.05)',
@@ -139,7 +140,7 @@ const TestBank = () => {
                                         fontWeight: '500'
                                     }}>
                                         {test.title}
-                                        {completedTests.includes(test.id) && (
+                                        {test.is_completed && (
                                             <CheckCircleOutlined style={{ 
                                                 marginLeft: '8px', 
                                                 color: morandiColors.primary,
@@ -205,7 +206,7 @@ const TestBank = () => {
                                         fontWeight: '500'
                                     }}
                                 >
-                                    {completedTests.includes(test.id) ? '查看结果' : '开始测试'} 
+                                    {test.is_completed ? '查看结果' : '开始测试'} 
                                     <RightOutlined />
                                 </Button>
               </div>
@@ -213,6 +214,13 @@ const TestBank = () => {
                     </List.Item>
                 )}
             />
+            {nextCursor && (
+                <div style={{ textAlign: 'center', marginTop: '16px' }}>
+                    <Button onClick={handleLoadMore} loading={loadingMore}>
+                        加载更多
+                    </Button>
+                </div>
+            )}
     </div>
   );
 };
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { Card, Button, Radio, Input, Space, Progress, Typography, message, Modal } from 'antd';
 import { ClockCircleOutlined, ExclamationCircleOutlined, FieldTimeOutlined } from '@ant-design/icons';
@@ -14,6 +14,12 @@ const morandiColors = {
     submit: '#A5C9C4'      // 提交按钮 - 莫兰迪绿
 };
 
+// 自动保存间隔（毫秒）
+const AUTOSAVE_INTERVAL = 10000;
+
+// 排队提交后最多轮询判分结果的次数（每秒一次）
+const GRADING_POLL_LIMIT = 120;
+
 const TestPaper = () => {
     const { testId } = useParams();
     const navigate = useNavigate();
@@ -25,6 +31,17 @@ const TestPaper = () => {
     const [timeSpent, setTimeSpent] = useState(0);
     const [loading, setLoading] = useState(true);
     const [submitting, setSubmitting] = useState(false);
+    // 服务器上已保存的答案，自动保存时只上报与之不同的题目
+    const savedAnswers = useRef({});
+    const answersRef = useRef(answers);
+    const timeSpentRef = useRef(timeSpent);
+    // 每道题的累计作答用时 {题目ID: 秒}，按停留在该题的时间计，随草稿和答卷一起上报
+    const questionTime = useRef({});
+    const savedQuestionTime = useRef('{}');
+    const currentProblemId = useRef(null);
+    answersRef.current = answers;
+    timeSpentRef.current = timeSpent;
+    currentProblemId.current = problems[currentIndex]?.id ?? null;
 
     useEffect(() => {
         if (!testId) {
@@ -62,11 +79,80 @@ const TestPaper = () => {
     useEffect(() => {
         const timer = setInterval(() => {
             setTimeSpent(prev => prev + 1);
+            const id = currentProblemId.current;
+            if (id !== null) {
+                questionTime.current[id] = (questionTime.current[id] || 0) + 1;
+            }
     }, 1000);
 
     return () => clearInterval(timer);
   }, []);
 
+    // 定期自动保存变化的答案，刷新页面后可以恢复
+    useEffect(() => {
+        if (!test) return;
+        const timer = setInterval(saveDraft, AUTOSAVE_INTERVAL);
+        return () => clearInterval(timer);
+    }, [test]);
+
+    const saveDraft = async () => {
+        const changed = {};
+        Object.entries(answersRef.current).forEach(([id, value]) => {
+            if (savedAnswers.current[id] !== value) changed[id] = value;
+        });
+        const times = { ...questionTime.current };
+        const timesJson = JSON.stringify(times);
+        if (Object.keys(changed).length === 0 && timesJson === savedQuestionTime.current) return;
+        try {
+            const response = await fetch(`/api/tests/${testId}/draft`, {
+                method: 'PUT',
+                credentials: 'include',
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('token')}`,
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({
+                    answers: changed,
+                    elapsed: timeSpentRef.current,
+                    time_spent: times,
+                    version: test?.version
+                })
+            });
+            if (response.ok) {
+                savedAnswers.current = { ...savedAnswers.current, ...changed };
+                savedQuestionTime.current = timesJson;
+            }
+        } catch (error) {
+            console.error('自动保存失败:', error);
+        }
+    };
+
+    // 恢复上次自动保存的作答
+    const restoreDraft = async (token, problemList) => {
+        try {
+            const response = await fetch(`/api/tests/${testId}/draft`, {
+                credentials: 'include',
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (!response.ok) return;
+            const draft = await response.json();
+            const restored = {};
+            problemList.forEach(problem => {
+                if (draft.answers[problem.id] !== undefined) restored[problem.id] = draft.answers[problem.id];
+            });
+            savedAnswers.current = restored;
+            setAnswers(restored);
+            setTimeSpent(draft.duration || 0);
+            questionTime.current = { ...(draft.time_spent || {}) };
+            savedQuestionTime.current = JSON.stringify(questionTime.current);
+            if (Object.keys(restored).length > 0) {
+                message.info('已恢复上次保存的作答');
+            }
+        } catch (error) {
+            console.error('恢复作答草稿失败:', error);
+        }
+    };
+
     const fetchTestDetails = async () => {
         try {
             const token = localStorage.getItem('token');
@@ -111,6 +197,7 @@ const TestPaper = () => {
 
             setTest(data.test_info);
             setProblems(data.problems);
+            await restoreDraft(token, data.problems);
         } catch (error) {
             console.error('获取测试详情错误:', error);
             message.error(error.message || '获取测试详情失败');
@@ -154,6 +241,25 @@ const TestPaper = () => {
         }
     };
 
+    const waitForGrading = async (receipt, token) => {
+        // 每秒查询一次，超过 GRADING_POLL_LIMIT 次仍未完成时放弃等待
+        for (let attempt = 0; attempt < GRADING_POLL_LIMIT; attempt++) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const response = await fetch(`/api/tests/submissions/${receipt}`, {
+                credentials: 'include',
+                headers: { 'Authorization': `Bearer ${token}` }
+            });
+            if (response.status === 404) throw new Error('提交回执不存在');
+            if (!response.ok) continue;
+            const status = await response.json();
+            if (status.status === 'done') return status;
+            if (status.status === 'failed') throw new Error(status.error);
+        }
+        const error = new Error('判分超时');
+        error.timeout = true;
+        throw error;
+    };
+
     const submitAnswers = async () => {
         setSubmitting(true);
         try {
@@ -171,7 +277,9 @@ const TestPaper = () => {
                 },
                 body: JSON.stringify({ 
                     answers,
-                    duration: timeSpent
+                    duration: timeSpent,
+                    time_spent: questionTime.current,
+                    version: test?.version  // 按打开时的试卷版本判分
                 })
             });
             
@@ -181,15 +289,31 @@ const TestPaper = () => {
                     navigate('/');
                     throw new Error('登录已过期');
                 }
+                if (response.status === 503) {
+                    message.warning('提交人数过多，请稍后重试');
+                    return;
+                }
                 throw new Error(`提交失败 (${response.status})`);
             }
 
             const result = await response.json();
+            // 排队提交：轮询回执直到判分完成
+            if (response.status === 202) {
+                message.loading({ content: '已收到答卷，正在判分...', key: 'grading', duration: 0 });
+                await waitForGrading(result.receipt, token);
+                message.destroy('grading');
+            }
             message.success('提交成功！');
             navigate(`/testresult/${testId}`);
         } catch (error) {
             console.error('Error submitting answers:', error);
-            message.error('提交答案失败，请重试');
+            message.destroy('grading');
+            if (error.timeout) {
+                // 答卷已在队列中，重新提交会产生重复记录
+                message.warning('答卷已提交，判分时间较长，请稍后在测试结果中查看');
+            } else {
+                message.error('提交答案失败，请重试');
+            }
         } finally {
             setSubmitting(false);
         }
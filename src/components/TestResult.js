@@ -68,7 +68,7 @@ const TestResult = () => {
     if (!testResult) return <div>加载中...</div>;
 
     const currentProblem = testResult.problems[currentProblemIndex];
-    const isCorrect = currentProblem.user_answer === currentProblem.correct_answer;
+    const isCorrect = currentProblem.is_correct;
 
     const handlePrevious = () => {
         setCurrentProblemIndex(prev => Math.max(0, prev - 1));
@@ -173,7 +173,7 @@ const TestResult = () => {
                         <Button
                             key={index}
                             className={`nav-button ${
-                                problem.user_answer === problem.correct_answer ? 'correct' : 'wrong'
+                                problem.is_correct ? 'correct' : 'wrong'
                             } ${index === currentProblemIndex ? 'current' : ''}`}
                             onClick={() => setCurrentProblemIndex(index)}
                         >
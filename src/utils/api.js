@@ -64,15 +64,34 @@ export async function fetchWithAuth(endpoint, options = {}) {
   }
 }
 
+// 把查询参数对象转成查询字符串，忽略空值和“全部”
+export function buildQuery(params = {}) {
+  const search = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '' && value !== '全部') {
+      search.append(key, value);
+    }
+  });
+  const query = search.toString();
+  return query ? `?${query}` : '';
+}
+
 // API方法配置
 export const api = {
   // 题目相关
   problems: {
-    getList: () => fetchWithAuth('/problems'),
+    getList: (params) => fetchWithAuth(`/problems${buildQuery(params)}`),
     getDetail: (id) => fetchWithAuth(`/problems/${id}`),
+    // 个性化推荐：params 为 { limit, exclude }
+    getNext: (params) => fetchWithAuth(`/problems/next${buildQuery(params)}`),
     submit: (id, answer) => fetchWithAuth(`/problems/${id}/submit`, {
       method: 'POST',
       body: JSON.stringify({ answer })
+    }),
+    // 批量提交：items 为 [{ problem_id, answer, answered_at }]
+    submitBatch: (items) => fetchWithAuth('/problems/submit-batch', {
+      method: 'POST',
+      body: JSON.stringify({ items })
     })
   },
   
@@ -84,6 +103,13 @@ export const api = {
       body: JSON.stringify(testData)
     }),
     getDetail: (id) => fetchWithAuth(`/tests/${id}`),
+    // 自动组卷：返回草稿，不保存
+    assemble: (conditions) => fetchWithAuth('/tests/assemble', {
+      method: 'POST',
+      body: JSON.stringify(conditions)
+    }),
+    // 重新发布：按当前题目生成新版本试卷
+    publish: (id) => fetchWithAuth(`/tests/${id}/publish`, { method: 'POST' }),
     submit: (id, answers) => fetchWithAuth(`/tests/${id}/submit`, {
       method: 'POST',
       body: JSON.stringify(answers)
@@ -105,5 +131,11 @@ export const api = {
       body: formData,
       headers: {} // 让浏览器自动设置Content-Type为multipart/form-data
     })
+  },
+
+  // 教师端
+  teacher: {
+    // 测试分析：分数分布、知识点掌握度、每道题的正确率和用时
+    getTestStats: (id) => fetchWithAuth(`/teacher/tests/${id}/stats`)
   }
 }; 
\ No newline at end of file